@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AutenticacaoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'autenticacao'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (registra os receivers)
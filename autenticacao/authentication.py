@@ -0,0 +1,125 @@
+"""
+Autenticação JWT com cache em processo.
+
+A autenticação padrão do simplejwt verifica a assinatura do token e busca o
+usuário no banco a cada requisição. `JWTCacheAuthentication` guarda, para
+cada token já verificado, o usuário correspondente num cache LRU com tempo de
+vida (TTL) limitado, de modo que requisições repetidas com o mesmo token não
+fazem nenhuma consulta. Na primeira verificação também é conferido se o
+refresh token que originou o access token foi revogado (logout), usando o
+filtro de revogações de `autenticacao.revogacao`.
+
+Revogações e alterações do usuário descartam as entradas do processo atual
+imediatamente; nos demais processos valem após no máximo JWT_CACHE_TTL
+segundos.
+"""
+import copy
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from financeira_api.cache_lru import CacheLRU
+from servicos.models import Cliente
+
+from .revogacao import filtro_revogacoes
+from .tokens import CLAIM_REFRESH_JTI
+
+
+cache_tokens = CacheLRU(
+    getattr(settings, 'JWT_CACHE_TAMANHO', 10000),
+    getattr(settings, 'JWT_CACHE_TTL', 60)
+)
+
+
+def descartar_tokens_do_usuario(user_id):
+    cache_tokens.descartar(lambda valor: valor[0].pk == user_id)
+
+
+def descartar_tokens_do_refresh(jti):
+    cache_tokens.descartar(lambda valor: valor[1].get(CLAIM_REFRESH_JTI) == jti)
+
+
+class JWTCacheAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication com cache de tokens verificados e checagem da
+    revogação do refresh token de origem.
+    """
+
+    def _consultar_cache(self, request):
+        """(raw_token, entrada em cache ou None); raw_token é None sem credenciais"""
+        header = self.get_header(request)
+        if header is None:
+            return None, None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None, None
+        return raw_token, cache_tokens.obter(raw_token)
+
+    def authenticate(self, request):
+        raw_token, entrada = self._consultar_cache(request)
+        if raw_token is None:
+            return None
+        if entrada is not None:
+            user, validated_token = entrada
+            # Cópia rasa: a view pode alterar atributos do usuário
+            return copy.copy(user), validated_token
+
+        validated_token = self.get_validated_token(raw_token)
+        self.verificar_revogacao(validated_token)
+        user = self.get_user(validated_token)
+        cache_tokens.guardar(
+            raw_token, (user, validated_token), validated_token['exp'] - time.time()
+        )
+        return copy.copy(user), validated_token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate para views assíncronas: o token em cache é resolvido sem
+        sair do event loop; só a primeira verificação (que consulta o banco)
+        roda numa thread.
+        """
+        raw_token, entrada = self._consultar_cache(request)
+        if raw_token is None:
+            return None
+        if entrada is not None:
+            user, validated_token = entrada
+            return copy.copy(user), validated_token
+        return await sync_to_async(self.authenticate)(request)
+
+    def verificar_revogacao(self, validated_token):
+        jti = validated_token.get(CLAIM_REFRESH_JTI)
+        if jti and filtro_revogacoes.esta_revogado(jti):
+            raise AuthenticationFailed(_('Token is blacklisted'), code='token_revoked')
+
+
+def cliente_id_da_requisicao(request):
+    """
+    Id do cliente do usuário autenticado, lido da claim `cliente_id` quando
+    presente (sem consulta) ou do banco, uma vez por requisição.
+    """
+    if not hasattr(request, '_cliente_id'):
+        token = request.auth
+        cliente_id = token.get('cliente_id') if hasattr(token, 'get') else None
+        if cliente_id is None:
+            cliente_id = Cliente.objects.filter(
+                user_id=request.user.pk
+            ).values_list('id', flat=True).first()
+        request._cliente_id = cliente_id
+    return request._cliente_id
+
+
+async def acliente_id_da_requisicao(request):
+    """Versão assíncrona de cliente_id_da_requisicao"""
+    if not hasattr(request, '_cliente_id'):
+        token = request.auth
+        cliente_id = token.get('cliente_id') if hasattr(token, 'get') else None
+        if cliente_id is None:
+            cliente_id = await Cliente.objects.filter(
+                user_id=request.user.pk
+            ).values_list('id', flat=True).afirst()
+        request._cliente_id = cliente_id
+    return request._cliente_id
@@ -0,0 +1,49 @@
+"""
+Hash de senhas com custo configurável e executado num pool limitado.
+
+O PBKDF2 é CPU-bound, mas o hashlib libera o GIL durante o cálculo. O
+cadastro é uma view assíncrona que aguarda o hash num ThreadPoolExecutor de
+tamanho fixo (PASSWORD_HASH_WORKERS): sob ASGI o event loop segue atendendo
+outras requisições enquanto o hash é calculado, e numa rajada de cadastros no
+máximo esse número de hashes corre ao mesmo tempo, em vez de todos disputarem
+os núcleos.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+
+
+class PBKDF2CustoConfiguravel(PBKDF2PasswordHasher):
+    """
+    PBKDF2 com o número de iterações definido em PASSWORD_PBKDF2_ITERACOES
+    (padrão: o do Django). Senhas gravadas com outro custo são refeitas no
+    próximo login, como em qualquer mudança de iterações do Django.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERACOES', None) or PBKDF2PasswordHasher.iterations
+
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor_de_hash():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', None),
+                    thread_name_prefix='hash-senha'
+                )
+    return _executor
+
+
+async def gerar_hash_senha_async(senha):
+    """make_password executado no pool de hash, sem bloquear o event loop"""
+    return await asyncio.wrap_future(executor_de_hash().submit(make_password, senha))
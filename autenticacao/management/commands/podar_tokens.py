@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from autenticacao.revogacao import TAMANHO_BLOCO_PODA, podar_tokens_expirados
+
+
+class Command(BaseCommand):
+    help = 'Remove em blocos os refresh tokens expirados e suas entradas na blacklist.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PODA,
+                            help='Tokens removidos por transação')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre os blocos')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        removidos = podar_tokens_expirados(options['tamanho_bloco'], options['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{removidos} tokens expirados removidos em {time.perf_counter() - inicio:.1f}s.'
+        ))
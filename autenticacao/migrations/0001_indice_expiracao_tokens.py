@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índice em token_blacklist_outstandingtoken.expires_at, usado pela
+    remoção em blocos dos tokens expirados (manage.py podar_tokens). A
+    tabela pertence ao app token_blacklist do simplejwt, por isso o índice é
+    criado com SQL em vez de alterar o modelo.
+    """
+
+    dependencies = [
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS autenticacao_outstanding_expires_at '
+                'ON token_blacklist_outstandingtoken (expires_at, id)',
+            reverse_sql='DROP INDEX IF EXISTS autenticacao_outstanding_expires_at',
+        ),
+    ]
@@ -0,0 +1,172 @@
+"""
+Consulta rápida de tokens revogados (blacklist do simplejwt).
+
+Cada refresh e cada primeira autenticação de um access token precisam saber
+se o refresh token de origem foi revogado. Um filtro de Bloom em memória com
+os jti revogados responde "certamente não revogado" sem consultar o banco;
+só quando o filtro acusa uma possível revogação (revogação real ou falso
+positivo, ~0,1%) a tabela BlacklistedToken é consultada.
+
+O filtro é montado na primeira consulta do processo, recebe as revogações
+feitas pelo próprio processo (logout) na hora e busca periodicamente, de forma
+incremental, as revogações feitas por outros processos.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+TAMANHO_BLOCO_CARGA = 10000
+MARGEM_SINCRONIZACAO = 1000
+TAMANHO_BLOCO_PODA = 5000
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre um bytearray, com k posições por double hashing"""
+
+    def __init__(self, capacidade, taxa_falsos_positivos=0.001):
+        self.capacidade = max(capacidade, 1)
+        self.bits = max(int(-self.capacidade * math.log(taxa_falsos_positivos) / math.log(2) ** 2), 8)
+        self.funcoes = max(round(self.bits / self.capacidade * math.log(2)), 1)
+        self.mapa = bytearray((self.bits + 7) // 8)
+        self.quantidade = 0
+
+    def _posicoes(self, chave):
+        digest = hashlib.blake2b(chave.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.funcoes)]
+
+    def adicionar(self, chave):
+        """Adiciona a chave; só conta como nova se mudou algum bit"""
+        mapa, nova = self.mapa, False
+        for posicao in self._posicoes(chave):
+            mascara = 1 << (posicao & 7)
+            if not mapa[posicao >> 3] & mascara:
+                mapa[posicao >> 3] |= mascara
+                nova = True
+        self.quantidade += nova
+
+    def __contains__(self, chave):
+        mapa = self.mapa
+        return all(mapa[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+
+class FiltroRevogacoes:
+    """Filtro de jti revogados, montado sob demanda e sincronizado periodicamente"""
+
+    def __init__(self, intervalo_sincronizacao=30, taxa_falsos_positivos=0.001):
+        self.intervalo_sincronizacao = intervalo_sincronizacao
+        self.taxa_falsos_positivos = taxa_falsos_positivos
+        # _lock protege o filtro (escritas no bytearray não são atômicas);
+        # _lock_carga serializa as leituras do banco
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._filtro = None
+        self._ultimo_id = 0
+        self._sincronizado_em = 0.0
+        # Revogações locais feitas durante uma remontagem, reaplicadas no fim
+        self._durante_carga = None
+
+    def _carregar(self, filtro, a_partir_de):
+        """Adiciona ao filtro os jti revogados com id > a_partir_de, em blocos"""
+        ultimo_id = a_partir_de
+        while True:
+            bloco = list(
+                BlacklistedToken.objects.filter(id__gt=ultimo_id)
+                .order_by('id').values_list('id', 'token__jti')[:TAMANHO_BLOCO_CARGA]
+            )
+            with self._lock:
+                for _, jti in bloco:
+                    filtro.adicionar(jti)
+            if bloco:
+                ultimo_id = bloco[-1][0]
+            if len(bloco) < TAMANHO_BLOCO_CARGA:
+                return ultimo_id
+
+    def reconstruir(self):
+        """Monta um filtro novo com todas as revogações do banco"""
+        with self._lock_carga:
+            with self._lock:
+                self._durante_carga = []
+            # Folga para as revogações futuras antes de precisar remontar
+            filtro = FiltroBloom(
+                max(BlacklistedToken.objects.count() * 2, 100000), self.taxa_falsos_positivos
+            )
+            ultimo_id = self._carregar(filtro, 0)
+            with self._lock:
+                for jti in self._durante_carga:
+                    filtro.adicionar(jti)
+                self._durante_carga = None
+                self._filtro, self._ultimo_id = filtro, ultimo_id
+                self._sincronizado_em = time.monotonic()
+
+    def sincronizar(self):
+        """
+        Busca as revogações novas; remonta o filtro se ele ficou cheio.
+        Relê uma margem de ids já vistos, porque ids podem ser confirmados
+        fora de ordem por transações concorrentes.
+        """
+        filtro = self._filtro
+        if filtro is None or filtro.quantidade > filtro.capacidade:
+            self.reconstruir()
+            return
+        with self._lock_carga:
+            self._sincronizado_em = time.monotonic()
+            self._ultimo_id = self._carregar(filtro, max(self._ultimo_id - MARGEM_SINCRONIZACAO, 0))
+
+    def adicionar(self, jti):
+        """Registra uma revogação feita por este processo"""
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.adicionar(jti)
+            if self._durante_carga is not None:
+                self._durante_carga.append(jti)
+
+    def pode_estar_revogado(self, jti):
+        if self._filtro is None:
+            self.reconstruir()
+        elif time.monotonic() - self._sincronizado_em >= self.intervalo_sincronizacao:
+            self.sincronizar()
+        return jti in self._filtro
+
+    def esta_revogado(self, jti):
+        """Consulta o banco apenas quando o filtro não descarta a revogação"""
+        return self.pode_estar_revogado(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def limpar(self):
+        with self._lock:
+            self._filtro, self._ultimo_id, self._sincronizado_em = None, 0, 0.0
+
+
+filtro_revogacoes = FiltroRevogacoes(getattr(settings, 'JWT_REVOGACOES_SINCRONIZACAO', 30))
+
+
+def podar_tokens_expirados(tamanho_bloco=TAMANHO_BLOCO_PODA, pausa=0.0, antes_de=None):
+    """
+    Remove os tokens expirados (e suas entradas na blacklist) em blocos
+    pequenos, cada um na sua transação, para não segurar locks longos nem
+    carregar a coluna `token` na memória. Usa o índice em expires_at.
+    Retorna a quantidade de tokens removidos.
+    """
+    antes_de = antes_de or timezone.now()
+    removidos = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=antes_de)
+            .order_by('expires_at', 'id').values_list('id', flat=True)[:tamanho_bloco]
+        )
+        if not ids:
+            return removidos
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).only('id').delete()
+        removidos += len(ids)
+        if pausa:
+            time.sleep(pausa)
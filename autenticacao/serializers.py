@@ -1,25 +1,39 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from servicos.lancamentos import executar_com_retentativa
 from servicos.models import Cliente
+from .tokens import RefreshTokenCliente
 
 
 class RegistroSerializer(serializers.ModelSerializer):
-    """Serializer para registrar um novo usuário com seus dados de cliente"""
+    """
+    Serializer para registrar um novo usuário com seus dados de cliente.
+
+    A unicidade de username e CPF fica a cargo das constraints do banco (sem
+    consultas prévias, que não evitam a corrida entre cadastros simultâneos).
+    O hash da senha é calculado pela view antes da transação, no pool de
+    hash, e chega em `save(senha_hash=...)`; o usuário é gravado com ele num
+    único INSERT.
+    """
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
     
     # Campos do Cliente
-    cpf = serializers.CharField(required=True)
-    data_nascimento = serializers.DateField(required=True)
-    telefone = serializers.CharField(required=True)
-    endereco = serializers.CharField(required=True)
+    cpf = serializers.CharField(write_only=True, required=True, max_length=14)
+    data_nascimento = serializers.DateField(write_only=True, required=True)
+    telefone = serializers.CharField(write_only=True, required=True, max_length=15)
+    endereco = serializers.CharField(write_only=True, required=True)
     
     class Meta:
         model = User
         fields = ('username', 'password', 'password2', 'email', 'first_name', 'last_name',
                  'cpf', 'data_nascimento', 'telefone', 'endereco')
         extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
             'first_name': {'required': True},
             'last_name': {'required': True},
             'email': {'required': True}
@@ -28,12 +42,6 @@ class RegistroSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "As senhas não conferem."})
-        
-        # Validar CPF único
-        cpf = attrs.get('cpf')
-        if Cliente.objects.filter(cpf=cpf).exists():
-            raise serializers.ValidationError({"cpf": "Este CPF já está em uso."})
-            
         return attrs
         
     def create(self, validated_data):
@@ -46,22 +54,25 @@ class RegistroSerializer(serializers.ModelSerializer):
         }
         
         validated_data.pop('password2')
-        
-        # Criar usuário
-        user = User.objects.create(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name']
-        )
-        
-        user.set_password(validated_data['password'])
-        user.save()
-        
-        # Criar perfil de cliente
-        Cliente.objects.create(user=user, **cliente_data)
-        
-        return user
+        validated_data.pop('password')
+        senha = validated_data.pop('senha_hash')
+
+        def operacao():
+            user = User(password=senha, **validated_data)
+            try:
+                user.save(force_insert=True)
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    {"username": "Já existe um usuário com este nome de usuário."}
+                )
+            try:
+                Cliente.objects.create(user=user, **cliente_data)
+            except IntegrityError:
+                # O usuário acabou de ser criado, então só o CPF pode colidir
+                raise serializers.ValidationError({"cpf": "Este CPF já está em uso."})
+            return user
+
+        return executar_com_retentativa(operacao)
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -69,4 +80,13 @@ class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'is_staff')
-        read_only_fields = ('id', 'is_staff') 
\ No newline at end of file
+        read_only_fields = ('id', 'is_staff') 
+
+class TokenClienteSerializer(TokenObtainPairSerializer):
+    """Login que emite tokens com as claims de cliente (ver RefreshTokenCliente)"""
+    token_class = RefreshTokenCliente
+
+
+class TokenRefreshClienteSerializer(TokenRefreshSerializer):
+    """Refresh que consulta a blacklist através do filtro de revogações"""
+    token_class = RefreshTokenCliente
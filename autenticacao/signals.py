@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import descartar_tokens_do_usuario
+
+
+@receiver([post_save, post_delete], sender=User)
+def descartar_tokens_em_cache(sender, instance, **kwargs):
+    # Desativação, troca de senha ou de permissões valem na próxima requisição
+    descartar_tokens_do_usuario(instance.pk)
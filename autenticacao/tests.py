@@ -1,3 +1,220 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from financeira_api.cache_lru import CacheLRU
+from servicos.models import Cliente, ContaBancaria
+
+from .authentication import cache_tokens
+from .hashers import gerar_hash_senha_async
+from .revogacao import FiltroBloom, FiltroRevogacoes, filtro_revogacoes, podar_tokens_expirados
+
+
+class CacheLRUTests(TestCase):
+    def test_descarta_o_menos_usado(self):
+        cache = CacheLRU(tamanho=2, ttl=60)
+        cache.guardar('a', 1, 60)
+        cache.guardar('b', 2, 60)
+        cache.obter('a')
+
+        cache.guardar('c', 3, 60)
+
+        self.assertEqual(cache.obter('a'), 1)
+        self.assertIsNone(cache.obter('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_expira(self):
+        cache = CacheLRU(tamanho=10, ttl=60)
+        with mock.patch('financeira_api.cache_lru.time.monotonic', return_value=1000):
+            cache.guardar('a', 1, 5)
+        with mock.patch('financeira_api.cache_lru.time.monotonic', return_value=1006):
+            self.assertIsNone(cache.obter('a'))
+
+    def test_validade_do_token_ja_vencida_nao_entra(self):
+        cache = CacheLRU(tamanho=10, ttl=60)
+        cache.guardar('a', 1, -1)
+
+        self.assertIsNone(cache.obter('a'))
+
+
+DADOS_REGISTRO = {
+    'username': 'novo', 'password': 'senha-forte-123', 'password2': 'senha-forte-123',
+    'email': 'novo@exemplo.com', 'first_name': 'Novo', 'last_name': 'Cliente',
+    'cpf': '111.111.111-11', 'data_nascimento': '1990-01-01',
+    'telefone': '11999999999', 'endereco': 'Rua B, 2'
+}
+
+
+class RegistroTests(APITestCase):
+    def test_registro(self):
+        # Usuário e cliente num único INSERT cada, sem consultas prévias
+        with self.assertNumQueries(4):
+            resposta = self.client.post('/api/auth/registro/', DADOS_REGISTRO)
+
+        self.assertEqual(resposta.status_code, 201, resposta.json())
+        self.assertNotIn('cpf', resposta.json())
+        user = User.objects.get(username='novo')
+        self.assertTrue(user.check_password('senha-forte-123'))
+        self.assertEqual(user.cliente.cpf, '111.111.111-11')
+
+    def test_cpf_duplicado_nao_cria_usuario(self):
+        self.client.post('/api/auth/registro/', DADOS_REGISTRO)
+
+        resposta = self.client.post('/api/auth/registro/', {**DADOS_REGISTRO, 'username': 'outro'})
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('cpf', resposta.json())
+        self.assertFalse(User.objects.filter(username='outro').exists())
+
+    def test_username_duplicado(self):
+        self.client.post('/api/auth/registro/', DADOS_REGISTRO)
+
+        resposta = self.client.post('/api/auth/registro/', {**DADOS_REGISTRO, 'cpf': '222.222.222-22'})
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('username', resposta.json())
+        self.assertFalse(Cliente.objects.filter(cpf='222.222.222-22').exists())
+
+    def test_custo_do_hash_configuravel(self):
+        with self.settings(PASSWORD_PBKDF2_ITERACOES=1000):
+            self.client.post('/api/auth/registro/', DADOS_REGISTRO)
+
+        algoritmo, iteracoes, _, _ = User.objects.get(username='novo').password.split('$')
+        self.assertEqual((algoritmo, iteracoes), ('pbkdf2_sha256', '1000'))
+
+    def test_registro_aguarda_o_hash_no_pool(self):
+        with mock.patch('autenticacao.views.gerar_hash_senha_async', wraps=gerar_hash_senha_async) as hash_async:
+            resposta = self.client.post('/api/auth/registro/', DADOS_REGISTRO)
+
+        self.assertEqual(resposta.status_code, 201)
+        hash_async.assert_awaited_once_with('senha-forte-123')
+
+    def test_hash_assincrono(self):
+        with self.settings(PASSWORD_PBKDF2_ITERACOES=1000):
+            senha = async_to_sync(gerar_hash_senha_async)('senha-forte-123')
+
+        self.assertTrue(senha.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('senha-forte-123', senha))
+
+
+class AutenticacaoJWTTests(APITestCase):
+    def setUp(self):
+        cache_tokens.limpar()
+        filtro_revogacoes.limpar()
+        self.user = User.objects.create_user('cliente', password='senha-forte-123')
+        self.cliente = Cliente.objects.create(
+            user=self.user, cpf='000.000.000-00', data_nascimento='1990-01-01',
+            telefone='11999999999', endereco='Rua A, 1'
+        )
+        resposta = self.client.post('/api/auth/login/', {
+            'username': 'cliente', 'password': 'senha-forte-123'
+        })
+        self.refresh = resposta.data['refresh']
+        self.access = resposta.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_claims_de_cliente(self):
+        token = AccessToken(self.access)
+
+        self.assertEqual(token['cliente_id'], self.cliente.id)
+        self.assertFalse(token['is_staff'])
+        self.assertIn('refresh_jti', token.payload)
+
+    def test_token_em_cache_nao_consulta_o_banco(self):
+        ContaBancaria.objects.create(cliente=self.cliente, numero_conta='1', agencia='0001', tipo_conta='CC')
+        self.client.get('/api/v1/contas/')
+
+        # Apenas contagem e página das contas, sem usuário nem cliente (outra
+        # URL, para não ser servida pelo cache de listagens)
+        with self.assertNumQueries(2):
+            resposta = self.client.get('/api/v1/contas/?page=1')
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_logout_revoga_o_access_token(self):
+        self.client.get('/api/v1/contas/')
+
+        resposta = self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        self.assertEqual(resposta.status_code, 205)
+
+        resposta = self.client.get('/api/v1/contas/')
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_usuario_desativado(self):
+        self.client.get('/api/v1/contas/')
+
+        self.user.is_active = False
+        self.user.save()
+
+        resposta = self.client.get('/api/v1/contas/')
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_refresh(self):
+        resposta = self.client.post('/api/auth/login/refresh/', {'refresh': self.refresh})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(AccessToken(resposta.data['access'])['cliente_id'], self.cliente.id)
+
+    def test_refresh_revogado(self):
+        self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+
+        resposta = self.client.post('/api/auth/login/refresh/', {'refresh': self.refresh})
+
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_refresh_nao_revogado_nao_consulta_a_blacklist(self):
+        filtro_revogacoes.reconstruir()
+
+        with mock.patch.object(BlacklistedToken.objects, 'filter') as filtro:
+            resposta = self.client.post('/api/auth/login/refresh/', {'refresh': self.refresh})
+        self.assertEqual(resposta.status_code, 200)
+        filtro.assert_not_called()
+
+
+def criar_token(user, jti, expira_em):
+    return OutstandingToken.objects.create(user=user, jti=jti, token='-', expires_at=expira_em)
+
+
+class FiltroRevogacoesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cliente')
+
+    def test_bloom_sem_falsos_negativos(self):
+        filtro = FiltroBloom(1000)
+        for i in range(1000):
+            filtro.adicionar(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in filtro for i in range(1000)))
+        falsos_positivos = sum(f'outro-{i}' in filtro for i in range(10000))
+        self.assertLess(falsos_positivos, 50)
+
+    def test_sincroniza_revogacoes_de_outros_processos(self):
+        revogacoes = FiltroRevogacoes(intervalo_sincronizacao=0)
+        amanha = timezone.now() + timedelta(days=1)
+        self.assertFalse(revogacoes.esta_revogado('a'))
+
+        BlacklistedToken.objects.create(token=criar_token(self.user, 'a', amanha))
+
+        self.assertTrue(revogacoes.esta_revogado('a'))
+        self.assertFalse(revogacoes.esta_revogado('b'))
+
+    def test_podar_tokens_expirados(self):
+        agora = timezone.now()
+        for i in range(7):
+            token = criar_token(self.user, f'velho-{i}', agora - timedelta(days=1))
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        criar_token(self.user, 'novo', agora + timedelta(days=1))
+
+        removidos = podar_tokens_expirados(tamanho_bloco=3)
 
-# Create your tests here.
+        self.assertEqual(removidos, 7)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['novo'])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,35 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from servicos.models import Cliente
+
+from .revogacao import filtro_revogacoes
+
+
+# Claim com o jti do refresh token que originou o access token
+CLAIM_REFRESH_JTI = 'refresh_jti'
+
+
+class RefreshTokenCliente(RefreshToken):
+    """
+    Refresh token com as claims `cliente_id`, `is_staff` e `refresh_jti`.
+
+    As claims são copiadas para os access tokens derivados dele, o que
+    permite às views filtrar pelo cliente sem consultar o usuário e à
+    autenticação recusar access tokens cujo refresh foi revogado.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['cliente_id'] = Cliente.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+        token['is_staff'] = user.is_staff
+        token[CLAIM_REFRESH_JTI] = token[api_settings.JTI_CLAIM]
+        return token
+
+    def check_blacklist(self):
+        """Como o original, mas só consulta o banco se o filtro de revogações não descartar o jti"""
+        if filtro_revogacoes.esta_revogado(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
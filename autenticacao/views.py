@@ -1,19 +1,42 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
 from django.shortcuts import render
-from rest_framework import generics, permissions, status
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from .authentication import descartar_tokens_do_refresh
+from .hashers import gerar_hash_senha_async
+from .revogacao import filtro_revogacoes
 from .serializers import RegistroSerializer, UsuarioSerializer
+from .tokens import RefreshTokenCliente
 
 
-class RegistroView(generics.CreateAPIView):
+@csrf_exempt
+@require_POST
+async def registro(request):
     """
-    View para registrar um novo usuário
+    View para registrar um novo usuário.
+
+    O DRF não tem views assíncronas: esta é uma view `async def` do Django
+    que valida com o RegistroSerializer, aguarda o hash da senha no pool de
+    hash sem ocupar o worker e só então grava usuário e cliente (ORM
+    síncrono, numa thread). As respostas são as mesmas do CreateAPIView.
     """
-    queryset = User.objects.all()
-    permission_classes = [permissions.AllowAny]
-    serializer_class = RegistroSerializer
+    requisicao = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+    try:
+        serializer = RegistroSerializer(data=requisicao.data)
+        serializer.is_valid(raise_exception=True)
+        senha = await gerar_hash_senha_async(serializer.validated_data['password'])
+        await sync_to_async(serializer.save)(senha_hash=senha)
+    except exceptions.APIException as erro:
+        dados = erro.detail if isinstance(erro.detail, (list, dict)) else {'detail': erro.detail}
+        return JsonResponse(dados, status=erro.status_code, safe=False, json_dumps_params={'ensure_ascii': False})
+    return JsonResponse(serializer.data, status=status.HTTP_201_CREATED, json_dumps_params={'ensure_ascii': False})
 
 
 class UsuarioView(generics.RetrieveAPIView):
@@ -36,8 +59,10 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = RefreshTokenCliente(refresh_token)
             token.blacklist()
+            filtro_revogacoes.adicionar(token['jti'])
+            descartar_tokens_do_refresh(token['jti'])
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,56 @@
+"""
+Cache LRU em processo, com expiração por entrada.
+
+Usado onde uma consulta ao cache compartilhado custaria mais do que o que ele
+economiza: os tokens verificados de `autenticacao.authentication` e as
+respostas idempotentes de `servicos.idempotencia`. Cada processo tem o seu;
+quem precisa invalidar entre processos limita a validade das entradas.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Cache LRU com expiração por entrada, seguro entre threads"""
+
+    def __init__(self, tamanho, ttl):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada[1]
+
+    def guardar(self, chave, valor, validade):
+        """Guarda por até `validade` segundos (limitado ao TTL do cache)"""
+        validade = min(validade, self.ttl)
+        if validade <= 0:
+            return
+        with self._lock:
+            self._entradas[chave] = (time.monotonic() + validade, valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho:
+                self._entradas.popitem(last=False)
+
+    def descartar(self, predicado):
+        """Remove as entradas cujo valor satisfaz o predicado"""
+        with self._lock:
+            for chave in [chave for chave, (_, valor) in self._entradas.items() if predicado(valor)]:
+                del self._entradas[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
@@ -0,0 +1,90 @@
+"""
+Roteamento das leituras para a réplica do banco.
+
+O middleware marca as requisições de leitura (GET, HEAD, OPTIONS) atendidas
+por views com `leitura_em_replica = True` (os viewsets de `servicos`). Nessas
+requisições as leituras fora de transação vão para o alias `replica`; a
+primeira escrita fixa a requisição no primário, para que ela leia o que
+acabou de gravar. Sem o alias `replica` configurado, tudo vai para o
+primário.
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+ALIAS_REPLICA = 'replica'
+METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+_requisicao = contextvars.ContextVar('roteamento_requisicao', default=None)
+
+
+class EstadoRoteamento:
+    __slots__ = ('leitura', 'fixado_no_primario')
+
+    def __init__(self):
+        self.leitura = False
+        self.fixado_no_primario = False
+
+
+class RoteadorReplica:
+    def __init__(self):
+        self.replica = ALIAS_REPLICA if ALIAS_REPLICA in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints):
+        estado = _requisicao.get()
+        if (self.replica is None or estado is None or not estado.leitura
+                or estado.fixado_no_primario or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return self.replica
+
+    def db_for_write(self, model, **hints):
+        estado = _requisicao.get()
+        if estado is not None:
+            estado.fixado_no_primario = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema pela replicação
+        return db != ALIAS_REPLICA
+
+
+class RoteamentoReplicaMiddleware:
+    # Sob ASGI não força a passagem da requisição por uma thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self._chamar_assincrono(request)
+        token = _requisicao.set(EstadoRoteamento())
+        try:
+            return self.get_response(request)
+        finally:
+            _requisicao.reset(token)
+
+    async def _chamar_assincrono(self, request):
+        token = _requisicao.set(EstadoRoteamento())
+        try:
+            return await self.get_response(request)
+        finally:
+            _requisicao.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        estado = _requisicao.get()
+        classe = getattr(view_func, 'cls', None)
+        if estado is not None and request.method in METODOS_LEITURA and \
+                getattr(classe, 'leitura_em_replica', False):
+            estado.leitura = True
@@ -65,6 +65,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'financeira_api.roteamento.RoteamentoReplicaMiddleware',
 ]
 
 # Configurações do CORS
@@ -95,12 +96,70 @@ WSGI_APPLICATION = 'financeira_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configurado por variáveis de ambiente; sem elas, SQLite local.
+# DB_ENGINE: sqlite3 ou postgresql. Com DB_POOL=True (PostgreSQL, requer
+# psycopg[pool]) as conexões vêm do pool do psycopg em vez de persistentes.
+# DB_REPLICA_NAME (ou DB_REPLICA_HOST) cria o alias `replica`, usado nas
+# leituras dos viewsets de servicos (ver financeira_api.roteamento).
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+
+# Perfil opcional para implantações em SQLite (DB_SQLITE_OTIMIZADO=True),
+# aplicado a cada nova conexão: WAL (leitores não bloqueiam o escritor),
+# synchronous=NORMAL (seguro com WAL), mmap e cache maiores, espera pelo lock
+# em vez de erro imediato e BEGIN IMMEDIATE nos blocos atomic, que reserva a
+# escrita no início da transação e evita o "database is locked" de quem
+# tenta promover uma leitura a escrita no meio dela.
+SQLITE_OPCOES_OTIMIZADAS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(os.getenv('DB_SQLITE_MMAP', 256 * 2 ** 20))}",
+        # Negativo: tamanho em KiB
+        f"PRAGMA cache_size={-int(os.getenv('DB_SQLITE_CACHE_KB', 64000))}",
+    ]),
+    # busy_timeout, em segundos
+    'timeout': float(os.getenv('DB_SQLITE_TIMEOUT', '20')),
+    'transaction_mode': 'IMMEDIATE',
+}
+
+
+def configuracao_banco(prefixo, padrao=None):
+    """Configuração de um alias a partir das variáveis <prefixo>_NAME, _HOST..."""
+    padrao = padrao or {}
+    # O arquivo local só é o padrão no SQLite; no PostgreSQL o nome é obrigatório
+    nome_padrao = BASE_DIR / 'db.sqlite3' if DB_ENGINE == 'sqlite3' else ''
+    banco = {
+        'ENGINE': f'django.db.backends.{DB_ENGINE}',
+        'NAME': os.getenv(f'{prefixo}_NAME', padrao.get('NAME', nome_padrao)),
+        # Padrão do Django: uma conexão por requisição
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
+    if DB_ENGINE == 'postgresql':
+        for campo, valor in (('USER', ''), ('PASSWORD', ''), ('HOST', 'localhost'), ('PORT', '5432')):
+            banco[campo] = os.getenv(f'{prefixo}_{campo}', padrao.get(campo, valor))
+        if os.getenv('DB_POOL', 'False') == 'True':
+            # O pool do psycopg não convive com conexões persistentes
+            banco['CONN_MAX_AGE'] = 0
+            banco['OPTIONS'] = {'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX', '10')),
+                'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+            }}
+    elif os.getenv('DB_SQLITE_OTIMIZADO', 'False') == 'True':
+        banco['OPTIONS'] = dict(SQLITE_OPCOES_OTIMIZADAS)
+    return banco
+
+
+DATABASES = {
+    'default': configuracao_banco('DB'),
 }
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = configuracao_banco('DB_REPLICA', DATABASES['default'])
+    # Nos testes a réplica é o próprio banco de testes do primário
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['financeira_api.roteamento.RoteadorReplica']
 
 
 # Password validation
@@ -121,10 +180,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hash de senhas: PBKDF2 com custo ajustável por ambiente (0 = padrão do
+# Django) e pool limitado de threads para os hashes do cadastro
+PASSWORD_HASHERS = [
+    'autenticacao.hashers.PBKDF2CustoConfiguravel',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERACOES = int(os.getenv('PASSWORD_PBKDF2_ITERACOES', '0')) or None
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or os.cpu_count()
+
 # Configurações do REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'autenticacao.authentication.JWTCacheAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -144,7 +216,54 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_OBTAIN_SERIALIZER': 'autenticacao.serializers.TokenClienteSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'autenticacao.serializers.TokenRefreshClienteSerializer',
+}
+
+# Cache em processo dos tokens JWT já verificados
+JWT_CACHE_TTL = int(os.getenv('JWT_CACHE_TTL', '60'))
+JWT_CACHE_TAMANHO = int(os.getenv('JWT_CACHE_TAMANHO', '10000'))
+# Intervalo (s) da sincronização incremental do filtro de tokens revogados
+JWT_REVOGACOES_SINCRONIZACAO = int(os.getenv('JWT_REVOGACOES_SINCRONIZACAO', '30'))
+
+# Caches. `default` guarda os resumos dos clientes (servicos.resumo) e
+# `listagens`, as respostas das listagens da API (servicos.cache_listagens);
+# o LocMemCache descarta as entradas menos usadas ao passar de MAX_ENTRIES.
+# O LocMemCache existe separado em cada processo: a invalidação feita por um
+# worker não alcança os demais, que servem o valor antigo até a validade
+# expirar. Com mais de um worker use um backend compartilhado (Redis,
+# Memcached, DatabaseCache); sem ele a validade padrão é curta, pois é ela que
+# limita por quanto tempo os outros processos ficam desatualizados
+# (`manage.py check --deploy` avisa).
+CACHE_LOCAL = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', CACHE_LOCAL)
+CACHE_LISTAGENS_BACKEND = os.getenv('CACHE_LISTAGENS_BACKEND', CACHE_LOCAL)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    'listagens': {
+        'BACKEND': CACHE_LISTAGENS_BACKEND,
+        'LOCATION': os.getenv('CACHE_LISTAGENS_LOCATION', 'listagens'),
+        'TIMEOUT': int(os.getenv('CACHE_LISTAGENS_TTL', '30' if CACHE_LISTAGENS_BACKEND == CACHE_LOCAL else '300')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_LISTAGENS_MAX_ENTRADAS', '5000'))},
+    },
 }
+# Validade (s) do resumo de cada cliente no cache `default`
+CACHE_RESUMO_TTL = int(os.getenv('CACHE_RESUMO_TTL', '30' if CACHE_BACKEND == CACHE_LOCAL else '300'))
+
+# Validade (s) das Idempotency-Keys e tamanho do cache de respostas em memória
+IDEMPOTENCIA_VALIDADE = int(os.getenv('IDEMPOTENCIA_VALIDADE', '86400'))
+IDEMPOTENCIA_CACHE_TAMANHO = int(os.getenv('IDEMPOTENCIA_CACHE_TAMANHO', '10000'))
+
+# Log de auditoria das movimentações de saldo: 'banco' (tabela EventoSaldo)
+# ou 'arquivo' (segmentos NDJSON em AUDITORIA_DIRETORIO)
+AUDITORIA_DESTINO = os.getenv('AUDITORIA_DESTINO', 'banco')
+AUDITORIA_DIRETORIO = Path(os.getenv('AUDITORIA_DIRETORIO', BASE_DIR / 'auditoria'))
+AUDITORIA_TAMANHO_SEGMENTO = int(os.getenv('AUDITORIA_TAMANHO_SEGMENTO', str(64 * 2 ** 20)))
+AUDITORIA_TAMANHO_LOTE = int(os.getenv('AUDITORIA_TAMANHO_LOTE', '500'))
+AUDITORIA_INTERVALO = float(os.getenv('AUDITORIA_INTERVALO', '1.0'))
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
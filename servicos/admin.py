@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cliente, ContaBancaria, Transacao, Emprestimo, Investimento
+from .models import Cliente, ContaBancaria, SaldoDiario, Transacao, Emprestimo, Investimento
 
 
 @admin.register(Cliente)
@@ -23,6 +23,13 @@ class TransacaoAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'status', 'data_transacao')
 
 
+@admin.register(SaldoDiario)
+class SaldoDiarioAdmin(admin.ModelAdmin):
+    list_display = ('conta', 'data', 'saldo')
+    search_fields = ('conta__numero_conta',)
+    list_filter = ('data',)
+
+
 @admin.register(Emprestimo)
 class EmprestimoAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'valor_solicitado', 'valor_aprovado', 'taxa_juros', 'status', 'data_solicitacao')
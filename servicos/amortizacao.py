@@ -0,0 +1,199 @@
+"""
+Cronogramas de amortização de empréstimos (Tabela Price e SAC).
+
+Os valores seguem o arredondamento bancário usual: juros de cada período
+arredondados ao centavo (ROUND_HALF_UP) sobre o saldo devedor, prestação fixa
+(Price) ou amortização fixa (SAC) arredondadas uma vez, e a última parcela
+absorve o resíduo para que o saldo devedor termine exatamente em zero. Quando
+o arredondamento para cima faria a amortização passar do saldo (valores muito
+pequenos), ela é limitada ao saldo restante e o saldo nunca fica negativo.
+
+`cronograma` calcula um empréstimo com Decimal. `cronogramas_em_lote` calcula
+milhares de empréstimos de uma vez em centavos inteiros, período a período
+sobre colunas (arrays), com o mesmo resultado centavo a centavo.
+"""
+import calendar
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+
+PRICE = 'PRICE'
+SAC = 'SAC'
+SISTEMAS = (PRICE, SAC)
+
+CENTAVO = Decimal('0.01')
+
+
+@dataclass
+class Parcela:
+    numero: int
+    data_vencimento: date
+    prestacao: Decimal
+    juros: Decimal
+    amortizacao: Decimal
+    saldo_devedor: Decimal
+
+
+def adicionar_meses(data, meses):
+    """Soma meses de calendário, limitando o dia ao último dia do mês (31/01 + 1 = 28/02)"""
+    indice = data.month - 1 + meses
+    ano, mes = data.year + indice // 12, indice % 12 + 1
+    return date(ano, mes, min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def _centavos(valor):
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+@lru_cache(maxsize=4096)
+def fator_price(taxa_juros, prazo_meses):
+    """Fator i / (1 - (1 + i)^-n) da Tabela Price, com a taxa em % ao mês"""
+    taxa = taxa_juros / 100
+    if not taxa:
+        return 1 / Decimal(prazo_meses)
+    return taxa / (1 - (1 + taxa) ** -prazo_meses)
+
+
+def prestacao_price(principal, taxa_juros, prazo_meses):
+    return _centavos(principal * fator_price(taxa_juros, prazo_meses))
+
+
+def amortizacao_sac(principal, prazo_meses):
+    return _centavos(principal / prazo_meses)
+
+
+def _validar(principal, prazo_meses, sistema):
+    if sistema not in SISTEMAS:
+        raise ValueError(f'Sistema de amortização inválido: {sistema}.')
+    if prazo_meses < 1:
+        raise ValueError('O prazo deve ser de pelo menos um mês.')
+    if principal <= 0:
+        raise ValueError('O valor financiado deve ser positivo.')
+
+
+def cronograma(principal, taxa_juros, prazo_meses, sistema=PRICE, data_inicial=None):
+    """
+    Parcelas de um empréstimo. A parcela `k` vence `k` meses após
+    `data_inicial` (hoje, se omitida).
+    """
+    principal, taxa_juros = _centavos(Decimal(principal)), Decimal(taxa_juros)
+    _validar(principal, prazo_meses, sistema)
+    data_inicial = data_inicial or date.today()
+    taxa = taxa_juros / 100
+    fixo = (
+        prestacao_price(principal, taxa_juros, prazo_meses) if sistema == PRICE
+        else amortizacao_sac(principal, prazo_meses)
+    )
+
+    parcelas = []
+    saldo = principal
+    for numero in range(1, prazo_meses + 1):
+        juros = _centavos(saldo * taxa)
+        if numero == prazo_meses:
+            amortizacao = saldo
+        elif sistema == PRICE:
+            amortizacao = min(fixo - juros, saldo)
+        else:
+            amortizacao = min(fixo, saldo)
+        saldo -= amortizacao
+        parcelas.append(Parcela(
+            numero=numero,
+            data_vencimento=adicionar_meses(data_inicial, numero),
+            prestacao=juros + amortizacao,
+            juros=juros,
+            amortizacao=amortizacao,
+            saldo_devedor=saldo,
+        ))
+    return parcelas
+
+
+class CronogramaLote:
+    """
+    Resultado de `cronogramas_em_lote`, em colunas de centavos inteiros.
+
+    As linhas estão em ordem de período (todas as primeiras parcelas, depois
+    as segundas...). `emprestimo` é o índice do empréstimo na entrada e a
+    data de vencimento de cada linha é adicionar_meses(data_inicial, numero).
+    """
+
+    def __init__(self):
+        self.emprestimo = array('q')
+        self.numero = array('q')
+        self.prestacao = array('q')
+        self.juros = array('q')
+        self.amortizacao = array('q')
+        self.saldo_devedor = array('q')
+
+    def __len__(self):
+        return len(self.numero)
+
+    def por_emprestimo(self):
+        """{indice: [(numero, prestacao, juros, amortizacao, saldo_devedor), ...]} em centavos"""
+        resultado = {}
+        for linha in zip(self.emprestimo, self.numero, self.prestacao,
+                         self.juros, self.amortizacao, self.saldo_devedor):
+            resultado.setdefault(linha[0], []).append(linha[1:])
+        return resultado
+
+
+def _dividir_arredondando(numerador, denominador):
+    """numerador / denominador arredondado como ROUND_HALF_UP (denominador positivo)"""
+    if numerador >= 0:
+        return (2 * numerador + denominador) // (2 * denominador)
+    return -((-2 * numerador + denominador) // (2 * denominador))
+
+
+def cronogramas_em_lote(emprestimos):
+    """
+    Calcula de uma vez os cronogramas de uma carteira.
+
+    `emprestimos` é uma sequência de (principal, taxa_juros, prazo_meses,
+    sistema). Os valores fixos de cada empréstimo saem das mesmas funções do
+    cálculo individual (com o fator da Price em cache por taxa e prazo); os
+    períodos são então percorridos em centavos inteiros, com os empréstimos
+    ativos mantidos como prefixo das colunas (ordenadas por prazo).
+    """
+    ordem = sorted(range(len(emprestimos)), key=lambda indice: -emprestimos[indice][2])
+    saldos, fixos, prazos, price, numeradores, denominadores = [], [], [], [], [], []
+    for indice in ordem:
+        principal, taxa_juros, prazo_meses, sistema = emprestimos[indice]
+        principal, taxa_juros = _centavos(Decimal(principal)), Decimal(taxa_juros)
+        _validar(principal, prazo_meses, sistema)
+        fixo = (
+            prestacao_price(principal, taxa_juros, prazo_meses) if sistema == PRICE
+            else amortizacao_sac(principal, prazo_meses)
+        )
+        # Juros = saldo * taxa / 100, com a taxa como fração exata
+        numerador, denominador = taxa_juros.as_integer_ratio()
+        saldos.append(int(principal * 100))
+        fixos.append(int(fixo * 100))
+        prazos.append(prazo_meses)
+        price.append(sistema == PRICE)
+        numeradores.append(numerador)
+        denominadores.append(denominador * 100)
+
+    resultado = CronogramaLote()
+    ativos = len(ordem)
+    for numero in range(1, (prazos[0] if prazos else 0) + 1):
+        while ativos and prazos[ativos - 1] < numero:
+            ativos -= 1
+        juros = [
+            _dividir_arredondando(saldo * numerador, denominador)
+            for saldo, numerador, denominador in zip(saldos[:ativos], numeradores, denominadores)
+        ]
+        amortizacoes = [
+            saldo if prazo == numero else min(fixo - j if e_price else fixo, saldo)
+            for saldo, j, fixo, prazo, e_price in zip(saldos[:ativos], juros, fixos, prazos, price)
+        ]
+        saldos[:ativos] = [saldo - a for saldo, a in zip(saldos, amortizacoes)]
+
+        resultado.emprestimo.extend(ordem[:ativos])
+        resultado.numero.extend([numero] * ativos)
+        resultado.prestacao.extend([j + a for j, a in zip(juros, amortizacoes)])
+        resultado.juros.extend(juros)
+        resultado.amortizacao.extend(amortizacoes)
+        resultado.saldo_devedor.extend(saldos[:ativos])
+    return resultado
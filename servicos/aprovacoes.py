@@ -0,0 +1,157 @@
+"""
+Aprovação de empréstimos em lote.
+
+Cada bloco de empréstimos é aprovado numa transação: os empréstimos e as
+contas de crédito (a conta ativa mais recente de cada cliente) são travados com
+uma consulta cada, os empréstimos aprovados são atualizados com um único
+UPDATE (vencimento por prazo e valor aprovado por valor, em CASEs agrupados),
+os depósitos são inseridos com bulk_create e cada conta recebe apenas a soma
+dos seus créditos. Um empréstimo recusado não afeta os demais
+do bloco.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DateField, DecimalField, F, Value, When
+from django.utils import timezone
+
+from .amortizacao import adicionar_meses
+from .auditoria import registrar_movimentos
+from .lancamentos import aplicar_deltas_em_lote, contas_de_credito, executar_com_retentativa
+from .models import ContaBancaria, Emprestimo, Transacao
+
+
+APROVACAO_MAX_ITENS = 10000
+APROVACAO_TAMANHO_BLOCO = 500
+
+
+class ErroAprovacao(Exception):
+    """Empréstimo que não pode ser aprovado"""
+
+
+def _atualizar_aprovados(aprovados, hoje, agora):
+    """
+    Grava a aprovação com um UPDATE: o vencimento depende só do prazo e o
+    valor aprovado, quando difere do solicitado, é agrupado por valor.
+    """
+    if not aprovados:
+        return
+    por_prazo = defaultdict(list)
+    por_valor = defaultdict(list)
+    for emprestimo in aprovados:
+        por_prazo[emprestimo.data_vencimento].append(emprestimo.id)
+        if emprestimo.valor_aprovado != emprestimo.valor_solicitado:
+            por_valor[emprestimo.valor_aprovado].append(emprestimo.id)
+    campo_valor = DecimalField(max_digits=12, decimal_places=2)
+    Emprestimo.objects.filter(pk__in=[emprestimo.id for emprestimo in aprovados]).update(
+        status='APR',
+        data_aprovacao=hoje,
+        updated_at=agora,
+        data_vencimento=Case(
+            *[When(pk__in=ids, then=Value(vencimento)) for vencimento, ids in por_prazo.items()],
+            output_field=DateField()
+        ),
+        valor_aprovado=Case(
+            *[When(pk__in=ids, then=Value(valor, campo_valor)) for valor, ids in por_valor.items()],
+            default=F('valor_solicitado'),
+            output_field=campo_valor
+        )
+    )
+
+
+def _aprovar_bloco(itens):
+    """Aprova um bloco de (indice, emprestimo_id, valor_aprovado | None), sem repetições"""
+    emprestimos = {
+        emprestimo.id: emprestimo
+        for emprestimo in Emprestimo.objects.select_for_update()
+        .filter(pk__in=[emprestimo_id for _, emprestimo_id, _ in itens])
+        .order_by('pk')
+        .only('id', 'cliente_id', 'status', 'valor_solicitado', 'prazo_meses')
+    }
+    contas_por_cliente = contas_de_credito({emprestimo.cliente_id for emprestimo in emprestimos.values()})
+    saldos = dict(
+        ContaBancaria.objects.select_for_update()
+        .filter(pk__in=contas_por_cliente.values())
+        .order_by('pk')
+        .values_list('id', 'saldo')
+    )
+
+    hoje = timezone.localdate()
+    agora = timezone.now()
+    # Vencimento da última parcela por prazo, somando meses de calendário
+    vencimentos = {}
+    resultados = {}
+    aprovados = []
+    transacoes = []
+    movimentos = []
+    deltas = defaultdict(Decimal)
+    for indice, emprestimo_id, valor_aprovado in itens:
+        emprestimo = emprestimos.get(emprestimo_id)
+        if emprestimo is None:
+            resultados[indice] = ErroAprovacao('Empréstimo não encontrado.')
+            continue
+        if emprestimo.status != 'SOL':
+            resultados[indice] = ErroAprovacao(
+                'Este empréstimo não está em status de solicitação para ser aprovado.'
+            )
+            continue
+        conta_id = contas_por_cliente.get(emprestimo.cliente_id)
+        if conta_id not in saldos:
+            resultados[indice] = ErroAprovacao('O cliente não possui conta ativa para o crédito.')
+            continue
+
+        emprestimo.valor_aprovado = valor_aprovado if valor_aprovado is not None else emprestimo.valor_solicitado
+        emprestimo.status = 'APR'
+        emprestimo.data_aprovacao = hoje
+        emprestimo.data_vencimento = vencimentos.setdefault(
+            emprestimo.prazo_meses, adicionar_meses(hoje, emprestimo.prazo_meses)
+        )
+        emprestimo.updated_at = agora
+        transacao = Transacao(
+            conta_origem_id=conta_id,
+            tipo='DEP',
+            valor=emprestimo.valor_aprovado,
+            descricao=f'Empréstimo aprovado - ID: {emprestimo.id}',
+            status='CON',
+            data_transacao=agora
+        )
+        saldos[conta_id] += emprestimo.valor_aprovado
+        deltas[conta_id] += emprestimo.valor_aprovado
+        movimentos.append((transacao.id_transacao, conta_id, emprestimo.valor_aprovado, saldos[conta_id]))
+        aprovados.append(emprestimo)
+        transacoes.append(transacao)
+        resultados[indice] = (emprestimo, transacao)
+
+    _atualizar_aprovados(aprovados, hoje, agora)
+    Transacao.objects.bulk_create(transacoes)
+    # Emite saldos_alterados para os clientes creditados, o que também
+    # invalida os caches que incluem os empréstimos atualizados
+    aplicar_deltas_em_lote(deltas)
+    registrar_movimentos(movimentos)
+    return resultados
+
+
+def aprovar_emprestimos(itens, tamanho_bloco=APROVACAO_TAMANHO_BLOCO):
+    """
+    Aprova os empréstimos de `itens`, uma lista de pares (indice, dados
+    validados pelo AprovacaoLoteSerializer); sem `valor_aprovado`, aprova o
+    valor solicitado. Cada bloco é confirmado na sua própria transação,
+    repetida em caso de conflito de concorrência.
+
+    Retorna {indice: (Emprestimo, Transacao) | ErroAprovacao}.
+    """
+    resultados = {}
+    vistos = set()
+    unicos = []
+    for indice, dados in itens:
+        emprestimo_id = dados['emprestimo_id']
+        if emprestimo_id in vistos:
+            resultados[indice] = ErroAprovacao('Empréstimo repetido no lote.')
+            continue
+        vistos.add(emprestimo_id)
+        unicos.append((indice, emprestimo_id, dados.get('valor_aprovado')))
+
+    for inicio in range(0, len(unicos), tamanho_bloco):
+        bloco = unicos[inicio:inicio + tamanho_bloco]
+        resultados.update(executar_com_retentativa(lambda: _aprovar_bloco(bloco)))
+    return resultados
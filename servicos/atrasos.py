@@ -0,0 +1,97 @@
+"""
+Marcação dos empréstimos em atraso (ATR).
+
+Um empréstimo aprovado cuja data de vencimento (a da última parcela) já
+passou é marcado como atrasado. A varredura percorre o índice
+(status, data_vencimento) em blocos, na ordem (data_vencimento, id), e marca
+cada bloco com um UPDATE na mesma transação em que avança o checkpoint
+(CheckpointVarredura); interrompida, a próxima execução com a mesma data de
+referência retoma do último bloco confirmado.
+"""
+import time
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .lancamentos import executar_com_retentativa
+from .models import CheckpointVarredura, Emprestimo
+from .signals import emprestimos_alterados
+
+
+NOME_VARREDURA_ATRASOS = 'emprestimos_atrasados'
+TAMANHO_BLOCO_ATRASOS = 5000
+
+
+def _iniciar(referencia, reiniciar):
+    """Retorna o checkpoint da varredura, zerado se não houver execução a retomar"""
+    agora = timezone.now()
+    checkpoint, criado = CheckpointVarredura.objects.get_or_create(
+        nome=NOME_VARREDURA_ATRASOS, defaults={'data_referencia': referencia, 'iniciada_em': agora}
+    )
+    retomada = not (criado or reiniciar or checkpoint.concluida_em or checkpoint.data_referencia != referencia)
+    if not retomada and not criado:
+        checkpoint.data_referencia = referencia
+        checkpoint.ultimo_vencimento = None
+        checkpoint.ultimo_id = 0
+        checkpoint.processados = 0
+        checkpoint.iniciada_em = agora
+        checkpoint.concluida_em = None
+        checkpoint.save()
+    return checkpoint, retomada
+
+
+def _marcar_bloco(checkpoint_id, tamanho_bloco):
+    """
+    Marca o próximo bloco após o checkpoint; retorna o checkpoint e a
+    quantidade marcada. Roda na transação aberta por executar_com_retentativa.
+    """
+    # Serializa execuções simultâneas da varredura
+    checkpoint = CheckpointVarredura.objects.select_for_update().get(pk=checkpoint_id)
+    pendentes = Emprestimo.objects.filter(status='APR', data_vencimento__lt=checkpoint.data_referencia)
+    if checkpoint.ultimo_vencimento is not None:
+        pendentes = pendentes.filter(
+            Q(data_vencimento__gt=checkpoint.ultimo_vencimento)
+            | Q(data_vencimento=checkpoint.ultimo_vencimento, id__gt=checkpoint.ultimo_id)
+        )
+    bloco = list(
+        pendentes.order_by('data_vencimento', 'id')
+        .values_list('id', 'cliente_id', 'data_vencimento')[:tamanho_bloco]
+    )
+    agora = timezone.now()
+    if not bloco:
+        checkpoint.concluida_em = agora
+        checkpoint.save(update_fields=['concluida_em'])
+        return checkpoint, 0
+
+    marcados = Emprestimo.objects.filter(pk__in=[id_ for id_, _, _ in bloco], status='APR').update(
+        status='ATR', updated_at=agora
+    )
+    checkpoint.ultimo_id, _, checkpoint.ultimo_vencimento = bloco[-1]
+    checkpoint.processados += marcados
+    checkpoint.save(update_fields=['ultimo_id', 'ultimo_vencimento', 'processados'])
+    emprestimos_alterados.send(
+        sender=Emprestimo, cliente_ids={cliente_id for _, cliente_id, _ in bloco}
+    )
+    return checkpoint, marcados
+
+
+def marcar_emprestimos_atrasados(referencia=None, tamanho_bloco=TAMANHO_BLOCO_ATRASOS, pausa=0.0,
+                                 reiniciar=False):
+    """
+    Marca como ATR os empréstimos aprovados com vencimento anterior a
+    `referencia` (padrão: hoje), em blocos de `tamanho_bloco`, cada um na sua
+    transação. Uma execução interrompida com a mesma referência é retomada, a
+    menos que `reiniciar` seja verdadeiro.
+
+    Retorna (checkpoint, marcados nesta chamada, retomada).
+    """
+    referencia = referencia or timezone.localdate()
+    checkpoint, retomada = _iniciar(referencia, reiniciar)
+    marcados = 0
+    while True:
+        checkpoint, quantidade = executar_com_retentativa(lambda: _marcar_bloco(checkpoint.pk, tamanho_bloco))
+        if checkpoint.concluida_em:
+            return checkpoint, marcados, retomada
+        marcados += quantidade
+        if pausa:
+            time.sleep(pausa)
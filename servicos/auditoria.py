@@ -0,0 +1,262 @@
+"""
+Trilha de auditoria das movimentações de saldo, com escrita adiada.
+
+O motor de lançamentos registra, para cada conta afetada, um EventoSaldo
+(delta, saldo resultante, usuário e operação de origem). Uma conta criada com
+saldo registra um evento de abertura (origem ORIGEM_ABERTURA) com esse saldo
+como delta, de modo que o saldo de cada conta é a soma dos seus deltas,
+qualquer que seja a ordem em que os eventos foram gravados. Os eventos entram
+numa fila em memória somente após o commit da transação e uma thread de
+fundo os grava em lotes: com bulk_create na tabela EventoSaldo ou, com
+AUDITORIA_DESTINO = 'arquivo', em segmentos NDJSON locais com rotação por
+tamanho. A requisição não espera pela gravação.
+
+A fila é descarregada quando o processo termina (atexit). Se o banco
+recusar um lote mesmo após as retentativas, ele é gravado nos segmentos
+locais para não se perder.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EventoSaldo
+
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 500
+INTERVALO_DESCARGA = 1.0  # segundos
+TENTATIVAS_GRAVACAO = 5
+CAMPOS = ('conta_id', 'transacao_id', 'delta', 'saldo_resultante', 'ator_id', 'origem', 'ocorrido_em')
+
+# (ator_id, origem) da operação em andamento
+_contexto = contextvars.ContextVar('contexto_auditoria', default=(None, ''))
+
+ORIGEM_ABERTURA = 'abertura'
+
+
+@contextmanager
+def contexto_auditoria(ator_id, origem):
+    """Define o usuário e a origem dos eventos registrados dentro do bloco"""
+    token = _contexto.set((ator_id, origem))
+    try:
+        yield
+    finally:
+        _contexto.reset(token)
+
+
+def auditado(metodo):
+    """
+    Decorator para ações de ViewSet que movimentam saldos: os eventos
+    registram o usuário autenticado e a origem `<basename>.<action>`.
+    """
+    @wraps(metodo)
+    def wrapper(self, request, *args, **kwargs):
+        with contexto_auditoria(request.user.pk, f'{self.basename}.{self.action}'):
+            return metodo(self, request, *args, **kwargs)
+    return wrapper
+
+
+class SegmentosArquivo:
+    """Arquivos NDJSON numerados em sequência, trocados ao atingir o tamanho máximo"""
+
+    def __init__(self, diretorio, tamanho_maximo):
+        self.diretorio = Path(diretorio)
+        self.tamanho_maximo = tamanho_maximo
+
+    def segmentos(self):
+        return sorted(self.diretorio.glob('eventos-*.ndjson'))
+
+    def _atual(self):
+        existentes = self.segmentos()
+        if existentes and existentes[-1].stat().st_size < self.tamanho_maximo:
+            return existentes[-1]
+        numero = int(existentes[-1].stem.split('-')[1]) + 1 if existentes else 1
+        return self.diretorio / f'eventos-{numero:06d}.ndjson'
+
+    def gravar(self, eventos):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        linhas = ''.join(
+            json.dumps({campo: getattr(evento, campo) for campo in CAMPOS}, default=str) + '\n'
+            for evento in eventos
+        )
+        with open(self._atual(), 'a', encoding='utf-8') as arquivo:
+            arquivo.write(linhas)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    def ler(self):
+        """Eventos gravados em todos os segmentos, em ordem"""
+        for caminho in self.segmentos():
+            with open(caminho, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    if not linha.strip():
+                        continue
+                    dados = json.loads(linha)
+                    yield EventoSaldo(
+                        conta_id=dados['conta_id'],
+                        transacao_id=dados['transacao_id'],
+                        delta=Decimal(dados['delta']),
+                        saldo_resultante=Decimal(dados['saldo_resultante']),
+                        ator_id=dados['ator_id'],
+                        origem=dados['origem'],
+                        ocorrido_em=parse_datetime(dados['ocorrido_em'])
+                    )
+
+
+def segmentos_configurados():
+    return SegmentosArquivo(
+        getattr(settings, 'AUDITORIA_DIRETORIO', Path(settings.BASE_DIR) / 'auditoria'),
+        getattr(settings, 'AUDITORIA_TAMANHO_SEGMENTO', 64 * 2 ** 20)
+    )
+
+
+class EscritorEventos:
+    """Fila em memória descarregada em lotes por uma thread de fundo"""
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, intervalo=INTERVALO_DESCARGA, capacidade=100000):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        # Limitada: se o banco não acompanhar, quem registra passa a esperar
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enfileirar(self, eventos):
+        self._iniciar()
+        for evento in eventos:
+            self._fila.put(evento)
+
+    def _iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar, name='escritor-auditoria', daemon=True
+                )
+                self._thread.start()
+
+    def _executar(self):
+        try:
+            while True:
+                lote = self._proximo_lote()
+                if not lote:
+                    continue
+                try:
+                    self.gravar(lote)
+                except Exception:
+                    logger.exception('Falha ao gravar %d eventos de saldo.', len(lote))
+                finally:
+                    for _ in lote:
+                        self._fila.task_done()
+        finally:
+            connections.close_all()
+
+    def _proximo_lote(self):
+        try:
+            lote = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            # Ocioso: libera a conexão até o próximo evento
+            connections.close_all()
+            return []
+        while len(lote) < self.tamanho_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def gravar(self, lote):
+        if getattr(settings, 'AUDITORIA_DESTINO', 'banco') == 'arquivo':
+            segmentos_configurados().gravar(lote)
+            return
+        espera = 0.05
+        for tentativa in range(1, TENTATIVAS_GRAVACAO + 1):
+            try:
+                EventoSaldo.objects.bulk_create(lote)
+                return
+            except OperationalError:
+                if tentativa == TENTATIVAS_GRAVACAO:
+                    break
+                time.sleep(espera)
+                espera *= 2
+        logger.error('Falha ao gravar %d eventos de saldo no banco; gravando em arquivo.', len(lote))
+        segmentos_configurados().gravar(lote)
+
+    def descarregar(self):
+        """Espera até que todos os eventos já enfileirados tenham sido gravados"""
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.join()
+            return
+        # Sem thread (ex.: no encerramento do interpretador): grava aqui mesmo
+        lote = []
+        while True:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        for inicio in range(0, len(lote), self.tamanho_lote):
+            self.gravar(lote[inicio:inicio + self.tamanho_lote])
+        for _ in lote:
+            self._fila.task_done()
+
+
+escritor = EscritorEventos(
+    getattr(settings, 'AUDITORIA_TAMANHO_LOTE', TAMANHO_LOTE),
+    getattr(settings, 'AUDITORIA_INTERVALO', INTERVALO_DESCARGA)
+)
+atexit.register(escritor.descarregar)
+
+
+def registrar_movimentos(movimentos, origem=None):
+    """
+    Registra as movimentações (transacao_id, conta_id, delta,
+    saldo_resultante) da transação de banco atual; os eventos só entram na
+    fila após o commit. Sem `origem`, vale a do contexto de auditoria.
+    """
+    ator_id, origem_do_contexto = _contexto.get()
+    origem = origem or origem_do_contexto
+    agora = timezone.now()
+    eventos = [
+        EventoSaldo(
+            conta_id=conta_id, transacao_id=transacao_id, delta=delta,
+            saldo_resultante=saldo, ator_id=ator_id, origem=origem, ocorrido_em=agora
+        )
+        for transacao_id, conta_id, delta, saldo in movimentos
+    ]
+    if eventos:
+        transaction.on_commit(lambda: escritor.enfileirar(eventos))
+
+
+def saldos_do_log(arquivos=False):
+    """
+    Saldo de cada conta pela soma dos deltas registrados, incluindo o evento
+    de abertura: uma agregação na tabela EventoSaldo ou, com `arquivos`, a
+    leitura dos segmentos locais. Não depende da ordem dos eventos, que com
+    vários processos gravando suas filas não é a ordem dos commits.
+    """
+    if not arquivos:
+        return dict(
+            EventoSaldo.objects.order_by().values('conta_id')
+            .annotate(total=Sum('delta')).values_list('conta_id', 'total')
+        )
+    saldos = {}
+    for evento in segmentos_configurados().ler():
+        saldos[evento.conta_id] = saldos.get(evento.conta_id, Decimal('0.00')) + evento.delta
+    return saldos
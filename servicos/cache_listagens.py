@@ -0,0 +1,76 @@
+"""
+Cache das respostas das listagens, por usuário e URL (inclui a query string).
+
+A chave de cada resposta inclui a versão do escopo de quem consulta: a do
+cliente, para usuários comuns, ou a versão global, para a equipe, que vê os
+dados de todos. Os sinais em `servicos.signals` renovam a versão do cliente
+afetado e a global a cada escrita; as entradas antigas deixam de ser lidas e
+saem pelo LRU do backend (LocMemCache limitado por MAX_ENTRIES, por padrão).
+
+O ETag é derivado da mesma chave, então um If-None-Match atual é respondido
+com 304 consultando apenas o cache, nunca o banco.
+
+Versões e respostas vivem no backend do alias `listagens`. Com um backend
+compartilhado a renovação vale para todos os workers; com o LocMemCache,
+apenas para o processo que fez a escrita. Por isso as versões também expiram
+com a validade do cache: em qualquer backend, um worker não serve listagens
+nem 304 desatualizados por mais que CACHE_LISTAGENS_TTL segundos.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+
+from autenticacao.authentication import cliente_id_da_requisicao
+
+
+ALIAS_CACHE = 'listagens'
+CHAVE_VERSAO_GLOBAL = 'listagens-versao:global'
+
+
+def chave_versao(cliente_id):
+    return f'listagens-versao:cliente:{cliente_id}'
+
+
+def _nova_versao():
+    return uuid.uuid4().hex
+
+
+def versao_da_requisicao(request):
+    chave = CHAVE_VERSAO_GLOBAL if request.user.is_staff else chave_versao(
+        cliente_id_da_requisicao(request)
+    )
+    return caches[ALIAS_CACHE].get_or_set(chave, _nova_versao)
+
+
+def identificador_da_listagem(request, basename):
+    """Hash da versão do escopo, do usuário, da URL completa e do formato da resposta"""
+    partes = (
+        versao_da_requisicao(request), str(request.user.pk), basename,
+        request.build_absolute_uri(), request.accepted_renderer.format
+    )
+    return hashlib.sha256('|'.join(partes).encode()).hexdigest()
+
+
+def obter(identificador):
+    return caches[ALIAS_CACHE].get(f'listagem:{identificador}')
+
+
+def guardar(identificador, dados):
+    caches[ALIAS_CACHE].set(f'listagem:{identificador}', dados)
+
+
+def invalidar_listagens(cliente_ids):
+    """
+    Renova as versões dos clientes e a global. Como em invalidar_resumos, a
+    renovação é repetida após o commit para que uma leitura concorrente não
+    guarde, sob a versão nova, dados anteriores à escrita.
+    """
+    chaves = [chave_versao(cliente_id) for cliente_id in set(cliente_ids)] + [CHAVE_VERSAO_GLOBAL]
+
+    def renovar():
+        caches[ALIAS_CACHE].set_many({chave: _nova_versao() for chave in chaves})
+
+    renovar()
+    transaction.on_commit(renovar)
@@ -0,0 +1,42 @@
+"""
+Verificações de implantação do app (`manage.py check --deploy`).
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+BACKENDS_LOCAIS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def cache_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in BACKENDS_LOCAIS
+
+
+@register(Tags.caches, deploy=True)
+def verificar_cache_das_listagens(app_configs, **kwargs):
+    if not cache_local('listagens'):
+        return []
+    return [Warning(
+        'O cache `listagens` é um LocMemCache, separado em cada processo.',
+        hint=(
+            'Com mais de um worker, as escritas só invalidam as listagens e os ETags do '
+            'próprio processo; os demais ficam desatualizados por até CACHE_LISTAGENS_TTL '
+            'segundos. Configure um backend compartilhado em CACHE_LISTAGENS_BACKEND.'
+        ),
+        id='servicos.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def verificar_cache_dos_resumos(app_configs, **kwargs):
+    if not cache_local('default'):
+        return []
+    return [Warning(
+        'O cache `default`, usado pelos resumos dos clientes, é um LocMemCache, separado em cada processo.',
+        hint=(
+            'Com mais de um worker, uma transferência só invalida o resumo no próprio '
+            'processo; os demais mostram saldos antigos por até CACHE_RESUMO_TTL segundos. '
+            'Configure um backend compartilhado em CACHE_BACKEND e CACHE_LOCATION.'
+        ),
+        id='servicos.W002',
+    )]
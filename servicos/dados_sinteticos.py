@@ -0,0 +1,358 @@
+"""
+Geração de dados sintéticos para testes de carga e benchmarks.
+
+Tudo é determinístico pela semente e pela data de referência: cada bloco de linhas tem o seu próprio
+random.Random, semeado com (semente, tabela, número do bloco), então o
+conteúdo gerado não depende da quantidade de processos nem da ordem em que os
+blocos são inseridos (apenas as chaves autoincrementais mudam). Os blocos
+são distribuídos entre processos (fork), cada um com a sua conexão, e
+inseridos com bulk_create, um bloco por transação.
+
+As distribuições imitam uma carteira real: poucas contas "quentes" concentram
+a maior parte das transações (pesos de Zipf), o histórico se estende por
+vários anos e os valores seguem uma log-normal. O saldo de cada conta é
+coerente com as transações confirmadas: a soma dos seus efeitos mais um
+depósito inicial que cobre o que faltar.
+"""
+import multiprocessing
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils import timezone
+
+from .amortizacao import adicionar_meses
+from .lancamentos import aplicar_deltas_em_lote, deltas_da_transacao, executar_com_retentativa
+from .models import Cliente, ContaBancaria, Emprestimo, Investimento, Transacao
+from .saldos import TAMANHO_BLOCO_CONTAS, reconstruir_saldos_diarios
+
+
+TAMANHO_BLOCO_SINTETICO = 10000
+EXPOENTE_ZIPF = 1.1
+
+# (valor, peso acumulado) para os sorteios categóricos
+TIPOS_TRANSACAO = (('DEP', 35), ('SAQ', 60), ('TRA', 90), ('PAG', 100))
+STATUS_EMPRESTIMO = (('SOL', 15), ('APR', 65), ('PAG', 85), ('NEG', 95), ('ATR', 100))
+TIPOS_INVESTIMENTO = (('CDB', 40), ('LCI', 55), ('LCA', 70), ('FUN', 90), ('ACO', 100))
+TIPOS_CONTA = (('CC', 70), ('CP', 90), ('CS', 100))
+
+
+@dataclass
+class Parametros:
+    semente: int = 42
+    clientes: int = 100000
+    transacoes: int = 10000000
+    emprestimos: int = 200000
+    investimentos: int = 200000
+    anos: int = 5
+    tamanho_bloco: int = TAMANHO_BLOCO_SINTETICO
+    senha: str = 'senha-sintetica'
+    referencia: date = None
+
+    @property
+    def prefixo_usuario(self):
+        return f'sint{self.semente}-'
+
+    def identificador(self, indice):
+        """Base de CPF e número de conta: 14 caracteres, únicos por semente (mod 10⁴)"""
+        return f'S{self.semente % 10 ** 4:04d}{indice:09d}'
+
+    def blocos(self, quantidade):
+        return range((quantidade + self.tamanho_bloco - 1) // self.tamanho_bloco)
+
+    def limites(self, bloco, quantidade):
+        inicio = bloco * self.tamanho_bloco
+        return inicio, min(inicio + self.tamanho_bloco, quantidade)
+
+
+def sorteio_do_bloco(parametros, tabela, bloco):
+    return random.Random(f'{parametros.semente}:{tabela}:{bloco}')
+
+
+def sortear(sorteio, pesos):
+    """Sorteia de uma tupla ((valor, peso acumulado), ...) com total 100"""
+    ponto = sorteio.random() * 100
+    for valor, acumulado in pesos:
+        if ponto < acumulado:
+            return valor
+    return pesos[-1][0]
+
+
+def valor_lognormal(sorteio, mediana, dispersao=1.0, maximo=Decimal('500000.00')):
+    valor = sorteio.lognormvariate(0, dispersao) * mediana
+    return min(Decimal(f'{valor:.2f}'), maximo) or Decimal('0.01')
+
+
+def instante_no_historico(sorteio, inicio, segundos):
+    return inicio + timedelta(seconds=int(sorteio.random() * segundos))
+
+
+def _somar_em(total, parcial):
+    for chave, valor in parcial.items():
+        total[chave] = total.get(chave, 0) + valor
+    return total
+
+
+def executar_em_processos(funcao, blocos, processos):
+    """
+    Executa funcao(bloco) para cada bloco, cada um na sua transação (repetida
+    em conflito de concorrência), distribuindo os blocos entre `processos`.
+    Cada bloco retorna um dict de somas; retorna a soma de todos.
+    """
+    def executar(parte):
+        total = {}
+        for bloco in parte:
+            _somar_em(total, executar_com_retentativa(lambda: funcao(bloco)))
+        return total
+
+    blocos = list(blocos)
+    if processos <= 1 or len(blocos) <= 1:
+        return executar(blocos)
+
+    def trabalhar(parte, saida):
+        try:
+            resultado = executar(parte)
+        except Exception as exc:
+            resultado = exc
+        connections.close_all()
+        saida.put(resultado)
+
+    # Conexões abertas não podem atravessar o fork
+    connections.close_all()
+    contexto = multiprocessing.get_context('fork')
+    saida = contexto.Queue()
+    filhos = [
+        contexto.Process(target=trabalhar, args=(blocos[i::processos], saida))
+        for i in range(min(processos, len(blocos)))
+    ]
+    for filho in filhos:
+        filho.start()
+    resultados = [saida.get() for _ in filhos]
+    for filho in filhos:
+        filho.join()
+    total = {}
+    for resultado in resultados:
+        if isinstance(resultado, Exception):
+            raise resultado
+        _somar_em(total, resultado)
+    return total
+
+
+class GeradorFinanceiro:
+    """Gera a carteira sintética descrita por `Parametros`, tabela a tabela"""
+
+    def __init__(self, parametros, processos=1):
+        self.parametros = parametros
+        self.processos = processos
+        # O histórico termina no início do dia de referência (padrão: hoje)
+        self.referencia = parametros.referencia or timezone.localdate()
+        self.fim_historico = timezone.make_aware(datetime.combine(self.referencia, time()))
+        self.inicio_historico = self.fim_historico - timedelta(days=365 * parametros.anos)
+        self.segundos_historico = int((self.fim_historico - self.inicio_historico).total_seconds())
+
+    def ja_gerado(self):
+        return User.objects.filter(username=f'{self.parametros.prefixo_usuario}0').exists()
+
+    # Clientes e contas
+
+    def _criar_clientes(self, bloco):
+        p = self.parametros
+        sorteio = sorteio_do_bloco(p, 'clientes', bloco)
+        inicio, fim = p.limites(bloco, p.clientes)
+        cadastros = [
+            instante_no_historico(sorteio, self.inicio_historico, self.segundos_historico)
+            for _ in range(inicio, fim)
+        ]
+        usuarios = User.objects.bulk_create([
+            User(
+                username=f'{p.prefixo_usuario}{i}', email=f'{p.prefixo_usuario}{i}@exemplo.com',
+                first_name='Cliente', last_name=f'Sintético {i}', password=self.hash_senha,
+                date_joined=cadastro
+            )
+            for i, cadastro in zip(range(inicio, fim), cadastros)
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(
+                user=user, cpf=p.identificador(i),
+                data_nascimento=date(1950, 1, 1) + timedelta(days=sorteio.randrange(365 * 55)),
+                telefone=f'11{sorteio.randrange(10 ** 9):09d}', endereco=f'Rua Sintética, {i}'
+            )
+            for i, user in zip(range(inicio, fim), usuarios)
+        ])
+        contas = []
+        for i, cliente, cadastro in zip(range(inicio, fim), clientes, cadastros):
+            quantidade = 1 + (sorteio.random() < 0.3) + (sorteio.random() < 0.1)
+            contas += [
+                ContaBancaria(
+                    numero_conta=f'{p.identificador(i)}{j}', agencia=f'{sorteio.randrange(1, 500):04d}',
+                    tipo_conta=sortear(sorteio, TIPOS_CONTA), cliente=cliente,
+                    data_abertura=cadastro.date(), ativa=sorteio.random() >= 0.02
+                )
+                for j in range(quantidade)
+            ]
+        ContaBancaria.objects.bulk_create(contas)
+        return {'clientes': len(clientes), 'contas': len(contas)}
+
+    def gerar_clientes(self):
+        # Um único hash (PBKDF2 é caro de propósito): todos entram com a mesma senha
+        self.hash_senha = make_password(self.parametros.senha)
+        return executar_em_processos(
+            self._criar_clientes, self.parametros.blocos(self.parametros.clientes), self.processos
+        )
+
+    def _carregar_contas(self):
+        """Contas e clientes da semente em ordem estável, e os pesos de Zipf das contas"""
+        p = self.parametros
+        self.conta_ids = list(
+            ContaBancaria.objects.filter(cliente__user__username__startswith=p.prefixo_usuario)
+            .order_by('numero_conta').values_list('id', flat=True)
+        )
+        self.cliente_ids = list(
+            Cliente.objects.filter(user__username__startswith=p.prefixo_usuario)
+            .order_by('cpf').values_list('id', flat=True)
+        )
+        # A conta de posição k no ranking recebe peso 1 / (k + 1) ** EXPOENTE_ZIPF;
+        # o ranking é embaralhado para que as quentes não sejam as primeiras
+        self.ranking = list(range(len(self.conta_ids)))
+        random.Random(f'{p.semente}:ranking').shuffle(self.ranking)
+        self.pesos_acumulados = list(accumulate(1 / (k + 1) ** EXPOENTE_ZIPF for k in self.ranking))
+
+    # Transações
+
+    def id_transacao(self, indice):
+        """UUIDs crescentes por semente: inserções em ordem na chave primária"""
+        return uuid.UUID(int=(self.parametros.semente % 2 ** 32) << 96 | indice)
+
+    def _criar_transacoes(self, bloco):
+        p = self.parametros
+        sorteio = sorteio_do_bloco(p, 'transacoes', bloco)
+        inicio, fim = p.limites(bloco, p.transacoes)
+        origens = sorteio.choices(self.conta_ids, cum_weights=self.pesos_acumulados, k=fim - inicio)
+        transacoes = []
+        deltas = {}
+        for indice, origem in zip(range(inicio, fim), origens):
+            tipo = sortear(sorteio, TIPOS_TRANSACAO)
+            destino = sorteio.choice(self.conta_ids) if tipo in ('TRA', 'PAG') else None
+            if destino == origem:
+                destino = None
+                if tipo == 'TRA':
+                    tipo = 'SAQ'
+            valor = valor_lognormal(sorteio, 150 if tipo != 'DEP' else 400)
+            status = 'REJ' if sorteio.random() < 0.02 else 'CON'
+            data = instante_no_historico(sorteio, self.inicio_historico, self.segundos_historico)
+            transacoes.append(Transacao(
+                id_transacao=self.id_transacao(indice), conta_origem_id=origem, conta_destino_id=destino,
+                tipo=tipo, valor=valor, descricao=tipo, status=status, data_transacao=data,
+                data_agendada=data if tipo == 'PAG' else None
+            ))
+            if status == 'CON':
+                _somar_em(deltas, deltas_da_transacao(tipo, valor, origem, destino))
+        Transacao.objects.bulk_create(transacoes)
+        return deltas
+
+    def gerar_transacoes(self):
+        """Gera as transações e ajusta os saldos; retorna o total de depósitos iniciais"""
+        p = self.parametros
+        self._carregar_contas()
+        deltas = executar_em_processos(self._criar_transacoes, p.blocos(p.transacoes), self.processos)
+
+        # Depósito inicial: cobre o saldo que as transações deixariam negativo
+        sorteio = random.Random(f'{p.semente}:saldos_iniciais')
+        iniciais = []
+        for indice, conta_id in enumerate(self.conta_ids, start=p.transacoes):
+            valor = max(Decimal('0.00'), -deltas.get(conta_id, Decimal('0.00'))) + valor_lognormal(sorteio, 1000)
+            iniciais.append(Transacao(
+                id_transacao=self.id_transacao(indice), conta_origem_id=conta_id, tipo='DEP',
+                valor=valor, descricao='Depósito inicial', status='CON',
+                data_transacao=self.inicio_historico - timedelta(days=1)
+            ))
+            deltas[conta_id] = deltas.get(conta_id, Decimal('0.00')) + valor
+
+        def ajustar_saldos():
+            for inicio in range(0, len(iniciais), p.tamanho_bloco):
+                Transacao.objects.bulk_create(iniciais[inicio:inicio + p.tamanho_bloco])
+            aplicar_deltas_em_lote(deltas)
+
+        executar_com_retentativa(ajustar_saldos)
+        return len(iniciais)
+
+    def gerar_saldos_diarios(self):
+        """Grava os SaldoDiario das contas geradas a partir das transações"""
+        def reconstruir(bloco):
+            inicio = bloco * TAMANHO_BLOCO_CONTAS
+            contas, snapshots = reconstruir_saldos_diarios(self.conta_ids[inicio:inicio + TAMANHO_BLOCO_CONTAS])
+            return {'contas': contas, 'snapshots': snapshots}
+
+        blocos = range((len(self.conta_ids) + TAMANHO_BLOCO_CONTAS - 1) // TAMANHO_BLOCO_CONTAS)
+        return executar_em_processos(reconstruir, blocos, self.processos)
+
+    # Empréstimos e investimentos
+
+    def _criar_emprestimos(self, bloco):
+        p = self.parametros
+        sorteio = sorteio_do_bloco(p, 'emprestimos', bloco)
+        inicio, fim = p.limites(bloco, p.emprestimos)
+        emprestimos = []
+        for _ in range(inicio, fim):
+            status = sortear(sorteio, STATUS_EMPRESTIMO)
+            solicitacao = instante_no_historico(sorteio, self.inicio_historico, self.segundos_historico).date()
+            prazo = sorteio.choice((6, 12, 12, 24, 36, 48, 60))
+            valor = valor_lognormal(sorteio, 8000)
+            aprovacao = vencimento = None
+            if status in ('APR', 'PAG', 'ATR'):
+                aprovacao = solicitacao + timedelta(days=sorteio.randrange(1, 10))
+                vencimento = adicionar_meses(aprovacao, prazo)
+                # Coerente com o vencimento: aprovado vencido já estaria pago ou
+                # atrasado, e só está atrasado o que já venceu
+                if status == 'APR' and vencimento < self.referencia:
+                    status = 'PAG' if sorteio.random() < 0.8 else 'ATR'
+                elif status == 'ATR' and vencimento >= self.referencia:
+                    status = 'APR'
+            emprestimos.append(Emprestimo(
+                cliente_id=sorteio.choice(self.cliente_ids), valor_solicitado=valor,
+                valor_aprovado=valor if aprovacao else None,
+                taxa_juros=Decimal(sorteio.choice(('1.49', '1.99', '2.49', '2.99', '3.99'))),
+                prazo_meses=prazo, sistema_amortizacao='SAC' if sorteio.random() < 0.3 else 'PRICE',
+                data_solicitacao=solicitacao, data_aprovacao=aprovacao, data_vencimento=vencimento,
+                status=status
+            ))
+        Emprestimo.objects.bulk_create(emprestimos)
+        return {'emprestimos': len(emprestimos)}
+
+    def _criar_investimentos(self, bloco):
+        p = self.parametros
+        sorteio = sorteio_do_bloco(p, 'investimentos', bloco)
+        inicio, fim = p.limites(bloco, p.investimentos)
+        investimentos = []
+        for _ in range(inicio, fim):
+            tipo = sortear(sorteio, TIPOS_INVESTIMENTO)
+            aplicacao = instante_no_historico(sorteio, self.inicio_historico, self.segundos_historico).date()
+            vencimento = None
+            if tipo not in ('FUN', 'ACO'):
+                vencimento = aplicacao + timedelta(days=sorteio.choice((180, 365, 720, 1080, 1800)))
+            investimentos.append(Investimento(
+                cliente_id=sorteio.choice(self.cliente_ids), tipo=tipo,
+                valor_aplicado=valor_lognormal(sorteio, 5000),
+                rentabilidade=Decimal(sorteio.choice(('8.50', '9.75', '10.50', '11.25', '12.00', '14.00'))),
+                data_aplicacao=aplicacao, data_vencimento=vencimento,
+                # Vencidos já teriam sido resgatados
+                ativo=vencimento is None or vencimento >= self.referencia
+            ))
+        Investimento.objects.bulk_create(investimentos)
+        return {'investimentos': len(investimentos)}
+
+    def gerar_emprestimos(self):
+        return executar_em_processos(
+            self._criar_emprestimos, self.parametros.blocos(self.parametros.emprestimos), self.processos
+        )
+
+    def gerar_investimentos(self):
+        return executar_em_processos(
+            self._criar_investimentos, self.parametros.blocos(self.parametros.investimentos), self.processos
+        )
@@ -0,0 +1,111 @@
+"""
+Exportação do extrato em CSV e NDJSON por streaming.
+
+As linhas são lidas com QuerySet.values_list().iterator(), que usa cursor do
+lado do servidor quando o banco suporta, e codificadas diretamente em texto,
+sem instanciar modelos nem passar pelo TransacaoSerializer. O consumo de
+memória fica constante independentemente do tamanho do extrato.
+"""
+import csv
+import heapq
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+TAMANHO_BLOCO = 2000
+
+CAMPOS = (
+    'id_transacao',
+    'data_transacao',
+    'tipo',
+    'valor',
+    'descricao',
+    'status',
+    'conta_origem__numero_conta',
+    'conta_destino__numero_conta',
+)
+
+CABECALHO = (
+    'id_transacao',
+    'data_transacao',
+    'tipo',
+    'valor',
+    'descricao',
+    'status',
+    'conta_origem',
+    'conta_destino',
+)
+
+
+class _Eco:
+    """Arquivo falso que devolve o que o csv.writer escreve"""
+
+    def write(self, valor):
+        return valor
+
+
+def linhas_extrato(querysets, chunk_size=TAMANHO_BLOCO):
+    """
+    Intercala as consultas (disjuntas) por (data_transacao, id_transacao)
+    decrescente, emitindo tuplas na ordem de CAMPOS.
+    """
+    fontes = [
+        queryset.order_by('-data_transacao', '-id_transacao')
+        .values_list(*CAMPOS)
+        .iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    ]
+    return heapq.merge(*fontes, key=lambda linha: (linha[1], linha[0]), reverse=True)
+
+
+def _normalizar(linha):
+    id_transacao, data_transacao, tipo, valor, descricao, status, origem, destino = linha
+    return (
+        str(id_transacao),
+        timezone.localtime(data_transacao).isoformat(),
+        tipo,
+        str(valor),
+        descricao,
+        status,
+        origem,
+        destino,
+    )
+
+
+def _em_blocos(linhas, codificar, tamanho=TAMANHO_BLOCO):
+    """Agrupa as linhas codificadas em blocos maiores para reduzir escritas"""
+    bloco = []
+    for linha in linhas:
+        bloco.append(codificar(linha))
+        if len(bloco) >= tamanho:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def gerar_csv(linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(CABECALHO)
+    yield from _em_blocos(linhas, lambda linha: escritor.writerow(_normalizar(linha)))
+
+
+def gerar_ndjson(linhas):
+    codificar = lambda linha: json.dumps(dict(zip(CABECALHO, _normalizar(linha))), ensure_ascii=False) + '\n'
+    yield from _em_blocos(linhas, codificar)
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (gerar_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def exportar_extrato(querysets, formato, nome_arquivo):
+    """Resposta em streaming com o extrato no formato pedido ('csv' ou 'ndjson')"""
+    gerador, content_type = FORMATOS[formato]
+    resposta = StreamingHttpResponse(gerador(linhas_extrato(querysets)), content_type=content_type)
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.{formato}"'
+    return resposta
@@ -0,0 +1,170 @@
+"""
+Suporte ao cabeçalho Idempotency-Key nas criações de transações e
+investimentos.
+
+A primeira requisição com uma chave "reserva" a chave inserindo uma linha em
+ChaveIdempotencia (índice único por usuário, rota e chave) e, ao terminar,
+grava nela a resposta. Repetições recebem a resposta guardada sem tocar nas
+contas: primeiro pelo cache em memória do processo, depois pela tabela.
+Duplicatas simultâneas esbarram no índice único ao reservar e recebem 409,
+sem esperar pelos locks das contas.
+
+Respostas 5xx (e exceções) liberam a reserva, para que o cliente possa
+tentar de novo com a mesma chave.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from financeira_api.cache_lru import CacheLRU
+
+from .models import ChaveIdempotencia
+
+
+CABECALHO = 'Idempotency-Key'
+TAMANHO_MAXIMO_CHAVE = 255
+TAMANHO_BLOCO_PODA = 5000
+
+# Respostas já concluídas, por (usuario_id, rota, chave)
+cache_respostas = CacheLRU(
+    getattr(settings, 'IDEMPOTENCIA_CACHE_TAMANHO', 10000),
+    getattr(settings, 'IDEMPOTENCIA_VALIDADE', 86400)
+)
+
+
+def hash_da_requisicao(dados):
+    corpo = json.dumps(dados, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(corpo.encode()).hexdigest()
+
+
+def _repetir(hash_requisicao, guardada):
+    hash_original, status_code, resposta = guardada
+    if hash_requisicao != hash_original:
+        return Response(
+            {'detail': f'Esta {CABECALHO} já foi usada com outra requisição.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(resposta, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _em_processamento():
+    return Response(
+        {'detail': f'Uma requisição com esta {CABECALHO} ainda está em processamento.'},
+        status=status.HTTP_409_CONFLICT,
+        headers={'Retry-After': '1'}
+    )
+
+
+def _reservar(usuario_id, rota, chave, hash_requisicao):
+    """
+    Tenta reservar a chave. Retorna (registro reservado, None) ou
+    (None, registro existente) quando ela já estava em uso.
+    """
+    agora = timezone.now()
+    validade = timedelta(seconds=getattr(settings, 'IDEMPOTENCIA_VALIDADE', 86400))
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return ChaveIdempotencia.objects.create(
+                    usuario_id=usuario_id, rota=rota, chave=chave,
+                    hash_requisicao=hash_requisicao, expira_em=agora + validade
+                ), None
+        except IntegrityError:
+            existente = ChaveIdempotencia.objects.filter(
+                usuario_id=usuario_id, rota=rota, chave=chave
+            ).only('hash_requisicao', 'status_code', 'resposta', 'expira_em').first()
+            if existente is None:
+                # Removida entre o INSERT e a leitura: tentar de novo
+                continue
+            if existente.expira_em > agora:
+                return None, existente
+            # Expirada e ainda não podada: libera e tenta de novo
+            ChaveIdempotencia.objects.filter(pk=existente.pk, expira_em__lte=agora).delete()
+    # Disputa com outra requisição que também reservou e liberou a chave
+    return None, ChaveIdempotencia(hash_requisicao=hash_requisicao)
+
+
+def idempotente(rota):
+    """
+    Decorator para a ação `create` de um ViewSet. Sem o cabeçalho
+    Idempotency-Key a requisição segue normalmente.
+    """
+    def decorator(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            chave = request.headers.get(CABECALHO)
+            if chave is None:
+                return metodo(self, request, *args, **kwargs)
+            if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+                return Response(
+                    {'detail': f'{CABECALHO} deve ter entre 1 e {TAMANHO_MAXIMO_CHAVE} caracteres.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            identificador = (request.user.pk, rota, chave)
+            hash_requisicao = hash_da_requisicao(request.data)
+            guardada = cache_respostas.obter(identificador)
+            if guardada is not None:
+                return _repetir(hash_requisicao, guardada)
+
+            registro, existente = _reservar(request.user.pk, rota, chave, hash_requisicao)
+            if existente is not None:
+                if existente.status_code is None:
+                    if existente.hash_requisicao != hash_requisicao:
+                        return _repetir(hash_requisicao, (existente.hash_requisicao, None, None))
+                    return _em_processamento()
+                guardada = (existente.hash_requisicao, existente.status_code, existente.resposta)
+                cache_respostas.guardar(
+                    identificador, guardada, (existente.expira_em - timezone.now()).total_seconds()
+                )
+                return _repetir(hash_requisicao, guardada)
+
+            try:
+                response = metodo(self, request, *args, **kwargs)
+            except BaseException:
+                ChaveIdempotencia.objects.filter(pk=registro.pk).delete()
+                raise
+            if response.status_code >= 500:
+                ChaveIdempotencia.objects.filter(pk=registro.pk).delete()
+                return response
+
+            ChaveIdempotencia.objects.filter(pk=registro.pk).update(
+                status_code=response.status_code, resposta=response.data
+            )
+            cache_respostas.guardar(
+                identificador,
+                (hash_requisicao, response.status_code, response.data),
+                (registro.expira_em - timezone.now()).total_seconds()
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+def podar_chaves_expiradas(tamanho_bloco=TAMANHO_BLOCO_PODA, pausa=0.0, antes_de=None):
+    """
+    Remove as chaves expiradas em blocos, cada um na sua transação, usando o
+    índice em expira_em. Retorna a quantidade removida.
+    """
+    antes_de = antes_de or timezone.now()
+    removidas = 0
+    while True:
+        ids = list(
+            ChaveIdempotencia.objects.filter(expira_em__lt=antes_de)
+            .order_by('expira_em').values_list('id', flat=True)[:tamanho_bloco]
+        )
+        if not ids:
+            return removidas
+        with transaction.atomic():
+            ChaveIdempotencia.objects.filter(id__in=ids).delete()
+        removidas += len(ids)
+        if pausa:
+            time.sleep(pausa)
@@ -0,0 +1,361 @@
+"""
+Motor de lançamentos das contas bancárias.
+
+Toda alteração de saldo passa por aqui: as contas envolvidas são travadas em
+ordem determinística (pela chave primária), os deltas são aplicados com
+UPDATEs atômicos baseados em F() que tocam apenas `saldo` e `updated_at`, e a
+operação inteira é repetida com espera exponencial limitada quando o banco
+acusa conflito de serialização, deadlock ou timeout de lock.
+"""
+import random
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, DecimalField, F, Max, Value, When
+from django.utils import timezone
+
+from .auditoria import registrar_movimentos
+from .models import ContaBancaria, SaldoDiario, Transacao
+from .signals import saldos_alterados
+
+
+TENTATIVAS_MAXIMAS = 12
+ESPERA_INICIAL = 0.005  # segundos
+ESPERA_MAXIMA = 0.5  # segundos
+
+# SQLSTATEs do PostgreSQL que indicam conflito transitório
+# (serialization_failure, deadlock_detected, lock_not_available)
+CODIGOS_REPETIVEIS = {'40001', '40P01', '55P03'}
+
+# Tipos de transação que são efetivados no momento do lançamento; os
+# pagamentos (PAG) ficam pendentes até a data agendada (servicos.pagamentos)
+TIPOS_EFETIVADOS = ('DEP', 'SAQ', 'TRA')
+TIPOS_AGENDADOS = ('PAG',)
+
+# Efeito de uma transação confirmada nos saldos
+TIPOS_CREDITAM_ORIGEM = ('DEP',)
+TIPOS_DEBITAM_ORIGEM = ('SAQ', 'TRA', 'PAG')
+TIPOS_CREDITAM_DESTINO = ('TRA', 'PAG')
+
+CAMPOS_AGENDAMENTO = ('data_agendada', 'recorrencia', 'data_fim_recorrencia')
+
+# Limites dos lançamentos em lote
+LOTE_MAX_ITENS = 10000
+LOTE_TAMANHO_INSERT = 1000
+LOTE_CONTAS_POR_UPDATE = 500
+
+
+class ErroLancamento(Exception):
+    """Erro de negócio ao lançar uma transação"""
+
+
+class ContaNaoEncontrada(ErroLancamento):
+    """Uma das contas envolvidas no lançamento não existe"""
+
+
+class SaldoInsuficiente(ErroLancamento):
+    """A conta não possui saldo para cobrir o débito"""
+
+    def __init__(self, conta_id):
+        super().__init__(f'Saldo insuficiente na conta {conta_id}.')
+        self.conta_id = conta_id
+
+
+class ValorInvalido(ErroLancamento):
+    """O valor da transação não é positivo"""
+
+    def __init__(self, valor):
+        super().__init__('O valor da transação deve ser positivo.')
+        self.valor = valor
+
+
+def erro_de_concorrencia(exc):
+    """Indica se o erro do banco é transitório e a operação pode ser repetida"""
+    causa = exc.__cause__
+    codigo = getattr(causa, 'sqlstate', None) or getattr(causa, 'pgcode', None)
+    if codigo:
+        return codigo in CODIGOS_REPETIVEIS
+    # SQLite não expõe código: "database is locked" / "database table is locked"
+    mensagem = str(exc).lower()
+    return 'locked' in mensagem or 'busy' in mensagem
+
+
+def executar_com_retentativa(operacao, tentativas=TENTATIVAS_MAXIMAS):
+    """
+    Executa `operacao` dentro de uma transação, repetindo-a em caso de
+    conflito de concorrência com backoff exponencial e jitter.
+
+    Quando já existe uma transação externa aberta não é possível repetir só
+    o trecho interno, então a operação é executada uma única vez.
+    """
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            return operacao()
+
+    espera = ESPERA_INICIAL
+    for tentativa in range(1, tentativas + 1):
+        try:
+            with transaction.atomic():
+                return operacao()
+        except OperationalError as exc:
+            if tentativa == tentativas or not erro_de_concorrencia(exc):
+                raise
+        time.sleep(random.uniform(0, espera))
+        espera = min(espera * 2, ESPERA_MAXIMA)
+
+
+def deltas_da_transacao(tipo, valor, conta_origem_id, conta_destino_id=None):
+    """Retorna o efeito de uma transação confirmada no saldo de cada conta"""
+    if valor <= 0:
+        raise ValorInvalido(valor)
+    deltas = defaultdict(Decimal)
+    if tipo in TIPOS_CREDITAM_ORIGEM:
+        deltas[conta_origem_id] += valor
+    elif tipo in TIPOS_DEBITAM_ORIGEM:
+        deltas[conta_origem_id] -= valor
+    if tipo in TIPOS_CREDITAM_DESTINO and conta_destino_id:
+        deltas[conta_destino_id] += valor
+    return dict(deltas)
+
+
+def efeito_na_origem():
+    """Expressão SQL equivalente a deltas_da_transacao para a conta de origem"""
+    return Case(
+        When(tipo__in=TIPOS_CREDITAM_ORIGEM, then=F('valor')),
+        When(tipo__in=TIPOS_DEBITAM_ORIGEM, then=-F('valor')),
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def atualizar_saldos_diarios(conta_ids):
+    """
+    Grava o saldo atual das contas como saldo de fechamento do dia
+    (um SELECT e um upsert), mantendo os SaldoDiario em dia a cada lançamento.
+
+    Em seguida emite `saldos_alterados` com as contas e seus clientes, lidos
+    no mesmo SELECT. Retorna {conta_id: saldo atual}.
+    """
+    hoje = timezone.localdate()
+    agora = timezone.now()
+    linhas = list(ContaBancaria.objects.filter(pk__in=conta_ids).values_list('id', 'cliente_id', 'saldo'))
+    SaldoDiario.objects.bulk_create(
+        [
+            SaldoDiario(conta_id=conta_id, data=hoje, saldo=saldo, updated_at=agora)
+            for conta_id, _, saldo in linhas
+        ],
+        update_conflicts=True,
+        unique_fields=['conta', 'data'],
+        update_fields=['saldo', 'updated_at']
+    )
+    saldos_alterados.send(
+        sender=ContaBancaria,
+        conta_ids=[conta_id for conta_id, _, _ in linhas],
+        cliente_ids={cliente_id for _, cliente_id, _ in linhas}
+    )
+    return {conta_id: saldo for conta_id, _, saldo in linhas}
+
+
+def travar_contas(conta_ids):
+    """
+    Trava as contas informadas (SELECT ... FOR UPDATE) sempre na ordem da
+    chave primária, evitando deadlocks entre lançamentos concorrentes.
+    """
+    ids = sorted(set(conta_ids))
+    contas = {
+        conta['id']: conta
+        for conta in ContaBancaria.objects.select_for_update()
+        .filter(pk__in=ids)
+        .order_by('pk')
+        .values('id', 'cliente_id', 'saldo')
+    }
+    if len(contas) != len(ids):
+        raise ContaNaoEncontrada('Conta bancária não encontrada.')
+    return contas
+
+
+def contas_de_credito(cliente_ids):
+    """
+    Conta que recebe os créditos de cada cliente: a ativa mais recente, como
+    na ordenação padrão de ContaBancaria. Retorna {cliente_id: conta_id}.
+    """
+    return dict(
+        ContaBancaria.objects.filter(cliente_id__in=cliente_ids, ativa=True)
+        .order_by().values('cliente_id').annotate(conta_id=Max('id')).values_list('cliente_id', 'conta_id')
+    )
+
+
+def aplicar_deltas(deltas):
+    """
+    Aplica os deltas de saldo com UPDATEs atômicos, em ordem de chave
+    primária. Débitos só são aplicados se o saldo cobrir o valor.
+    Retorna o saldo resultante de cada conta.
+
+    Como cada UPDATE trava a linha alterada, a ordem fixa também vale para
+    bancos sem SELECT ... FOR UPDATE (SQLite), onde o primeiro comando da
+    transação ser uma escrita evita o deadlock de promoção de lock.
+    """
+    agora = timezone.now()
+    for conta_id in sorted(deltas):
+        delta = deltas[conta_id]
+        contas = ContaBancaria.objects.filter(pk=conta_id)
+        if delta < 0:
+            contas = contas.filter(saldo__gte=-delta)
+        if not contas.update(saldo=F('saldo') + delta, updated_at=agora):
+            if not ContaBancaria.objects.filter(pk=conta_id).exists():
+                raise ContaNaoEncontrada('Conta bancária não encontrada.')
+            raise SaldoInsuficiente(conta_id)
+    if not deltas:
+        return {}
+    return atualizar_saldos_diarios(list(deltas))
+
+
+def aplicar_deltas_em_lote(deltas):
+    """
+    Aplica deltas já validados a muitas contas com poucos UPDATEs
+    (um CASE por bloco de contas). As contas devem estar travadas.
+    """
+    agora = timezone.now()
+    conta_ids = sorted(conta_id for conta_id, delta in deltas.items() if delta)
+    for inicio in range(0, len(conta_ids), LOTE_CONTAS_POR_UPDATE):
+        bloco = conta_ids[inicio:inicio + LOTE_CONTAS_POR_UPDATE]
+        # Contas com o mesmo delta compartilham um WHEN
+        por_delta = defaultdict(list)
+        for conta_id in bloco:
+            por_delta[deltas[conta_id]].append(conta_id)
+        ajuste = Case(
+            *[When(pk__in=ids, then=Value(delta)) for delta, ids in por_delta.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+        ContaBancaria.objects.filter(pk__in=bloco).update(
+            saldo=F('saldo') + ajuste, updated_at=agora
+        )
+        atualizar_saldos_diarios(bloco)
+
+
+def lancar_transacao(tipo, valor, conta_origem_id, conta_destino_id=None, descricao='', **agendamento):
+    """
+    Registra uma transação e aplica seu efeito nos saldos das contas.
+
+    Depósitos, saques e transferências são confirmados imediatamente;
+    os demais tipos ficam pendentes. `agendamento` recebe os campos
+    data_agendada, recorrencia e data_fim_recorrencia dos pagamentos.
+    """
+    if valor <= 0:
+        raise ValorInvalido(valor)
+    conta_ids = [conta_origem_id] + ([conta_destino_id] if conta_destino_id else [])
+
+    efetivada = tipo in TIPOS_EFETIVADOS
+    deltas = deltas_da_transacao(tipo, valor, conta_origem_id, conta_destino_id) if efetivada else {}
+
+    def operacao():
+        if connection.features.has_select_for_update or set(conta_ids) - set(deltas):
+            travar_contas(conta_ids)
+        saldos = aplicar_deltas(deltas)
+        transacao = Transacao.objects.create(
+            conta_origem_id=conta_origem_id,
+            conta_destino_id=conta_destino_id,
+            tipo=tipo,
+            valor=valor,
+            descricao=descricao,
+            status='CON' if efetivada else 'PEN',
+            data_transacao=timezone.now(),
+            **agendamento
+        )
+        registrar_movimentos([
+            (transacao.id_transacao, conta_id, delta, saldos[conta_id])
+            for conta_id, delta in deltas.items()
+        ])
+        return transacao
+
+    return executar_com_retentativa(operacao)
+
+
+def lancar_lote(itens, contas_permitidas=None):
+    """
+    Lança várias transações numa única transação de banco.
+
+    `itens` é uma lista de pares (indice, dados validados pelo
+    TransacaoCreateSerializer). Quando `contas_permitidas` é informado, só
+    essas contas podem ser usadas como origem.
+
+    As contas são lidas e travadas numa única consulta, cada item é aplicado
+    em ordem sobre os saldos em memória (itens sem saldo são rejeitados sem
+    afetar os demais), as transações aceitas são inseridas com bulk_create e
+    os saldos recebem apenas o delta líquido de cada conta.
+
+    Retorna um dicionário {indice: Transacao | ErroLancamento}.
+    """
+    conta_ids = set()
+    for _, dados in itens:
+        conta_ids.add(dados['conta_origem_id'])
+        if dados.get('conta_destino_id'):
+            conta_ids.add(dados['conta_destino_id'])
+
+    def operacao():
+        saldos = {
+            conta['id']: conta['saldo']
+            for conta in ContaBancaria.objects.select_for_update()
+            .filter(pk__in=conta_ids)
+            .order_by('pk')
+            .values('id', 'saldo')
+        }
+        agora = timezone.now()
+        resultados = {}
+        transacoes = []
+        movimentos = []
+        deltas_liquidos = defaultdict(Decimal)
+
+        for indice, dados in itens:
+            tipo = dados['tipo']
+            valor = dados['valor']
+            conta_origem_id = dados['conta_origem_id']
+            conta_destino_id = dados.get('conta_destino_id')
+
+            if valor <= 0:
+                resultados[indice] = ValorInvalido(valor)
+                continue
+            if conta_origem_id not in saldos or (
+                contas_permitidas is not None and conta_origem_id not in contas_permitidas
+            ):
+                resultados[indice] = ContaNaoEncontrada('Conta de origem não encontrada.')
+                continue
+            if conta_destino_id and conta_destino_id not in saldos:
+                resultados[indice] = ContaNaoEncontrada('Conta de destino não encontrada.')
+                continue
+
+            efetivada = tipo in TIPOS_EFETIVADOS
+            deltas = deltas_da_transacao(tipo, valor, conta_origem_id, conta_destino_id) if efetivada else {}
+            sem_saldo = next(
+                (conta_id for conta_id, delta in deltas.items() if saldos[conta_id] + delta < 0),
+                None
+            )
+            if sem_saldo is not None:
+                resultados[indice] = SaldoInsuficiente(sem_saldo)
+                continue
+
+            transacao = Transacao(
+                conta_origem_id=conta_origem_id,
+                conta_destino_id=conta_destino_id,
+                tipo=tipo,
+                valor=valor,
+                descricao=dados.get('descricao', ''),
+                status='CON' if efetivada else 'PEN',
+                data_transacao=agora,
+                **{campo: dados[campo] for campo in CAMPOS_AGENDAMENTO if campo in dados}
+            )
+            for conta_id, delta in deltas.items():
+                saldos[conta_id] += delta
+                deltas_liquidos[conta_id] += delta
+                movimentos.append((transacao.id_transacao, conta_id, delta, saldos[conta_id]))
+            transacoes.append(transacao)
+            resultados[indice] = transacao
+
+        Transacao.objects.bulk_create(transacoes, batch_size=LOTE_TAMANHO_INSERT)
+        aplicar_deltas_em_lote(deltas_liquidos)
+        registrar_movimentos(movimentos)
+        return resultados
+
+    return executar_com_retentativa(operacao)
@@ -0,0 +1,77 @@
+"""
+Utilitários compartilhados pelos comandos de benchmark.
+"""
+import os
+import time
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from autenticacao.tokens import RefreshTokenCliente
+from servicos.models import Cliente, ContaBancaria
+
+
+def criar_dados_bench(quantidade_contas, saldo=Decimal('0.00'), staff=False):
+    """
+    Cria um usuário, seu cliente e `quantidade_contas` contas com prefixo
+    único. Remover o usuário retornado apaga todo o resto em cascata.
+    """
+    prefixo = uuid.uuid4().hex[:8]
+    user = User.objects.create(username=f'bench-{prefixo}', is_staff=staff)
+    cliente = Cliente.objects.create(
+        user=user, cpf=f'bench-{prefixo}', data_nascimento='1990-01-01',
+        telefone='0', endereco='benchmark'
+    )
+    contas = ContaBancaria.objects.bulk_create([
+        ContaBancaria(
+            numero_conta=f'{prefixo}-{i}', agencia='0001', tipo_conta='CC',
+            saldo=saldo, cliente=cliente
+        )
+        for i in range(quantidade_contas)
+    ])
+    return user, cliente, contas
+
+
+def cliente_api(user):
+    """APIClient autenticado com um access token JWT real"""
+    client = APIClient(HTTP_HOST='localhost')
+    token = RefreshTokenCliente.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def rss_atual_mb():
+    """Memória residente atual do processo em MB (pico, fora do Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            paginas = int(statm.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        import resource  # indisponível no Windows
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def requisicao_wsgi(aplicacao, caminho, token, metodo='GET', corpo=b''):
+    """
+    Chama a aplicação WSGI diretamente, sem servidor nem socket. Retorna o
+    código de status e a latência em ms.
+    """
+    environ = {
+        'PATH_INFO': caminho, 'QUERY_STRING': '', 'REQUEST_METHOD': metodo,
+        'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(corpo)),
+        'wsgi.input': BytesIO(corpo),
+    }
+    setup_testing_defaults(environ)
+    estado = []
+    inicio = time.perf_counter()
+    resposta = aplicacao(environ, lambda status, cabecalhos, exc_info=None: estado.append(status))
+    try:
+        b''.join(resposta)
+    finally:
+        getattr(resposta, 'close', lambda: None)()
+    return int(estado[0].split()[0]), (time.perf_counter() - inicio) * 1000
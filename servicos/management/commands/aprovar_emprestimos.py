@@ -0,0 +1,58 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from servicos.aprovacoes import APROVACAO_TAMANHO_BLOCO, ErroAprovacao, aprovar_emprestimos
+from servicos.auditoria import contexto_auditoria
+from servicos.serializers import AprovacaoLoteSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Aprova empréstimos em lote a partir de um CSV com as colunas '
+        'emprestimo_id e valor_aprovado (opcional; vazio aprova o valor '
+        'solicitado). Cada bloco é confirmado numa transação e o resultado de '
+        'cada linha é reportado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do CSV ou '-' para a entrada padrão")
+        parser.add_argument('--tamanho-bloco', type=int, default=APROVACAO_TAMANHO_BLOCO,
+                            help='Quantidade de empréstimos aprovados por transação')
+
+    def ler(self, arquivo):
+        validador = AprovacaoLoteSerializer()
+        validos, invalidos = [], {}
+        for linha, registro in enumerate(csv.DictReader(arquivo), start=2):
+            if not registro.get('valor_aprovado'):
+                registro.pop('valor_aprovado', None)
+            try:
+                validos.append((linha, validador.run_validation(registro)))
+            except ValidationError as exc:
+                invalidos[linha] = exc.detail
+        return validos, invalidos
+
+    def handle(self, *args, **options):
+        try:
+            if options['arquivo'] == '-':
+                validos, invalidos = self.ler(sys.stdin)
+            else:
+                with open(options['arquivo'], newline='', encoding='utf-8') as arquivo:
+                    validos, invalidos = self.ler(arquivo)
+        except OSError as exc:
+            raise CommandError(f'Não foi possível ler o arquivo: {exc}')
+
+        with contexto_auditoria(None, 'comando.aprovar_emprestimos'):
+            resultados = aprovar_emprestimos(validos, options['tamanho_bloco'])
+
+        for linha, erros in sorted(invalidos.items()):
+            self.stderr.write(f'Linha {linha}: {erros}')
+        falhas = len(invalidos)
+        for linha, resultado in sorted(resultados.items()):
+            if isinstance(resultado, ErroAprovacao):
+                falhas += 1
+                self.stderr.write(f'Linha {linha}: {resultado}')
+        aprovados = len(resultados) + len(invalidos) - falhas
+        self.stdout.write(self.style.SUCCESS(f'{aprovados} empréstimo(s) aprovado(s), {falhas} falha(s).'))
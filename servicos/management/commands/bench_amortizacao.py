@@ -0,0 +1,64 @@
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from servicos.amortizacao import PRICE, SAC, cronograma, cronogramas_em_lote
+
+
+TAXAS = [Decimal(taxa) for taxa in ('0.00', '0.99', '1.50', '1.99', '2.49', '3.75')]
+PRAZOS = (6, 12, 24, 36, 48, 60, 120, 360)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o cálculo de cronogramas empréstimo a empréstimo (Decimal) '
+        'com o cálculo em lote (centavos inteiros) e confere se coincidem.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emprestimos', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        carteira = [
+            (
+                Decimal(rnd.randint(100000, 20000000)) / 100,
+                rnd.choice(TAXAS),
+                rnd.choice(PRAZOS),
+                rnd.choice((PRICE, SAC))
+            )
+            for _ in range(options['emprestimos'])
+        ]
+        hoje = date.today()
+
+        inicio = time.perf_counter()
+        individuais = [
+            cronograma(principal, taxa, prazo, sistema, hoje)
+            for principal, taxa, prazo, sistema in carteira
+        ]
+        duracao_loop = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        lote = cronogramas_em_lote(carteira)
+        duracao_lote = time.perf_counter() - inicio
+
+        por_emprestimo = lote.por_emprestimo()
+        for indice, parcelas in enumerate(individuais):
+            esperado = [
+                (p.numero, int(p.prestacao * 100), int(p.juros * 100),
+                 int(p.amortizacao * 100), int(p.saldo_devedor * 100))
+                for p in parcelas
+            ]
+            if por_emprestimo[indice] != esperado:
+                raise CommandError(f'Divergência no empréstimo {indice}: {carteira[indice]}')
+
+        self.stdout.write(f'Empréstimos: {len(carteira)}  parcelas: {len(lote)}')
+        self.stdout.write(f'Individual: {duracao_loop * 1000:10.1f} ms')
+        self.stdout.write(f'Lote:       {duracao_lote * 1000:10.1f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ganho: {duracao_loop / duracao_lote:.1f}x, cronogramas idênticos centavo a centavo'
+        ))
@@ -0,0 +1,82 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from servicos.aprovacoes import APROVACAO_MAX_ITENS
+from servicos.models import Cliente, ContaBancaria, Emprestimo
+
+from ._bench import cliente_api
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão (aprovações/s) de POST /emprestimos/{id}/aprovar/ '
+        'chamado um a um com POST /emprestimos/aprovar-lote/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emprestimos', type=int, default=5000)
+        parser.add_argument('--clientes', type=int, default=500)
+        parser.add_argument('--individuais', type=int, default=300,
+                            help='Empréstimos aprovados um a um (amostra)')
+
+    def criar_dados(self, quantidade_clientes, quantidade_emprestimos):
+        prefixo = uuid.uuid4().hex[:8]
+        usuarios = User.objects.bulk_create([
+            User(username=f'bench-{prefixo}-{i}') for i in range(quantidade_clientes)
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(
+                user=user, cpf=f'{prefixo}-{i}', data_nascimento='1990-01-01',
+                telefone='0', endereco='benchmark'
+            )
+            for i, user in enumerate(usuarios)
+        ])
+        ContaBancaria.objects.bulk_create([
+            ContaBancaria(numero_conta=f'{prefixo}-{i}', agencia='0001', tipo_conta='CC', cliente=cliente)
+            for i, cliente in enumerate(clientes)
+        ])
+        emprestimos = Emprestimo.objects.bulk_create([
+            Emprestimo(
+                cliente=clientes[i % len(clientes)], valor_solicitado=Decimal('1000.00'),
+                taxa_juros=Decimal('1.50'), prazo_meses=12
+            )
+            for i in range(quantidade_emprestimos)
+        ])
+        return usuarios, [emprestimo.id for emprestimo in emprestimos]
+
+    def handle(self, *args, **options):
+        admin = User.objects.create(username=f'bench-admin-{uuid.uuid4().hex[:8]}', is_staff=True)
+        usuarios, ids = self.criar_dados(options['clientes'], options['emprestimos'] + options['individuais'])
+        client = cliente_api(admin)
+        individuais, em_lote = ids[:options['individuais']], ids[options['individuais']:]
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for emprestimo_id in individuais:
+                    resposta = client.post(f'/api/v1/emprestimos/{emprestimo_id}/aprovar/')
+                    assert resposta.status_code == 200, resposta.data
+                duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Um a um:  {len(individuais) / duracao:8.1f} aprovações/s  '
+                f'{len(consultas) / len(individuais):6.1f} consultas/empréstimo'
+            )
+
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for posicao in range(0, len(em_lote), APROVACAO_MAX_ITENS):
+                    itens = [{'emprestimo_id': i} for i in em_lote[posicao:posicao + APROVACAO_MAX_ITENS]]
+                    resposta = client.post('/api/v1/emprestimos/aprovar-lote/', itens, format='json')
+                    assert resposta.data['falhas'] == 0, resposta.data
+                duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Em lote:  {len(em_lote) / duracao:8.1f} aprovações/s  '
+                f'{len(consultas) / len(em_lote):6.2f} consultas/empréstimo'
+            )
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in usuarios] + [admin.pk]).delete()
@@ -0,0 +1,148 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import cycle
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from autenticacao.tokens import RefreshTokenCliente
+from servicos.models import Transacao
+
+from ._bench import criar_dados_bench, requisicao_wsgi
+
+
+def percentil(ordenadas, fracao):
+    return ordenadas[max(int(len(ordenadas) * fracao) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara latência (p50/p99) e vazão dos endpoints de leitura: viewsets '
+        'síncronos na aplicação WSGI, viewsets síncronos na aplicação ASGI e '
+        'endpoints assíncronos (/api/v1/async/) na aplicação ASGI, em níveis '
+        'crescentes de concorrência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=400,
+                            help='Requisições por nível de concorrência')
+        parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 8, 32, 128])
+        parser.add_argument('--transacoes', type=int, default=2000)
+        parser.add_argument('--limite-p99', type=float, default=250.0,
+                            help='p99 (ms) que define o teto de concorrência')
+
+    def criar_dados(self, quantidade):
+        user, cliente, contas = criar_dados_bench(20, Decimal('1000.00'))
+        agora = timezone.now()
+        transacoes = Transacao.objects.bulk_create([
+            Transacao(
+                conta_origem=contas[i % 2], conta_destino=contas[1 - i % 2], tipo='TRA',
+                valor=Decimal('1.00'), status='CON', data_transacao=agora - timedelta(minutes=i)
+            )
+            for i in range(quantidade)
+        ])
+        caminhos = [
+            'contas/',
+            f'contas/{contas[0].id}/extrato/',
+            f'transacoes/{transacoes[0].id_transacao}/',
+            f'clientes/{cliente.id}/resumo/',
+        ]
+        return user, caminhos
+
+    def medir_wsgi(self, aplicacao, caminhos, token, requisicoes, concorrencia):
+        def requisitar(caminho):
+            status_code, latencia = requisicao_wsgi(aplicacao, caminho, token)
+            assert status_code == 200, (caminho, status_code)
+            return latencia
+
+        # Cada thread do pool faz o papel de um worker síncrono do servidor WSGI
+        with ThreadPoolExecutor(concorrencia) as pool:
+            inicio = time.perf_counter()
+            fila = (caminho for caminho, _ in zip(cycle(caminhos), range(requisicoes)))
+            latencias = list(pool.map(requisitar, fila))
+            return latencias, time.perf_counter() - inicio
+
+    def medir_asgi(self, aplicacao, caminhos, token, requisicoes, concorrencia):
+        async def requisitar(caminho):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': caminho,
+                'raw_path': caminho.encode(), 'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            recebido = False
+            desconexao = asyncio.get_running_loop().create_future()
+
+            async def receive():
+                nonlocal recebido
+                if not recebido:
+                    recebido = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # O cliente só "desconecta" depois da resposta
+                return await desconexao
+
+            estado = []
+
+            async def send(mensagem):
+                if mensagem['type'] == 'http.response.start':
+                    estado.append(mensagem['status'])
+
+            inicio = time.perf_counter()
+            await aplicacao(scope, receive, send)
+            latencia = (time.perf_counter() - inicio) * 1000
+            desconexao.cancel()
+            assert estado[0] == 200, (caminho, estado)
+            return latencia
+
+        async def executar():
+            semaforo = asyncio.Semaphore(concorrencia)
+
+            async def limitado(caminho):
+                async with semaforo:
+                    return await requisitar(caminho)
+
+            inicio = time.perf_counter()
+            latencias = await asyncio.gather(*[
+                limitado(caminho) for caminho, _ in zip(cycle(caminhos), range(requisicoes))
+            ])
+            return latencias, time.perf_counter() - inicio
+
+        return asyncio.run(executar())
+
+    def handle(self, *args, **options):
+        from financeira_api.asgi import application as asgi
+        from financeira_api.wsgi import application as wsgi
+
+        user, caminhos = self.criar_dados(options['transacoes'])
+        token = str(RefreshTokenCliente.for_user(user).access_token)
+        cenarios = [
+            ('WSGI síncrono', self.medir_wsgi, wsgi, [f'/api/v1/{c}' for c in caminhos]),
+            ('ASGI síncrono', self.medir_asgi, asgi, [f'/api/v1/{c}' for c in caminhos]),
+            ('ASGI assíncrono', self.medir_asgi, asgi, [f'/api/v1/async/{c}' for c in caminhos]),
+        ]
+        try:
+            for nome, medir, aplicacao, rotas in cenarios:
+                self.stdout.write(nome)
+                teto = None
+                for concorrencia in options['concorrencia']:
+                    # Aquecimento: cache de tokens e do resumo, conexões abertas
+                    medir(aplicacao, rotas, token, len(rotas), 1)
+                    latencias, duracao = medir(aplicacao, rotas, token, options['requisicoes'], concorrencia)
+                    latencias = sorted(latencias)
+                    p99 = percentil(latencias, 0.99)
+                    if p99 <= options['limite_p99']:
+                        teto = concorrencia
+                    self.stdout.write(
+                        f'  {concorrencia:4d} simultâneas: p50 {statistics.median(latencias):7.1f} ms  '
+                        f'p99 {p99:7.1f} ms  {options["requisicoes"] / duracao:7.1f} req/s'
+                    )
+                self.stdout.write(self.style.SUCCESS(
+                    f'  Teto de concorrência (p99 <= {options["limite_p99"]:.0f} ms): {teto or "nenhum"}'
+                ))
+        finally:
+            user.delete()
@@ -0,0 +1,109 @@
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from servicos.atrasos import TAMANHO_BLOCO_ATRASOS, marcar_emprestimos_atrasados
+from servicos.models import Cliente, Emprestimo
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma carteira sintética de empréstimos e compara a marcação de '
+        'atrasos linha a linha em Python (amostra, extrapolada para a carteira) '
+        'com a varredura em blocos de marcar_atrasados. A varredura considera '
+        'todos os empréstimos do banco: use um banco descartável.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emprestimos', type=int, default=5_000_000)
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--vencidos', type=float, default=0.3,
+                            help='Fração da carteira aprovada e já vencida')
+        parser.add_argument('--amostra', type=int, default=2000,
+                            help='Empréstimos verificados um a um em Python')
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_ATRASOS)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def criar_carteira(self, hoje, options):
+        sorteio = random.Random(options['semente'])
+        prefixo = uuid.uuid4().hex[:8]
+        usuarios = User.objects.bulk_create([
+            User(username=f'bench-{prefixo}-{i}') for i in range(options['clientes'])
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(
+                user=user, cpf=f'{prefixo}-{i}', data_nascimento='1990-01-01',
+                telefone='0', endereco='benchmark'
+            )
+            for i, user in enumerate(usuarios)
+        ])
+
+        def emprestimo():
+            if sorteio.random() < options['vencidos']:
+                status, vencimento = 'APR', hoje - timedelta(days=sorteio.randint(1, 1500))
+            else:
+                status = sorteio.choice(('APR', 'APR', 'SOL', 'PAG', 'NEG'))
+                vencimento = hoje + timedelta(days=sorteio.randint(0, 3000)) if status == 'APR' else None
+            return Emprestimo(
+                cliente=sorteio.choice(clientes), valor_solicitado=Decimal('1000.00'),
+                taxa_juros=Decimal('2.00'), prazo_meses=12, status=status, data_vencimento=vencimento
+            )
+
+        bloco = 20_000
+        for inicio in range(0, options['emprestimos'], bloco):
+            Emprestimo.objects.bulk_create([emprestimo() for _ in range(min(bloco, options['emprestimos'] - inicio))])
+        return usuarios, clientes
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        inicio = time.perf_counter()
+        usuarios, clientes = self.criar_carteira(hoje, options)
+        self.stdout.write(f'{options["emprestimos"]} empréstimos criados em {time.perf_counter() - inicio:.1f}s')
+        try:
+            candidatos = Emprestimo.objects.filter(status='APR', data_vencimento__lt=hoje)
+            vencidos = candidatos.count()
+            aprovados = Emprestimo.objects.filter(status='APR').count()
+            self.stdout.write(f'Plano da consulta de cada bloco:\n{candidatos.order_by("data_vencimento", "id").values_list("id")[:1].explain()}')
+
+            # Linha a linha: percorre os aprovados e grava cada vencido com save()
+            inicio = time.perf_counter()
+            verificados = 0
+            for emprestimo in Emprestimo.objects.filter(status='APR').iterator(chunk_size=options['amostra']):
+                if emprestimo.data_vencimento < hoje:
+                    emprestimo.status = 'ATR'
+                    emprestimo.save(update_fields=['status', 'updated_at'])
+                verificados += 1
+                if verificados == options['amostra']:
+                    break
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Linha a linha: {verificados / duracao:9.1f} empréstimos/s  '
+                f'(estimativa para {aprovados} aprovados: {aprovados / verificados * duracao / 60:.1f} min)'
+            )
+
+            inicio = time.perf_counter()
+            checkpoint, marcados, _ = marcar_emprestimos_atrasados(
+                hoje, options['tamanho_bloco'], reiniciar=True
+            )
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Varredura:     {marcados / duracao:9.1f} empréstimos/s  '
+                f'({marcados} marcados em {duracao:.1f}s, blocos de {options["tamanho_bloco"]})'
+            )
+            self.stdout.write(f'  vencidos restantes: {candidatos.count()} de {vencidos}')
+        finally:
+            # Sem o coletor do ORM, que carregaria cada empréstimo para emitir post_delete
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {Emprestimo._meta.db_table} WHERE cliente_id IN '
+                    f'(SELECT id FROM {Cliente._meta.db_table} WHERE user_id IN '
+                    f'({", ".join(str(user.pk) for user in usuarios)}))'
+                )
+            User.objects.filter(pk__in=[user.pk for user in usuarios]).delete()
@@ -0,0 +1,49 @@
+import statistics
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from servicos.auditoria import escritor
+from servicos.lancamentos import lancar_transacao
+
+from ._bench import criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência de lançamentos sem auditoria, com a gravação do evento '
+        'na própria requisição e com a escrita adiada (fila + thread de fundo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lancamentos', type=int, default=2000)
+
+    def medir(self, conta_id, quantidade):
+        latencias = []
+        for _ in range(quantidade):
+            inicio = time.perf_counter()
+            lancar_transacao('DEP', Decimal('1.00'), conta_id)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        latencias.sort()
+        return statistics.median(latencias), latencias[int(len(latencias) * 0.99) - 1]
+
+    def handle(self, *args, **options):
+        user, _, contas = criar_dados_bench(1)
+        quantidade = options['lancamentos']
+        try:
+            with mock.patch('servicos.lancamentos.registrar_movimentos'):
+                sem = self.medir(contas[0].id, quantidade)
+            with mock.patch.object(escritor, 'enfileirar', escritor.gravar):
+                sincrona = self.medir(contas[0].id, quantidade)
+            adiada = self.medir(contas[0].id, quantidade)
+            inicio = time.perf_counter()
+            escritor.descarregar()
+            descarga = time.perf_counter() - inicio
+
+            for nome, (p50, p99) in (('Sem auditoria', sem), ('Síncrona', sincrona), ('Adiada', adiada)):
+                self.stdout.write(f'{nome:14s} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms')
+            self.stdout.write(f'Descarga final da fila: {descarga * 1000:.0f} ms')
+        finally:
+            user.delete()
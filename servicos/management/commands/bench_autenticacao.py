@@ -0,0 +1,53 @@
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from autenticacao.authentication import JWTCacheAuthentication, cache_tokens
+
+from ._bench import cliente_api, criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede requisições por segundo em GET /api/v1/contas/ com a autenticação '
+        'JWT padrão do simplejwt, com o cache de tokens desligado e ligado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=2000)
+        parser.add_argument('--contas', type=int, default=5)
+
+    def medir(self, client, requisicoes):
+        resposta = client.get('/api/v1/contas/')
+        assert resposta.status_code == 200, resposta.content
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            client.get('/api/v1/contas/')
+        return requisicoes / (time.perf_counter() - inicio)
+
+    def handle(self, *args, **options):
+        user, _, _ = criar_dados_bench(options['contas'])
+        client = cliente_api(user)
+        requisicoes = options['requisicoes']
+        ttl_original = cache_tokens.ttl
+
+        try:
+            with mock.patch.object(JWTCacheAuthentication, 'authenticate', JWTAuthentication.authenticate):
+                padrao = self.medir(client, requisicoes)
+
+            cache_tokens.limpar()
+            cache_tokens.ttl = 0
+            sem_cache = self.medir(client, requisicoes)
+
+            cache_tokens.ttl = ttl_original
+            com_cache = self.medir(client, requisicoes)
+
+            self.stdout.write(f'simplejwt padrão: {padrao:8.1f} req/s')
+            self.stdout.write(f'Sem cache:        {sem_cache:8.1f} req/s')
+            self.stdout.write(f'Com cache:        {com_cache:8.1f} req/s')
+            self.stdout.write(self.style.SUCCESS(f'Ganho sobre o padrão: {com_cache / padrao:.2f}x'))
+        finally:
+            cache_tokens.ttl = ttl_original
+            user.delete()
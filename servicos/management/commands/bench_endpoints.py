@@ -0,0 +1,487 @@
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from autenticacao.tokens import RefreshTokenCliente
+from servicos.auditoria import escritor
+from servicos.models import Cliente, ContaBancaria, Emprestimo, Investimento, Transacao
+from servicos.urls import router, urls_assincronas
+
+from .bench_asgi import percentil
+
+
+LINHA_DE_BASE = Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'
+SENHA_BENCH = 'Bench#Senha-2024'
+ITENS_POR_LOTE = 10
+DATA_APLICACAO = date(2024, 1, 1)
+
+
+@dataclass
+class Cenario:
+    """
+    Uma requisição repetida a um endpoint. `kwargs` e `corpo` recebem os
+    dados criados e o índice da repetição (para endpoints que consomem um
+    objeto a cada chamada, como DELETE ou resgatar).
+    """
+    rota: str
+    metodo: str = 'GET'
+    kwargs: object = None
+    corpo: object = None
+    consulta: str = ''
+    usuario: str = 'cliente'
+    status: int = 200
+
+    @property
+    def nome(self):
+        return f'{self.metodo} {self.rota}'
+
+
+def endpoints_do_router():
+    """(rota, método) de cada endpoint de servicos/urls.py"""
+    endpoints = {('api-root', 'GET')}
+    for _, viewset, basename in router.registry:
+        for rota in router.get_routes(viewset):
+            for metodo, acao in rota.mapping.items():
+                if hasattr(viewset, acao):
+                    endpoints.add((rota.name.format(basename=basename), metodo.upper()))
+    endpoints |= {(padrao.name, 'GET') for padrao in urls_assincronas}
+    return endpoints
+
+
+def _pk(atributo, consumivel=False):
+    if consumivel:
+        return lambda dados, i: {'pk': getattr(dados, atributo)[i].pk}
+    return lambda dados, i: {'pk': getattr(dados, atributo).pk}
+
+
+def cenarios():
+    conta = _pk('conta')
+    transacao = _pk('transacao')
+    emprestimo = _pk('emprestimo')
+    investimento = _pk('investimento')
+    cliente = _pk('cliente')
+    return [
+        Cenario('api-root'),
+
+        Cenario('cliente-list'),
+        # ClienteSerializer não recebe o usuário: o cadastro é feito pelo
+        # registro, então aqui se mede a validação
+        Cenario('cliente-list', 'POST', corpo=lambda dados, i: {}, status=400),
+        Cenario('cliente-detail', kwargs=cliente),
+        Cenario('cliente-detail', 'PUT', kwargs=cliente, corpo=lambda dados, i: {
+            'cpf': dados.cliente.cpf, 'data_nascimento': '1990-01-01',
+            'telefone': '11999999999', 'endereco': 'Rua A, 1'
+        }),
+        Cenario('cliente-detail', 'PATCH', kwargs=cliente, corpo=lambda dados, i: {'telefone': '11988888888'}),
+        Cenario('cliente-detail', 'DELETE', kwargs=_pk('clientes_descartaveis', True), usuario='staff', status=204),
+        Cenario('cliente-resumo', kwargs=cliente),
+
+        Cenario('contabancaria-list'),
+        # Idem: a conta não recebe o cliente pelo serializer
+        Cenario('contabancaria-list', 'POST', corpo=lambda dados, i: {}, status=400),
+        Cenario('contabancaria-detail', kwargs=conta),
+        Cenario('contabancaria-detail', 'PUT', kwargs=conta, corpo=lambda dados, i: {
+            'numero_conta': dados.conta.numero_conta, 'agencia': '0001', 'tipo_conta': 'CC',
+            'ativa': True, 'data_abertura': '2024-01-01'
+        }),
+        Cenario('contabancaria-detail', 'PATCH', kwargs=conta, corpo=lambda dados, i: {'agencia': '0002'}),
+        Cenario('contabancaria-detail', 'DELETE', kwargs=_pk('contas_descartaveis', True), status=204),
+        Cenario('contabancaria-extrato', kwargs=conta),
+        Cenario('contabancaria-saldo', kwargs=conta),
+
+        Cenario('transacao-list'),
+        Cenario('transacao-list', 'POST', corpo=lambda dados, i: {
+            'conta_origem_id': dados.conta.pk, 'tipo': 'DEP', 'valor': '10.00', 'descricao': 'Benchmark'
+        }, status=201),
+        Cenario('transacao-detail', kwargs=transacao),
+        Cenario('transacao-detail', 'PUT', kwargs=transacao, corpo=lambda dados, i: {
+            'tipo': 'DEP', 'valor': '10.00', 'descricao': 'Benchmark', 'status': 'CON'
+        }),
+        Cenario('transacao-detail', 'PATCH', kwargs=transacao, corpo=lambda dados, i: {'descricao': 'Benchmark'}),
+        Cenario('transacao-detail', 'DELETE', kwargs=_pk('transacoes_descartaveis', True), status=204),
+        Cenario('transacao-lote', 'POST', corpo=lambda dados, i: [
+            {'conta_origem_id': dados.conta.pk, 'tipo': 'DEP', 'valor': '10.00'}
+            for _ in range(ITENS_POR_LOTE)
+        ], status=201),
+
+        Cenario('emprestimo-list'),
+        Cenario('emprestimo-list', 'POST', corpo=lambda dados, i: {
+            'cliente_id': dados.cliente.pk, 'valor_solicitado': '5000.00', 'prazo_meses': 12
+        }, status=201),
+        Cenario('emprestimo-detail', kwargs=emprestimo),
+        Cenario('emprestimo-detail', 'PUT', kwargs=emprestimo, corpo=lambda dados, i: {
+            'valor_solicitado': '5000.00', 'valor_aprovado': '5000.00', 'taxa_juros': '1.50',
+            'prazo_meses': 12, 'status': 'APR'
+        }),
+        Cenario('emprestimo-detail', 'PATCH', kwargs=emprestimo, corpo=lambda dados, i: {'prazo_meses': 12}),
+        Cenario('emprestimo-detail', 'DELETE', kwargs=_pk('emprestimos_descartaveis', True), status=204),
+        Cenario('emprestimo-aprovar', 'POST', kwargs=_pk('emprestimos_solicitados', True),
+                corpo=lambda dados, i: {}, usuario='staff'),
+        Cenario('emprestimo-aprovar-lote', 'POST', corpo=lambda dados, i: [
+            {'emprestimo_id': emprestimo.pk}
+            for emprestimo in dados.lotes_solicitados[i * ITENS_POR_LOTE:(i + 1) * ITENS_POR_LOTE]
+        ], usuario='staff'),
+        Cenario('emprestimo-parcelas', kwargs=emprestimo),
+
+        Cenario('investimento-list'),
+        Cenario('investimento-list', 'POST', corpo=lambda dados, i: {
+            'cliente_id': dados.cliente.pk, 'tipo': 'CDB', 'valor_aplicado': '100.00', 'rentabilidade': '10.00'
+        }, status=201),
+        Cenario('investimento-detail', kwargs=investimento),
+        Cenario('investimento-detail', 'PUT', kwargs=investimento, corpo=lambda dados, i: {
+            'tipo': 'CDB', 'valor_aplicado': '1000.00', 'rentabilidade': '10.00'
+        }),
+        Cenario('investimento-detail', 'PATCH', kwargs=investimento, corpo=lambda dados, i: {'rentabilidade': '10.00'}),
+        Cenario('investimento-detail', 'DELETE', kwargs=_pk('investimentos_descartaveis', True), status=204),
+        Cenario('investimento-posicao'),
+        Cenario('investimento-resgatar', 'POST', kwargs=_pk('investimentos_resgataveis', True),
+                corpo=lambda dados, i: {}),
+
+        Cenario('async-conta-list'),
+        Cenario('async-conta-extrato', kwargs=conta),
+        Cenario('async-transacao-detail', kwargs=transacao),
+        Cenario('async-cliente-resumo', kwargs=cliente),
+
+        Cenario('token_obtain_pair', 'POST', usuario=None, corpo=lambda dados, i: {
+            'username': dados.usuario.username, 'password': SENHA_BENCH
+        }),
+        Cenario('token_refresh', 'POST', usuario=None, corpo=lambda dados, i: {'refresh': dados.refresh}),
+        Cenario('registro', 'POST', usuario=None, corpo=lambda dados, i: {
+            'username': f'registro-{i}', 'password': SENHA_BENCH, 'password2': SENHA_BENCH,
+            'email': f'registro-{i}@exemplo.com', 'first_name': 'Bench', 'last_name': 'Registro',
+            'cpf': f'R{i:013d}', 'data_nascimento': '1990-01-01', 'telefone': '11999999999',
+            'endereco': 'Rua A, 1'
+        }, status=201),
+    ]
+
+
+def criar_dados(registros, consumiveis):
+    """
+    Cliente com três contas, `registros` transações, empréstimos e
+    investimentos, mais `consumiveis` objetos de cada tipo que as repetições
+    de DELETE, aprovar e resgatar consomem.
+    """
+    hash_senha = make_password(SENHA_BENCH)
+    staff = User.objects.create(username='bench-staff', is_staff=True)
+    usuario = User.objects.create(username='bench-cliente', password=hash_senha)
+    cliente = Cliente.objects.create(
+        user=usuario, cpf='B0000000000000', data_nascimento='1990-01-01',
+        telefone='11999999999', endereco='Rua A, 1'
+    )
+    contas = ContaBancaria.objects.bulk_create([
+        ContaBancaria(
+            numero_conta=f'B{i:09d}', agencia='0001', tipo_conta='CC',
+            saldo=Decimal('1000000000.00'), cliente=cliente
+        )
+        for i in range(3 + consumiveis)
+    ])
+    agora = timezone.now()
+    transacoes = Transacao.objects.bulk_create([
+        Transacao(
+            conta_origem=contas[i % 3], conta_destino=contas[(i + 1) % 3] if i % 4 == 0 else None,
+            tipo='TRA' if i % 4 == 0 else 'DEP', valor=Decimal('10.00') + i, descricao='Benchmark',
+            status='CON', data_transacao=agora - timedelta(hours=i)
+        )
+        for i in range(registros + consumiveis)
+    ])
+
+    def emprestimos(quantidade, status):
+        aprovado = status == 'APR'
+        return Emprestimo.objects.bulk_create([
+            Emprestimo(
+                cliente=cliente, valor_solicitado=Decimal('5000.00'), taxa_juros=Decimal('1.50'), prazo_meses=12,
+                status=status, valor_aprovado=Decimal('5000.00') if aprovado else None,
+                data_aprovacao=DATA_APLICACAO if aprovado else None,
+                data_vencimento=date(2025, 1, 1) if aprovado else None
+            )
+            for _ in range(quantidade)
+        ])
+
+    def investimentos(quantidade):
+        return Investimento.objects.bulk_create([
+            Investimento(
+                cliente=cliente, tipo='CDB', valor_aplicado=Decimal('1000.00'), rentabilidade=Decimal('10.00'),
+                data_aplicacao=DATA_APLICACAO, data_vencimento=date(2030, 1, 1)
+            )
+            for _ in range(quantidade)
+        ])
+
+    descartaveis = User.objects.bulk_create([User(username=f'bench-descartavel-{i}') for i in range(consumiveis)])
+    return SimpleNamespace(
+        staff=staff, usuario=usuario, cliente=cliente, conta=contas[0], transacao=transacoes[0],
+        refresh=str(RefreshTokenCliente.for_user(usuario)),
+        emprestimo=emprestimos(registros, 'APR')[0],
+        investimento=investimentos(registros)[0],
+        clientes_descartaveis=Cliente.objects.bulk_create([
+            Cliente(
+                user=user, cpf=f'D{i:013d}', data_nascimento='1990-01-01',
+                telefone='11999999999', endereco='Rua A, 1'
+            )
+            for i, user in enumerate(descartaveis)
+        ]),
+        contas_descartaveis=contas[3:],
+        transacoes_descartaveis=transacoes[registros:],
+        emprestimos_descartaveis=emprestimos(consumiveis, 'SOL'),
+        emprestimos_solicitados=emprestimos(consumiveis, 'SOL'),
+        lotes_solicitados=emprestimos(consumiveis * ITENS_POR_LOTE, 'SOL'),
+        investimentos_descartaveis=investimentos(consumiveis),
+        investimentos_resgataveis=investimentos(consumiveis),
+    )
+
+
+class Medidor:
+    """Executa os cenários com o test client e coleta latência, consultas e alocações"""
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.clientes = {'cliente': APIClient(), 'staff': APIClient(), None: APIClient()}
+        for usuario in ('cliente', 'staff'):
+            token = RefreshTokenCliente.for_user(getattr(dados, 'usuario' if usuario == 'cliente' else usuario))
+            self.clientes[usuario].credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        self.consultas = 0
+
+    def contar(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+    def requisitar(self, cenario, indice):
+        """
+        Faz uma requisição do cenário. Retorna o caminho, a latência em ms, as
+        consultas e, com o tracemalloc ativo, o pico de memória alocada.
+        """
+        caminho = reverse(cenario.rota, kwargs=cenario.kwargs(self.dados, indice) if cenario.kwargs else None)
+        caminho += cenario.consulta
+        corpo = cenario.corpo(self.dados, indice) if cenario.corpo else None
+        metodo = getattr(self.clientes[cenario.usuario], cenario.metodo.lower())
+        # Respostas sempre calculadas: sem o cache de listagens e de resumos
+        for alias in ('default', 'listagens'):
+            caches[alias].clear()
+        # Fora da medição: a gravação da auditoria da requisição anterior
+        # (que disputaria a trava do SQLite) e a coleta de ciclos, desligada
+        # durante a requisição como no timeit
+        escritor.descarregar()
+        gc.collect()
+
+        alocado = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            alocado = -tracemalloc.get_traced_memory()[0]
+        self.consultas = 0
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            resposta = metodo(caminho, corpo, format='json') if corpo is not None else metodo(caminho)
+            latencia = (time.perf_counter() - inicio) * 1000
+        finally:
+            gc.enable()
+        if alocado is not None:
+            alocado += tracemalloc.get_traced_memory()[1]
+
+        if resposta.status_code != cenario.status:
+            raise CommandError(
+                f'{cenario.nome}: status {resposta.status_code}, esperado {cenario.status} '
+                f'({getattr(resposta, "data", resposta.content)!r:.300})'
+            )
+        return caminho, latencia, self.consultas, alocado
+
+    def medir(self, cenario, repeticoes, aquecimento, repeticoes_alocacao):
+        indices = iter(range(aquecimento + repeticoes + repeticoes_alocacao))
+        for _ in range(aquecimento):
+            self.requisitar(cenario, next(indices))
+
+        latencias, consultas = [], []
+        with ExitStack() as pilha:
+            for alias in connections:
+                pilha.enter_context(connections[alias].execute_wrapper(self.contar))
+            for _ in range(repeticoes):
+                caminho, latencia, quantidade, _ = self.requisitar(cenario, next(indices))
+                latencias.append(latencia)
+                consultas.append(quantidade)
+
+        # Alocações numa passada separada: o tracemalloc deixa tudo mais lento
+        alocacoes = []
+        tracemalloc.start()
+        try:
+            for _ in range(repeticoes_alocacao):
+                alocacoes.append(self.requisitar(cenario, next(indices))[3])
+        finally:
+            tracemalloc.stop()
+
+        latencias.sort()
+        return {
+            'rota': cenario.rota,
+            'metodo': cenario.metodo,
+            'caminho': caminho,
+            'status': cenario.status,
+            'p50_ms': round(percentil(latencias, 0.50), 3),
+            'p95_ms': round(percentil(latencias, 0.95), 3),
+            'p99_ms': round(percentil(latencias, 0.99), 3),
+            # Mediana: o cache de tokens expira por tempo e, de vez em quando,
+            # soma as consultas da autenticação a uma requisição
+            'consultas': statistics.median_low(consultas),
+            'alocacao_kb': round(statistics.median_low(alocacoes) / 1024, 1) if alocacoes else None,
+        }
+
+
+def medir_endpoints(repeticoes=30, aquecimento=3, repeticoes_alocacao=5, registros=100, saida=None):
+    """Mede todos os cenários no banco atual e retorna o relatório"""
+    todos = cenarios()
+    sem_cenario = endpoints_do_router() - {(cenario.rota, cenario.metodo) for cenario in todos}
+    if sem_cenario:
+        raise CommandError(f'Endpoints sem cenário de benchmark: {sorted(sem_cenario)}')
+
+    medidor = Medidor(criar_dados(registros, aquecimento + repeticoes + repeticoes_alocacao))
+    endpoints = {}
+    for cenario in todos:
+        endpoints[cenario.nome] = medidor.medir(cenario, repeticoes, aquecimento, repeticoes_alocacao)
+        if saida:
+            saida(cenario.nome, endpoints[cenario.nome])
+    return {
+        'gerado_em': timezone.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'maquina': platform.machine(),
+        },
+        'parametros': {
+            'repeticoes': repeticoes, 'aquecimento': aquecimento,
+            'repeticoes_alocacao': repeticoes_alocacao, 'registros': registros,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def comparar(relatorio, linha_de_base, limite_latencia=0.5, tolerancia_ms=2.0,
+             limite_consultas=0, limite_alocacao=0.25, tolerancia_kb=16.0):
+    """
+    Compara o relatório com a linha de base. Retorna as regressões como
+    (endpoint, métrica, valor de base, valor atual): latência p50/p95 acima
+    de `limite_latencia` (fração) e de `tolerancia_ms`, mais de
+    `limite_consultas` consultas a mais e alocação acima de `limite_alocacao`
+    e de `tolerancia_kb`.
+    """
+    regressoes = []
+    base = linha_de_base['endpoints']
+    for nome, atual in relatorio['endpoints'].items():
+        anterior = base.get(nome)
+        if anterior is None:
+            continue
+        for metrica in ('p50_ms', 'p95_ms'):
+            if (atual[metrica] > anterior[metrica] * (1 + limite_latencia)
+                    and atual[metrica] - anterior[metrica] > tolerancia_ms):
+                regressoes.append((nome, metrica, anterior[metrica], atual[metrica]))
+        if atual['consultas'] > anterior['consultas'] + limite_consultas:
+            regressoes.append((nome, 'consultas', anterior['consultas'], atual['consultas']))
+        if (anterior.get('alocacao_kb') is not None and atual['alocacao_kb'] is not None
+                and atual['alocacao_kb'] > anterior['alocacao_kb'] * (1 + limite_alocacao)
+                and atual['alocacao_kb'] - anterior['alocacao_kb'] > tolerancia_kb):
+            regressoes.append((nome, 'alocacao_kb', anterior['alocacao_kb'], atual['alocacao_kb']))
+    return regressoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede todos os endpoints do router de servicos (e os assíncronos) e o '
+        'login, refresh e registro de autenticacao pelo test client, num banco '
+        'SQLite de teste recém-criado: latência p50/p95/p99, consultas e '
+        'memória alocada por requisição. Grava um relatório JSON e o compara '
+        'com a linha de base, falhando se algum endpoint regredir além dos limites.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=30, help='Requisições medidas por endpoint')
+        parser.add_argument('--aquecimento', type=int, default=3)
+        parser.add_argument('--repeticoes-alocacao', type=int, default=5,
+                            help='Requisições medidas com tracemalloc por endpoint')
+        parser.add_argument('--registros', type=int, default=100,
+                            help='Transações, empréstimos e investimentos do cliente')
+        parser.add_argument('--saida', default='bench_endpoints.json', help='Relatório JSON gerado')
+        parser.add_argument('--linha-de-base', default=str(LINHA_DE_BASE))
+        parser.add_argument('--atualizar-linha-de-base', action='store_true',
+                            help='Grava o relatório como nova linha de base em vez de comparar')
+        parser.add_argument('--limite-latencia', type=float, default=0.5,
+                            help='Aumento máximo de p50/p95 (fração da linha de base)')
+        parser.add_argument('--tolerancia-ms', type=float, default=2.0,
+                            help='Aumentos de latência menores que isto são ignorados')
+        parser.add_argument('--limite-consultas', type=int, default=0,
+                            help='Consultas a mais toleradas por requisição')
+        parser.add_argument('--limite-alocacao', type=float, default=0.25,
+                            help='Aumento máximo da memória alocada (fração da linha de base)')
+        parser.add_argument('--tolerancia-kb', type=float, default=16.0,
+                            help='Aumentos de alocação menores que isto são ignorados')
+
+    def imprimir(self, nome, medida):
+        self.stdout.write(
+            f'{nome:<34} p50 {medida["p50_ms"]:8.2f}  p95 {medida["p95_ms"]:8.2f}  '
+            f'p99 {medida["p99_ms"]:8.2f} ms  {medida["consultas"]:3} consultas  '
+            f'{medida["alocacao_kb"]:8.1f} KB'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('O benchmark de endpoints roda apenas com SQLite (DB_ENGINE=sqlite3).')
+
+        # Como o test runner: banco de teste novo, DEBUG desligado
+        setup_test_environment(debug=False)
+        bancos = setup_databases(verbosity=0, interactive=False)
+        try:
+            relatorio = medir_endpoints(
+                options['repeticoes'], options['aquecimento'], options['repeticoes_alocacao'],
+                options['registros'], self.imprimir
+            )
+        finally:
+            teardown_databases(bancos, verbosity=0)
+            teardown_test_environment()
+
+        Path(options['saida']).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False) + '\n')
+        self.stdout.write(f'Relatório gravado em {options["saida"]}.')
+
+        caminho_base = Path(options['linha_de_base'])
+        if options['atualizar_linha_de_base']:
+            caminho_base.parent.mkdir(parents=True, exist_ok=True)
+            caminho_base.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Linha de base atualizada em {caminho_base}.'))
+            return
+        if not caminho_base.exists():
+            raise CommandError(f'Linha de base {caminho_base} não encontrada. Use --atualizar-linha-de-base.')
+
+        linha_de_base = json.loads(caminho_base.read_text())
+        novos = set(relatorio['endpoints']) - set(linha_de_base['endpoints'])
+        if novos:
+            self.stdout.write(f'Sem linha de base (não comparados): {", ".join(sorted(novos))}')
+        regressoes = comparar(
+            relatorio, linha_de_base, options['limite_latencia'], options['tolerancia_ms'],
+            options['limite_consultas'], options['limite_alocacao'], options['tolerancia_kb']
+        )
+        for nome, metrica, anterior, atual in regressoes:
+            self.stderr.write(f'{nome}: {metrica} {anterior} -> {atual}')
+        if regressoes:
+            raise CommandError(f'{len(regressoes)} regressão(ões) em relação à linha de base.')
+        self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação à linha de base.'))
@@ -0,0 +1,72 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from servicos.models import Transacao
+
+from ._bench import cliente_api, criar_dados_bench, rss_atual_mb
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um extrato grande e mede a exportação por streaming '
+        '(GET /api/v1/contas/{id}/extrato/?format=csv|ndjson): linhas/s e RSS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=1_000_000)
+        parser.add_argument('--formato', choices=('csv', 'ndjson'), default='csv')
+        parser.add_argument('--lote', type=int, default=10_000,
+                            help='Tamanho dos lotes de bulk_create na geração')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(42)
+        user, _, (conta, outra) = criar_dados_bench(2)
+        try:
+            self.stdout.write(f'Gerando {options["linhas"]} transações...')
+            agora = timezone.now()
+            inicio = time.perf_counter()
+            for base in range(0, options['linhas'], options['lote']):
+                Transacao.objects.bulk_create([
+                    Transacao(
+                        conta_origem=conta if i % 3 else outra,
+                        conta_destino=outra if i % 3 else conta,
+                        tipo='TRA',
+                        valor=Decimal(rnd.randint(1, 100000)) / 100,
+                        descricao='benchmark',
+                        status='CON',
+                        data_transacao=agora - timedelta(seconds=i)
+                    )
+                    for i in range(base, min(base + options['lote'], options['linhas']))
+                ])
+            self.stdout.write(f'Geração: {time.perf_counter() - inicio:.1f}s')
+
+            client = cliente_api(user)
+            rss_inicial = rss_atual_mb()
+            rss_pico = rss_inicial
+            inicio = time.perf_counter()
+            resposta = client.get(f'/api/v1/contas/{conta.id}/extrato/?format={options["formato"]}')
+            assert resposta.status_code == 200, resposta
+            linhas = 0
+            tamanho = 0
+            for bloco in resposta.streaming_content:
+                linhas += bloco.count(b'\n')
+                tamanho += len(bloco)
+                rss_pico = max(rss_pico, rss_atual_mb())
+            duracao = time.perf_counter() - inicio
+            if options['formato'] == 'csv':
+                linhas -= 1  # cabeçalho
+
+            self.stdout.write(f'Linhas exportadas: {linhas}')
+            self.stdout.write(f'Tamanho:           {tamanho / 2 ** 20:.1f} MB')
+            self.stdout.write(f'Duração:           {duracao:.2f}s')
+            self.stdout.write(f'Linhas/s:          {linhas / duracao:.0f}')
+            self.stdout.write(f'RSS inicial:       {rss_inicial:.1f} MB')
+            self.stdout.write(f'RSS pico:          {rss_pico:.1f} MB (+{rss_pico - rss_inicial:.1f} MB)')
+        finally:
+            Transacao.objects.filter(conta_origem__cliente__user=user).delete()
+            user.delete()
@@ -0,0 +1,80 @@
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from servicos.cache_listagens import ALIAS_CACHE
+from servicos.models import Emprestimo, Investimento
+
+from ._bench import cliente_api, criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula os painéis da equipe consultando /contas/, /emprestimos/ e '
+        '/investimentos/ repetidamente: latência e consultas sem cache, com '
+        'a resposta em cache e com If-None-Match (304).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registros', type=int, default=500,
+                            help='Contas, empréstimos e investimentos criados')
+        parser.add_argument('--consultas', type=int, default=50)
+
+    def criar_dados(self, quantidade):
+        user, cliente, contas = criar_dados_bench(quantidade, Decimal('100.00'), staff=True)
+        Emprestimo.objects.bulk_create([
+            Emprestimo(
+                cliente=cliente, valor_solicitado=Decimal('1000.00'), taxa_juros=Decimal('2.00'),
+                prazo_meses=12, status='SOL'
+            )
+            for _ in range(quantidade)
+        ])
+        Investimento.objects.bulk_create([
+            Investimento(
+                cliente=cliente, tipo='CDB', valor_aplicado=Decimal('100.00'),
+                rentabilidade=Decimal('10.00'), data_aplicacao=date(2024, 1, 1),
+                data_vencimento=date(2030, 1, 1)
+            )
+            for _ in range(quantidade)
+        ])
+        return user
+
+    def medir(self, client, caminho, repeticoes, limpar=False, etag=None):
+        latencias, consultas = [], []
+        cabecalhos = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        for _ in range(repeticoes):
+            if limpar:
+                caches[ALIAS_CACHE].clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resposta = client.get(caminho, **cabecalhos)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+            assert resposta.status_code == (304 if etag else 200), resposta.status_code
+        return statistics.median(latencias), max(consultas), resposta
+
+    def handle(self, *args, **options):
+        user = self.criar_dados(options['registros'])
+        client = cliente_api(user)
+        try:
+            for caminho in ('/api/v1/contas/', '/api/v1/emprestimos/', '/api/v1/investimentos/'):
+                # Aquecimento: cache de tokens
+                client.get(caminho)
+                sem_cache, consultas_sem_cache, _ = self.medir(client, caminho, options['consultas'], limpar=True)
+                client.get(caminho)
+                em_cache, consultas_em_cache, resposta = self.medir(client, caminho, options['consultas'])
+                nao_modificado, consultas_304, _ = self.medir(
+                    client, caminho, options['consultas'], etag=resposta['ETag']
+                )
+                self.stdout.write(caminho)
+                self.stdout.write(f'  sem cache: p50 {sem_cache:7.2f} ms  {consultas_sem_cache} consultas')
+                self.stdout.write(f'  em cache:  p50 {em_cache:7.2f} ms  {consultas_em_cache} consultas')
+                self.stdout.write(f'  304:       p50 {nao_modificado:7.2f} ms  {consultas_304} consultas')
+        finally:
+            user.delete()
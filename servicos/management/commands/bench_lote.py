@@ -0,0 +1,70 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from ._bench import cliente_api, criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de lançamentos um a um (POST /api/v1/transacoes/) '
+        'com o endpoint em lote (POST /api/v1/transacoes/lote/).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=5000,
+                            help='Itens enviados ao endpoint em lote')
+        parser.add_argument('--individuais', type=int, default=500,
+                            help='Requisições feitas pelo caminho individual')
+        parser.add_argument('--contas', type=int, default=100)
+        parser.add_argument('--ndjson', action='store_true',
+                            help='Enviar o lote como NDJSON')
+
+    def gerar_itens(self, quantidade, conta_ids, rnd):
+        itens = []
+        for _ in range(quantidade):
+            origem = rnd.choice(conta_ids)
+            tipo = rnd.choice(('DEP', 'DEP', 'SAQ', 'TRA'))
+            item = {'conta_origem_id': origem, 'tipo': tipo,
+                    'valor': str(Decimal(rnd.randint(1, 10000)) / 100)}
+            if tipo == 'TRA':
+                item['conta_destino_id'] = rnd.choice(conta_ids)
+            itens.append(item)
+        return itens
+
+    def handle(self, *args, **options):
+        rnd = random.Random(42)
+        user, _, contas = criar_dados_bench(options['contas'], Decimal('100000.00'))
+        conta_ids = [conta.id for conta in contas]
+        client = cliente_api(user)
+
+        try:
+            itens = self.gerar_itens(options['individuais'], conta_ids, rnd)
+            inicio = time.perf_counter()
+            for item in itens:
+                resposta = client.post('/api/v1/transacoes/', item, format='json')
+                assert resposta.status_code == 201, resposta.content
+            individual = len(itens) / (time.perf_counter() - inicio)
+
+            itens = self.gerar_itens(options['itens'], conta_ids, rnd)
+            if options['ndjson']:
+                corpo = '\n'.join(json.dumps(item) for item in itens)
+                content_type = 'application/x-ndjson'
+            else:
+                corpo = json.dumps(itens)
+                content_type = 'application/json'
+            inicio = time.perf_counter()
+            resposta = client.post('/api/v1/transacoes/lote/', corpo, content_type=content_type)
+            duracao = time.perf_counter() - inicio
+            assert resposta.status_code in (201, 207), resposta.content
+            lote = len(itens) / duracao
+
+            self.stdout.write(f'Individual: {individual:10.1f} transações/s ({options["individuais"]} requisições)')
+            self.stdout.write(f'Lote:       {lote:10.1f} transações/s ({len(itens)} itens, '
+                              f'{resposta.data["falhas"]} rejeitados)')
+            self.stdout.write(self.style.SUCCESS(f'Ganho:      {lote / individual:10.1f}x'))
+        finally:
+            user.delete()
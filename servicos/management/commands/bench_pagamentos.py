@@ -0,0 +1,98 @@
+import multiprocessing
+import random
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from servicos.auditoria import contexto_auditoria, escritor
+from servicos.models import ContaBancaria, Transacao
+from servicos.pagamentos import TAMANHO_BLOCO_PAGAMENTOS, processar_pagamentos
+
+from ._bench import criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Pico de fim de mês: agenda pagamentos (PAG) que vencem todos no mesmo '
+        'instante e mede a vazão (pagamentos/s) de vários workers de '
+        'run_payments em paralelo, cada um num processo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pagamentos', type=int, default=1_000_000)
+        parser.add_argument('--contas', type=int, default=10_000)
+        parser.add_argument('--sem-saldo', type=float, default=0.05,
+                            help='Fração das contas de origem sem saldo (pagamentos rejeitados)')
+        parser.add_argument('--processos', type=int, default=4)
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PAGAMENTOS)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def agendar(self, contas, options):
+        sorteio = random.Random(options['semente'])
+        sem_saldo = contas[:int(len(contas) * options['sem_saldo'])]
+        ContaBancaria.objects.filter(pk__in=[conta.id for conta in sem_saldo]).update(saldo=Decimal('0.00'))
+        vencimento = timezone.now()
+        bloco = 10_000
+        for inicio in range(0, options['pagamentos'], bloco):
+            Transacao.objects.bulk_create([
+                Transacao(
+                    conta_origem=origem, conta_destino=destino, tipo='PAG', valor=Decimal('10.00'),
+                    descricao='Boleto', status='PEN', data_transacao=vencimento, data_agendada=vencimento
+                )
+                for origem, destino in (
+                    sorteio.sample(contas, 2) for _ in range(min(bloco, options['pagamentos'] - inicio))
+                )
+            ])
+        return vencimento
+
+    def handle(self, *args, **options):
+        user, _, contas = criar_dados_bench(options['contas'], Decimal('1000000.00'))
+        try:
+            inicio = time.perf_counter()
+            vencimento = self.agendar(contas, options)
+            self.stdout.write(f'{options["pagamentos"]} pagamentos agendados em {time.perf_counter() - inicio:.1f}s')
+            saldo_antes = ContaBancaria.objects.filter(cliente__user=user).aggregate(total=Sum('saldo'))['total']
+
+            def trabalhar(saida):
+                try:
+                    with contexto_auditoria(None, 'bench.pagamentos'):
+                        totais = processar_pagamentos(vencimento, options['tamanho_bloco'])
+                    escritor.descarregar()
+                except Exception as exc:
+                    totais = exc
+                connections.close_all()
+                saida.put(totais)
+
+            # Conexões abertas não podem atravessar o fork
+            connections.close_all()
+            contexto = multiprocessing.get_context('fork')
+            saida = contexto.Queue()
+            processos = [contexto.Process(target=trabalhar, args=(saida,)) for _ in range(options['processos'])]
+            inicio = time.perf_counter()
+            for processo in processos:
+                processo.start()
+            resultados = [saida.get() for _ in processos]
+            duracao = time.perf_counter() - inicio
+            for processo in processos:
+                processo.join()
+            erros = [resultado for resultado in resultados if isinstance(resultado, Exception)]
+            if erros:
+                raise CommandError(f'{len(erros)} worker(s) falharam: {erros[0]!r}')
+            totais = sum(resultados, Counter())
+
+            processados = totais['CON'] + totais['REJ']
+            saldo_depois = ContaBancaria.objects.filter(cliente__user=user).aggregate(total=Sum('saldo'))['total']
+            pendentes = Transacao.objects.filter(tipo='PAG', status='PEN', data_agendada__lte=vencimento).count()
+            self.stdout.write(
+                f'{options["processos"]} worker(s): {processados / duracao:9.1f} pagamentos/s  '
+                f'({totais["CON"]} CON, {totais["REJ"]} REJ em {duracao:.1f}s)'
+            )
+            self.stdout.write(f'  pendentes vencidos restantes: {pendentes}')
+            self.stdout.write(f'  soma dos saldos preservada: {saldo_antes == saldo_depois}')
+        finally:
+            user.delete()
@@ -0,0 +1,91 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from autenticacao.revogacao import FiltroRevogacoes, filtro_revogacoes, podar_tokens_expirados
+from autenticacao.tokens import RefreshTokenCliente
+
+from ._bench import criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência de POST /api/auth/login/refresh/ com um histórico grande '
+        'de tokens emitidos e revogados, com e sem o filtro de revogações.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--historico', type=int, default=200000,
+                            help='Tokens históricos a criar (ex.: 10000000)')
+        parser.add_argument('--revogados', type=float, default=0.1,
+                            help='Fração do histórico na blacklist')
+        parser.add_argument('--requisicoes', type=int, default=500)
+
+    def criar_historico(self, user, quantidade, fracao_revogada, prefixo):
+        agora = timezone.now()
+        bloco = 10000
+        for inicio in range(0, quantidade, bloco):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(
+                    user=user, jti=f'{prefixo}-{i}', token='-', created_at=agora,
+                    # Metade já expirada, como num histórico real sem poda
+                    expires_at=agora + timedelta(days=1 if i % 2 else -1)
+                )
+                for i in range(inicio, min(inicio + bloco, quantidade))
+            ])
+            a_cada = round(1 / fracao_revogada) if fracao_revogada else 0
+            if a_cada:
+                BlacklistedToken.objects.bulk_create([
+                    BlacklistedToken(token=token) for token in tokens[::a_cada]
+                ])
+
+    def medir(self, client, refresh, requisicoes):
+        latencias = []
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            resposta = client.post('/api/auth/login/refresh/', {'refresh': refresh}, format='json')
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            assert resposta.status_code == 200, resposta.content
+        latencias.sort()
+        return statistics.median(latencias), latencias[int(len(latencias) * 0.95) - 1]
+
+    def handle(self, *args, **options):
+        user, _, _ = criar_dados_bench(1)
+        prefixo = f'bench-{uuid.uuid4().hex[:8]}'
+        try:
+            inicio = time.perf_counter()
+            self.criar_historico(user, options['historico'], options['revogados'], prefixo)
+            self.stdout.write(f'Histórico de {options["historico"]} tokens criado em '
+                              f'{time.perf_counter() - inicio:.1f}s')
+
+            client = APIClient(HTTP_HOST='localhost')
+            refresh = str(RefreshTokenCliente.for_user(user))
+
+            inicio = time.perf_counter()
+            filtro_revogacoes.reconstruir()
+            self.stdout.write(f'Filtro de revogações montado em {time.perf_counter() - inicio:.2f}s')
+
+            # Sem filtro: toda verificação consulta a blacklist, como no simplejwt
+            sem_filtro = FiltroRevogacoes()
+            with mock.patch.object(sem_filtro, 'pode_estar_revogado', return_value=True), \
+                    mock.patch('autenticacao.tokens.filtro_revogacoes', sem_filtro):
+                p50_sem, p95_sem = self.medir(client, refresh, options['requisicoes'])
+            p50_com, p95_com = self.medir(client, refresh, options['requisicoes'])
+
+            self.stdout.write(f'Sem filtro: p50 {p50_sem:6.2f} ms  p95 {p95_sem:6.2f} ms')
+            self.stdout.write(f'Com filtro: p50 {p50_com:6.2f} ms  p95 {p95_com:6.2f} ms')
+
+            inicio = time.perf_counter()
+            removidos = podar_tokens_expirados()
+            self.stdout.write(f'Poda: {removidos} tokens expirados removidos em {time.perf_counter() - inicio:.1f}s')
+        finally:
+            OutstandingToken.objects.filter(user=user).delete()
+            user.delete()
+            filtro_revogacoes.limpar()
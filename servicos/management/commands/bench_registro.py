@@ -0,0 +1,113 @@
+import logging
+import queue
+import statistics
+import threading
+import time
+import uuid
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+
+async def hash_na_propria_thread(senha):
+    return make_password(senha)
+
+
+class Command(BaseCommand):
+    help = (
+        'Dispara cadastros simultâneos em POST /api/auth/registro/, com uma '
+        'fração de CPFs repetidos, e mede cadastros/s e latência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cadastros', type=int, default=1000)
+        parser.add_argument('--concorrencia', type=int, default=50,
+                            help='Threads enviando cadastros ao mesmo tempo')
+        parser.add_argument('--duplicados', type=float, default=0.05,
+                            help='Fração de cadastros que repetem o CPF de outro')
+        parser.add_argument('--iteracoes', type=int, default=0,
+                            help='Iterações do PBKDF2 (0 = PASSWORD_PBKDF2_ITERACOES)')
+        parser.add_argument('--sem-pool', action='store_true',
+                            help='Calcula o hash na própria thread da requisição')
+
+    def payloads(self, prefixo, quantidade, fracao_duplicada):
+        a_cada = round(1 / fracao_duplicada) if fracao_duplicada else 0
+        for i in range(quantidade):
+            # Cada duplicado repete o CPF do cadastro anterior
+            cpf = i - 1 if a_cada and i and i % a_cada == 0 else i
+            yield {
+                'username': f'{prefixo}-{i}', 'password': 'senha-forte-123',
+                'password2': 'senha-forte-123', 'email': f'{prefixo}-{i}@exemplo.com',
+                'first_name': 'Bench', 'last_name': 'Registro',
+                'cpf': f'{prefixo}{cpf:05d}', 'data_nascimento': '1990-01-01',
+                'telefone': '0', 'endereco': 'benchmark'
+            }
+
+    def executar(self, fila, concorrencia):
+        latencias, status, lock = [], {}, threading.Lock()
+
+        def trabalhador():
+            client = APIClient(HTTP_HOST='localhost')
+            try:
+                while True:
+                    try:
+                        dados = fila.get_nowait()
+                    except queue.Empty:
+                        return
+                    inicio = time.perf_counter()
+                    try:
+                        codigo = client.post('/api/auth/registro/', dados).status_code
+                    except Exception:
+                        codigo = 'erro'
+                    with lock:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                        status[codigo] = status.get(codigo, 0) + 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - inicio, latencias, status
+
+    def handle(self, *args, **options):
+        # Os CPFs repetidos geram 400 de propósito
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        prefixo = f'r{uuid.uuid4().hex[:8]}'
+        fila = queue.Queue()
+        for dados in self.payloads(prefixo, options['cadastros'], options['duplicados']):
+            fila.put(dados)
+
+        ajustes = {'PASSWORD_PBKDF2_ITERACOES': options['iteracoes']} if options['iteracoes'] else {}
+        try:
+            with override_settings(**ajustes):
+                if options['sem_pool']:
+                    with mock.patch('autenticacao.views.gerar_hash_senha_async', hash_na_propria_thread):
+                        duracao, latencias, status = self.executar(fila, options['concorrencia'])
+                else:
+                    duracao, latencias, status = self.executar(fila, options['concorrencia'])
+        finally:
+            User.objects.filter(username__startswith=f'{prefixo}-').delete()
+
+        latencias.sort()
+        criados = status.get(201, 0)
+        self.stdout.write(f'Concorrência:  {options["concorrencia"]} threads'
+                          f'{" (hash sem pool)" if options["sem_pool"] else ""}')
+        self.stdout.write(f'Respostas:     {dict(sorted(status.items(), key=str))}')
+        self.stdout.write(f'Duração:       {duracao:.2f}s')
+        self.stdout.write(f'Cadastros/s:   {criados / duracao:.1f}')
+        self.stdout.write(f'Latência:      p50 {statistics.median(latencias):.1f} ms  '
+                          f'p95 {latencias[int(len(latencias) * 0.95) - 1]:.1f} ms')
+        esperados = options['cadastros'] - status.get(400, 0)
+        if criados == esperados and 'erro' not in status:
+            self.stdout.write(self.style.SUCCESS('Todos os cadastros válidos foram criados.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{esperados - criados} cadastros válidos falharam.'))
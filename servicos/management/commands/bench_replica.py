@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import cycle
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from autenticacao.tokens import RefreshTokenCliente
+from financeira_api.roteamento import ALIAS_REPLICA
+from servicos.models import Transacao
+
+from ._bench import criar_dados_bench, requisicao_wsgi
+from .bench_asgi import percentil
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as leituras dos viewsets com uma escrita contínua em paralelo, '
+        'com e sem o roteamento para a réplica. Requer o alias `replica` '
+        '(DB_REPLICA_NAME/DB_REPLICA_HOST); com SQLite, a réplica é um '
+        'segundo arquivo sincronizado a partir do primário antes da medição.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=600,
+                            help='Leituras por cenário')
+        parser.add_argument('--concorrencia', type=int, default=8)
+        parser.add_argument('--transacoes', type=int, default=2000)
+        parser.add_argument('--intervalo-escrita', type=float, default=0.0,
+                            help='Pausa (s) entre os depósitos do escritor')
+
+    def criar_dados(self, quantidade):
+        user, cliente, contas = criar_dados_bench(20, Decimal('1000.00'))
+        agora = timezone.now()
+        transacoes = Transacao.objects.bulk_create([
+            Transacao(
+                conta_origem=contas[i % 2], conta_destino=contas[1 - i % 2], tipo='TRA',
+                valor=Decimal('1.00'), status='CON', data_transacao=agora - timedelta(minutes=i)
+            )
+            for i in range(quantidade)
+        ])
+        caminhos = [
+            '/api/v1/contas/',
+            f'/api/v1/contas/{contas[0].id}/extrato/',
+            f'/api/v1/transacoes/{transacoes[0].id_transacao}/',
+            f'/api/v1/clientes/{cliente.id}/resumo/',
+        ]
+        return user, contas, caminhos
+
+    def sincronizar_replica(self):
+        """Copia o arquivo SQLite do primário para o da réplica (backup online)"""
+        primario, replica = connections['default'], connections[ALIAS_REPLICA]
+        if primario.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            return
+        replica.close()
+        origem = sqlite3.connect(primario.settings_dict['NAME'])
+        destino = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            origem.backup(destino)
+        finally:
+            origem.close()
+            destino.close()
+
+    def medir(self, aplicacao, caminhos, token, conta_id, options):
+        parar = threading.Event()
+        escritas = Counter()
+        corpo = json.dumps({'conta_origem_id': conta_id, 'tipo': 'DEP', 'valor': '1.00'}).encode()
+
+        def escrever():
+            while not parar.is_set():
+                status_code, _ = requisicao_wsgi(aplicacao, '/api/v1/transacoes/', token, 'POST', corpo)
+                escritas[status_code] += 1
+                if options['intervalo_escrita']:
+                    time.sleep(options['intervalo_escrita'])
+            connections.close_all()
+
+        def ler(caminho):
+            return requisicao_wsgi(aplicacao, caminho, token)
+
+        escritor = threading.Thread(target=escrever)
+        escritor.start()
+        try:
+            with ThreadPoolExecutor(options['concorrencia']) as pool:
+                inicio = time.perf_counter()
+                fila = (c for c, _ in zip(cycle(caminhos), range(options['requisicoes'])))
+                resultados = list(pool.map(ler, fila))
+                duracao = time.perf_counter() - inicio
+        finally:
+            parar.set()
+            escritor.join()
+        return resultados, duracao, escritas
+
+    def handle(self, *args, **options):
+        if ALIAS_REPLICA not in connections.settings:
+            raise CommandError(
+                'Configure a réplica (ex.: DB_REPLICA_NAME=replica.sqlite3, ou '
+                'DB_ENGINE=postgresql com DB_REPLICA_HOST) antes de executar.'
+            )
+        from financeira_api.wsgi import application
+
+        roteador = next(r for r in router.routers if hasattr(r, 'replica'))
+        consultas = Counter()
+
+        def contar(execute, sql, params, many, context):
+            consultas[context['connection'].alias] += 1
+            return execute(sql, params, many, context)
+
+        def instrumentar(sender, connection, **kwargs):
+            if contar not in connection.execute_wrappers:
+                connection.execute_wrappers.append(contar)
+
+        user, contas, caminhos = self.criar_dados(options['transacoes'])
+        token = str(RefreshTokenCliente.for_user(user).access_token)
+        self.sincronizar_replica()
+        connection_created.connect(instrumentar)
+        try:
+            for nome, alias in (('Somente primário', None), ('Leituras na réplica', ALIAS_REPLICA)):
+                roteador.replica = alias
+                connections.close_all()
+                # Aquecimento: cache de tokens e do resumo
+                for caminho in caminhos:
+                    requisicao_wsgi(application, caminho, token)
+                consultas.clear()
+
+                resultados, duracao, escritas = self.medir(
+                    application, caminhos, token, contas[0].id, options
+                )
+                latencias = sorted(latencia for _, latencia in resultados)
+                falhas = sum(1 for status_code, _ in resultados if status_code != 200)
+                self.stdout.write(nome)
+                self.stdout.write(
+                    f'  leituras: p50 {statistics.median(latencias):7.1f} ms  '
+                    f'p99 {percentil(latencias, 0.99):7.1f} ms  '
+                    f'{len(latencias) / duracao:7.1f} req/s  falhas {falhas}'
+                )
+                self.stdout.write(
+                    f'  escritas: {escritas[201]} concluídas, '
+                    f'{sum(escritas.values()) - escritas[201]} com erro'
+                )
+                self.stdout.write(
+                    '  consultas por banco: '
+                    + ', '.join(f'{alias} {total}' for alias, total in sorted(consultas.items()))
+                )
+        finally:
+            connection_created.disconnect(instrumentar)
+            roteador.replica = ALIAS_REPLICA
+            connections.close_all()
+            user.delete()
@@ -0,0 +1,109 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from servicos.auditoria import contexto_auditoria
+from servicos.models import Cliente, ContaBancaria, Investimento
+from servicos.resgates import RESGATE_TAMANHO_BLOCO, resgatar_vencidos
+
+from ._bench import cliente_api
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão (resgates/s) de POST /investimentos/{id}/resgatar/ '
+        'chamado um a um com o lote noturno de resgatar_investimentos, para '
+        'posições que vencem todas no mesmo dia.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--investimentos', type=int, default=200_000)
+        parser.add_argument('--clientes', type=int, default=2000)
+        parser.add_argument('--individuais', type=int, default=300,
+                            help='Investimentos resgatados um a um (amostra)')
+        parser.add_argument('--tamanho-bloco', type=int, default=RESGATE_TAMANHO_BLOCO)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def criar_dados(self, vencimento, options):
+        sorteio = random.Random(options['semente'])
+        prefixo = uuid.uuid4().hex[:8]
+        usuarios = User.objects.bulk_create([
+            User(username=f'bench-{prefixo}-{i}', is_staff=True) for i in range(options['clientes'])
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(
+                user=user, cpf=f'{prefixo}-{i}', data_nascimento='1990-01-01',
+                telefone='0', endereco='benchmark'
+            )
+            for i, user in enumerate(usuarios)
+        ])
+        ContaBancaria.objects.bulk_create([
+            ContaBancaria(numero_conta=f'{prefixo}-{i}', agencia='0001', tipo_conta='CC', cliente=cliente)
+            for i, cliente in enumerate(clientes)
+        ])
+        quantidade = options['investimentos'] + options['individuais']
+        ids = []
+        for inicio in range(0, quantidade, 10_000):
+            ids += [investimento.id for investimento in Investimento.objects.bulk_create([
+                Investimento(
+                    cliente=sorteio.choice(clientes), tipo=sorteio.choice(('CDB', 'LCI', 'LCA')),
+                    valor_aplicado=Decimal(sorteio.randint(100, 100_000)),
+                    rentabilidade=sorteio.choice((Decimal('9.50'), Decimal('10.75'), Decimal('12.00'))),
+                    data_aplicacao=vencimento - timedelta(days=sorteio.choice((180, 365, 730))),
+                    data_vencimento=vencimento
+                )
+                for _ in range(min(10_000, quantidade - inicio))
+            ])]
+        return usuarios, ids
+
+    def contar_consultas(self, contador):
+        def wrapper(execute, sql, params, many, context):
+            contador[0] += 1
+            return execute(sql, params, many, context)
+        # CaptureQueriesContext guarda só as últimas 9000 consultas
+        return connection.execute_wrapper(wrapper)
+
+    def handle(self, *args, **options):
+        vencimento = timezone.localdate()
+        usuarios, ids = self.criar_dados(vencimento, options)
+        client = cliente_api(usuarios[0])
+        try:
+            individuais = ids[:options['individuais']]
+            consultas = [0]
+            with self.contar_consultas(consultas):
+                inicio = time.perf_counter()
+                for investimento_id in individuais:
+                    resposta = client.post(f'/api/v1/investimentos/{investimento_id}/resgatar/')
+                    assert resposta.status_code == 200, resposta.data
+                duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Um a um:  {len(individuais) / duracao:9.1f} resgates/s  '
+                f'{consultas[0] / len(individuais):6.1f} consultas/investimento'
+            )
+
+            consultas = [0]
+            with contexto_auditoria(None, 'bench.resgates'):
+                with self.contar_consultas(consultas):
+                    inicio = time.perf_counter()
+                    totais = resgatar_vencidos(vencimento, options['tamanho_bloco'])
+                    duracao = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                repetido = resgatar_vencidos(vencimento, options['tamanho_bloco'])
+                duracao_repetido = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Em lote:  {totais["resgatados"] / duracao:9.1f} resgates/s  '
+                f'{consultas[0] / totais["resgatados"]:6.3f} consultas/investimento  '
+                f'({totais["resgatados"]} resgatados, R$ {totais["valor"]:.2f}, {totais["falhas"]} falhas)'
+            )
+            self.stdout.write(
+                f'Repetição do lote: {repetido["resgatados"]} resgatados em {duracao_repetido * 1000:.1f} ms'
+            )
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in usuarios]).delete()
@@ -0,0 +1,78 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from servicos.models import Cliente, ContaBancaria, Transacao
+from servicos.serializacao import compilar
+from servicos.serializers import ClienteSerializer, ContaBancariaResumoSerializer, TransacaoSerializer
+
+from ._bench import criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark dos serializers compilados contra os serializers do DRF '
+        '(tempo por 1.000 linhas, com e sem a consulta ao banco).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=1000)
+        parser.add_argument('--repeticoes', type=int, default=5)
+
+    def medir(self, funcao, repeticoes):
+        melhor = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            melhor = min(melhor, time.perf_counter() - inicio)
+        return melhor
+
+    def comparar(self, nome, serializer_class, queryset, linhas, repeticoes):
+        compilado = compilar(serializer_class)
+        instancias = list(queryset)
+        tuplas = list(compilado.valores(queryset))
+        por_mil = 1000 / linhas * 1000  # segundos -> ms por 1k linhas
+
+        drf = self.medir(lambda: serializer_class(instancias, many=True).data, repeticoes)
+        rapido = self.medir(lambda: compilado.serializar(tuplas), repeticoes)
+        drf_total = self.medir(lambda: serializer_class(list(queryset.all()), many=True).data, repeticoes)
+        rapido_total = self.medir(lambda: compilado.serializar(list(compilado.valores(queryset.all()))), repeticoes)
+
+        self.stdout.write(
+            f'{nome:<28} serialização: DRF {drf * por_mil:7.2f} ms  compilado {rapido * por_mil:6.2f} ms '
+            f'({drf / rapido:5.1f}x) | com consulta: DRF {drf_total * por_mil:7.2f} ms  '
+            f'compilado {rapido_total * por_mil:6.2f} ms ({drf_total / rapido_total:4.1f}x)'
+        )
+
+    def handle(self, *args, **options):
+        linhas = options['linhas']
+        user, cliente, contas = criar_dados_bench(linhas)
+        try:
+            Transacao.objects.bulk_create([
+                Transacao(
+                    conta_origem=contas[i], conta_destino=contas[-i] if i % 2 else None,
+                    tipo='TRA' if i % 2 else 'DEP', valor=Decimal(i) / 100,
+                    descricao=f'benchmark {i}', status='CON'
+                )
+                for i in range(linhas)
+            ])
+            repeticoes = options['repeticoes']
+            self.stdout.write(f'Tempo por 1.000 linhas (melhor de {repeticoes}):')
+            self.comparar(
+                'TransacaoSerializer', TransacaoSerializer,
+                Transacao.objects.filter(conta_origem__cliente=cliente)
+                .select_related('conta_origem', 'conta_destino'),
+                linhas, repeticoes
+            )
+            self.comparar(
+                'ContaBancariaResumoSerializer', ContaBancariaResumoSerializer,
+                ContaBancaria.objects.filter(cliente=cliente), linhas, repeticoes
+            )
+            self.comparar(
+                'ClienteSerializer', ClienteSerializer,
+                Cliente.objects.filter(pk=cliente.pk).select_related('user'), 1, repeticoes * 100
+            )
+        finally:
+            Transacao.objects.filter(conta_origem__cliente=cliente).delete()
+            user.delete()
@@ -0,0 +1,155 @@
+import json
+import multiprocessing
+import random
+import statistics
+import time
+from collections import Counter
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+
+from autenticacao.tokens import RefreshTokenCliente
+from servicos import lancamentos
+from servicos.auditoria import escritor
+
+from ._bench import criar_dados_bench, requisicao_wsgi
+from .bench_asgi import percentil
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga mista de leituras e escritas concorrentes na API sobre SQLite, '
+        'com as opções padrão do Django e com o perfil otimizado '
+        '(SQLITE_OPCOES_OTIMIZADAS: WAL, synchronous=NORMAL, mmap, cache, '
+        'busy_timeout e BEGIN IMMEDIATE). Cada processo faz o papel de um '
+        'worker síncrono do servidor WSGI. Conta os erros de lock.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=800)
+        parser.add_argument('--processos', type=int, default=16)
+        parser.add_argument('--escritas', type=float, default=0.5,
+                            help='Fração das requisições que são escritas')
+        parser.add_argument('--contas', type=int, default=20)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def preparar(self, opcoes):
+        """Troca as OPTIONS do alias default; vale para as próximas conexões"""
+        connections.close_all()
+        connections.settings['default']['OPTIONS'] = opcoes
+        with connections['default'].cursor() as cursor:
+            # journal_mode fica gravado no arquivo: voltar ao padrão explicitamente
+            cursor.execute('PRAGMA journal_mode=WAL' if opcoes else 'PRAGMA journal_mode=DELETE')
+
+    def medir(self, aplicacao, token, contas, erros_lock, options):
+        sorteio = random.Random(options['semente'])
+        operacoes = []
+        for i in range(options['requisicoes']):
+            if sorteio.random() < options['escritas']:
+                origem, destino = sorteio.sample(contas, 2)
+                corpo = {'conta_origem_id': origem.id, 'tipo': 'DEP', 'valor': '1.00'}
+                if sorteio.random() < 0.5:
+                    corpo = {'conta_origem_id': origem.id, 'conta_destino_id': destino.id,
+                             'tipo': 'TRA', 'valor': '1.00'}
+                operacoes.append(('POST', '/api/v1/transacoes/', json.dumps(corpo).encode()))
+            else:
+                caminho = sorteio.choice([
+                    '/api/v1/contas/', f'/api/v1/contas/{sorteio.choice(contas).id}/extrato/'
+                ])
+                operacoes.append(('GET', caminho, b''))
+
+        def trabalhar(parte, saida):
+            resultados = []
+            for metodo, caminho, corpo in parte:
+                status_code, latencia = requisicao_wsgi(aplicacao, caminho, token, metodo, corpo)
+                resultados.append((metodo, status_code, latencia))
+            escritor.descarregar()
+            connections.close_all()
+            saida.put((resultados, erros_lock))
+
+        # Conexões abertas não podem atravessar o fork
+        connections.close_all()
+        erros_lock.clear()
+        contexto = multiprocessing.get_context('fork')
+        saida = contexto.Queue()
+        processos = [
+            contexto.Process(target=trabalhar, args=(operacoes[i::options['processos']], saida))
+            for i in range(options['processos'])
+        ]
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.start()
+        partes = [saida.get() for _ in processos]
+        duracao = time.perf_counter() - inicio
+        for processo in processos:
+            processo.join()
+        return [r for resultados, _ in partes for r in resultados], duracao, sum((e for _, e in partes), Counter())
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Este benchmark requer o banco default em SQLite.')
+        if str(connections['default'].settings_dict['NAME']).startswith(':memory:'):
+            raise CommandError('Use um arquivo SQLite, não um banco em memória.')
+        from financeira_api.wsgi import application
+
+        erros_lock = Counter()
+
+        def contar_locks(execute, sql, params, many, context):
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as exc:
+                if 'locked' in str(exc).lower() or 'busy' in str(exc).lower():
+                    erros_lock['consultas'] += 1
+                raise
+
+        erro_de_concorrencia = lancamentos.erro_de_concorrencia
+
+        def contar_retentativas(exc):
+            repetivel = erro_de_concorrencia(exc)
+            # Inclui os locks no COMMIT, que não passam pelos execute_wrappers
+            erros_lock['retentativas'] += repetivel
+            return repetivel
+
+        def instrumentar(sender, connection, **kwargs):
+            if contar_locks not in connection.execute_wrappers:
+                connection.execute_wrappers.append(contar_locks)
+
+        opcoes_originais = connections.settings['default']['OPTIONS']
+        user, _, contas = criar_dados_bench(options['contas'], Decimal('1000000.00'))
+        token = str(RefreshTokenCliente.for_user(user).access_token)
+        connection_created.connect(instrumentar)
+        try:
+            with mock.patch.object(lancamentos, 'erro_de_concorrencia', contar_retentativas):
+                for nome, opcoes in (('Padrão do Django', {}),
+                                     ('Perfil otimizado', dict(settings.SQLITE_OPCOES_OTIMIZADAS))):
+                    self.preparar(opcoes)
+                    # Aquecimento: cache de tokens herdado pelos processos
+                    requisicao_wsgi(application, '/api/v1/contas/', token)
+
+                    resultados, duracao, locks = self.medir(application, token, contas, erros_lock, options)
+                    latencias = sorted(latencia for _, _, latencia in resultados)
+                    escritas = [r for r in resultados if r[0] == 'POST']
+                    falhas = sum(
+                        1 for metodo, status_code, _ in resultados
+                        if status_code != (201 if metodo == 'POST' else 200)
+                    )
+                    self.stdout.write(nome)
+                    self.stdout.write(
+                        f'  {len(resultados) / duracao:7.1f} req/s  '
+                        f'p50 {statistics.median(latencias):7.1f} ms  '
+                        f'p99 {percentil(latencias, 0.99):7.1f} ms  '
+                        f'({len(escritas)} escritas)'
+                    )
+                    self.stdout.write(
+                        f'  erros de lock: {locks["consultas"]} em consultas, '
+                        f'{locks["retentativas"]} retentativas do motor  '
+                        f'requisições com falha: {falhas}'
+                    )
+        finally:
+            connection_created.disconnect(instrumentar)
+            self.preparar(opcoes_originais)
+            user.delete()
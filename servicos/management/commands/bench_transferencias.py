@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+
+from servicos.lancamentos import ErroLancamento, lancar_transacao
+from servicos.models import ContaBancaria, Transacao
+
+from ._bench import criar_dados_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de transferências concorrentes: várias threads transferem '
+        'de/para uma conta "quente" e ao final verifica-se que nenhum valor '
+        'foi perdido ou criado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50)
+        parser.add_argument('--transferencias', type=int, default=40,
+                            help='Transferências por thread')
+        parser.add_argument('--contas', type=int, default=10,
+                            help='Contas frias que trocam valores com a conta quente')
+        parser.add_argument('--saldo-inicial', type=Decimal, default=Decimal('1000.00'))
+        parser.add_argument('--manter', action='store_true',
+                            help='Não remover os dados gerados ao final')
+
+    def handle(self, *args, **options):
+        saldo_inicial = options['saldo_inicial']
+        user, _, contas = criar_dados_bench(options['contas'] + 1, saldo_inicial)
+        conta_ids = [conta.id for conta in contas]
+        quente, frias = conta_ids[0], conta_ids[1:]
+        total_inicial = saldo_inicial * len(conta_ids)
+
+        confirmadas = []
+        rejeitadas = []
+        falhas = []
+
+        def trabalhador(semente):
+            rnd = random.Random(semente)
+            ok = rejeitada = falha = 0
+            try:
+                for _ in range(options['transferencias']):
+                    fria = rnd.choice(frias)
+                    origem, destino = (quente, fria) if rnd.random() < 0.5 else (fria, quente)
+                    valor = Decimal(rnd.randint(1, 5000)) / 100
+                    try:
+                        lancar_transacao('TRA', valor, origem, destino, 'benchmark')
+                        ok += 1
+                    except ErroLancamento:
+                        rejeitada += 1
+                    except Exception:
+                        falha += 1
+            finally:
+                connections.close_all()
+            confirmadas.append(ok)
+            rejeitadas.append(rejeitada)
+            falhas.append(falha)
+
+        threads = [
+            threading.Thread(target=trabalhador, args=(semente,))
+            for semente in range(options['threads'])
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        total_final = ContaBancaria.objects.filter(pk__in=conta_ids).aggregate(
+            total=Sum('saldo')
+        )['total']
+        saldo_quente = ContaBancaria.objects.get(pk=quente).saldo
+        entradas = Transacao.objects.filter(
+            conta_destino_id=quente, status='CON'
+        ).aggregate(total=Sum('valor'))['total'] or 0
+        saidas = Transacao.objects.filter(
+            conta_origem_id=quente, status='CON'
+        ).aggregate(total=Sum('valor'))['total'] or 0
+
+        self.stdout.write(f'Threads:            {options["threads"]}')
+        self.stdout.write(f'Confirmadas:        {sum(confirmadas)}')
+        self.stdout.write(f'Rejeitadas (saldo): {sum(rejeitadas)}')
+        self.stdout.write(f'Falhas:             {sum(falhas)}')
+        self.stdout.write(f'Duração:            {duracao:.2f}s')
+        self.stdout.write(f'Transferências/s:   {sum(confirmadas) / duracao:.1f}')
+        self.stdout.write(f'Total inicial:      {total_inicial}')
+        self.stdout.write(f'Total final:        {total_final}')
+
+        conservado = total_final == total_inicial
+        conciliado = saldo_quente == saldo_inicial + entradas - saidas
+        if conservado and conciliado:
+            self.stdout.write(self.style.SUCCESS('Nenhum valor perdido: saldos conferem com o razão.'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'Divergência! conta quente={saldo_quente}, '
+                f'esperado={saldo_inicial + entradas - saidas}'
+            ))
+
+        if not options['manter']:
+            user.delete()
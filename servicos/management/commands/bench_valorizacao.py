@@ -0,0 +1,59 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from servicos.models import Investimento
+from servicos.valorizacao import curva_de_acumulacao, fator_diario, posicao_consolidada, valorizar
+
+
+TAXAS = [Decimal(taxa) for taxa in ('8.50', '9.75', '10.25', '11.00', '12.15', '13.65')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a valorização de uma carteira sintética em memória e, com '
+        '--carteira, da carteira real do banco (incluindo a consulta).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posicoes', type=int, default=500000)
+        parser.add_argument('--carteira', action='store_true',
+                            help='Valorizar também os investimentos gravados no banco')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(42)
+        hoje = timezone.localdate()
+        tipos = [tipo for tipo, _ in Investimento.TIPO_INVESTIMENTO_CHOICES]
+        linhas = []
+        for _ in range(options['posicoes']):
+            aplicacao = hoje - timedelta(days=rnd.randint(0, 1500))
+            vencimento = aplicacao + timedelta(days=rnd.choice((180, 360, 720, 1080, 1800)))
+            linhas.append((
+                rnd.choice(tipos), Decimal(rnd.randint(10000, 10000000)) / 100,
+                rnd.choice(TAXAS), aplicacao, vencimento
+            ))
+
+        for rodada in ('cache frio', 'cache quente'):
+            if rodada == 'cache frio':
+                fator_diario.cache_clear()
+                curva_de_acumulacao.cache_clear()
+            inicio = time.perf_counter()
+            _, total = valorizar(linhas, hoje)
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'{len(linhas)} posições ({rodada}): {duracao * 1000:8.1f} ms  '
+                f'valor atual {total.valor_atual:.2f}'
+            )
+        self.stdout.write(f'Curvas em cache: {curva_de_acumulacao.cache_info().currsize}')
+
+        if options['carteira']:
+            inicio = time.perf_counter()
+            posicao = posicao_consolidada(Investimento.objects.all(), hoje)
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'Carteira do banco: {posicao["total"]["quantidade"]} posições em {duracao * 1000:.1f} ms'
+            )
@@ -0,0 +1,40 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from servicos.atrasos import TAMANHO_BLOCO_ATRASOS, marcar_emprestimos_atrasados
+
+
+class Command(BaseCommand):
+    help = (
+        'Marca como atrasados (ATR) os empréstimos aprovados cujo vencimento já '
+        'passou, em blocos. Uma execução interrompida é retomada do último '
+        'bloco confirmado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', help='Data de referência (AAAA-MM-DD); padrão: hoje')
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_ATRASOS,
+                            help='Empréstimos marcados por transação')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre os blocos')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Ignorar o checkpoint de uma execução interrompida')
+
+    def handle(self, *args, **options):
+        try:
+            referencia = date.fromisoformat(options['data']) if options['data'] else None
+        except ValueError:
+            raise CommandError('Data inválida. Use o formato AAAA-MM-DD.')
+
+        inicio = time.perf_counter()
+        checkpoint, marcados, retomada = marcar_emprestimos_atrasados(
+            referencia, options['tamanho_bloco'], options['pausa'], options['reiniciar']
+        )
+        if retomada:
+            self.stdout.write(f'Execução de {checkpoint.iniciada_em:%Y-%m-%d %H:%M} retomada.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{marcados} empréstimo(s) marcado(s) como atrasado(s) em {time.perf_counter() - inicio:.1f}s '
+            f'({checkpoint.processados} na execução com referência {checkpoint.data_referencia}).'
+        ))
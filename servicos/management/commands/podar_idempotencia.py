@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from servicos.idempotencia import TAMANHO_BLOCO_PODA, podar_chaves_expiradas
+
+
+class Command(BaseCommand):
+    help = 'Remove em blocos as Idempotency-Keys expiradas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PODA,
+                            help='Chaves removidas por transação')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre os blocos')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        removidas = podar_chaves_expiradas(options['tamanho_bloco'], options['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{removidas} chaves expiradas removidas em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from servicos.saldos import TAMANHO_BLOCO_CONTAS, reconstruir_saldos_do_log
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói o saldo das contas a partir do log de auditoria (EventoSaldo). '
+        'Sem --aplicar apenas lista as divergências. Rode com a aplicação parada '
+        'ou após o escritor descarregar a fila, para não perder eventos ainda em memória.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conta', type=int, action='append', dest='contas',
+                            help='Processar apenas esta conta (pode ser repetido)')
+        parser.add_argument('--arquivos', action='store_true',
+                            help='Ler os segmentos locais (AUDITORIA_DIRETORIO) em vez da tabela')
+        parser.add_argument('--aplicar', action='store_true',
+                            help='Gravar nas contas divergentes o saldo do log')
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_CONTAS,
+                            help='Quantidade de contas processadas por transação')
+
+    def handle(self, *args, **options):
+        divergencias = reconstruir_saldos_do_log(
+            options['contas'], options['aplicar'], options['arquivos'], options['tamanho_bloco']
+        )
+        for divergencia in divergencias:
+            self.stdout.write(str(divergencia))
+        if options['aplicar']:
+            self.stdout.write(self.style.SUCCESS(f'{len(divergencias)} saldo(s) reconstruído(s) a partir do log.'))
+        elif divergencias:
+            raise CommandError(f'{len(divergencias)} divergência(s) entre as contas e o log.')
+        else:
+            self.stdout.write(self.style.SUCCESS('Saldos consistentes com o log de auditoria.'))
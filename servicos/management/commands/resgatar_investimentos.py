@@ -0,0 +1,36 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from servicos.auditoria import contexto_auditoria
+from servicos.resgates import RESGATE_TAMANHO_BLOCO, resgatar_vencidos
+
+
+class Command(BaseCommand):
+    help = (
+        'Resgata os investimentos ativos que vencem até a data: credita o valor '
+        'atualizado na conta ativa mais recente do cliente e desativa a posição. '
+        'Repetir para a mesma data não resgata nada duas vezes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', help='Data de referência (AAAA-MM-DD); padrão: hoje')
+        parser.add_argument('--tamanho-bloco', type=int, default=RESGATE_TAMANHO_BLOCO,
+                            help='Investimentos resgatados por transação')
+
+    def handle(self, *args, **options):
+        try:
+            referencia = date.fromisoformat(options['data']) if options['data'] else None
+        except ValueError:
+            raise CommandError('Data inválida. Use o formato AAAA-MM-DD.')
+
+        inicio = time.perf_counter()
+        with contexto_auditoria(None, 'comando.resgatar_investimentos'):
+            totais = resgatar_vencidos(referencia, options['tamanho_bloco'])
+        if totais['falhas']:
+            self.stderr.write(f'{totais["falhas"]} investimento(s) sem conta ativa para o crédito.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{totais["resgatados"]} investimento(s) resgatado(s), R$ {totais["valor"]:.2f} creditados '
+            f'em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from servicos.auditoria import contexto_auditoria
+from servicos.pagamentos import TAMANHO_BLOCO_PAGAMENTOS, processar_pagamentos
+
+
+class Command(BaseCommand):
+    help = (
+        'Efetiva os pagamentos (PAG) agendados que já venceram: debita a conta '
+        'de origem, credita a de destino e move cada pagamento de PEN para CON '
+        '(ou REJ, sem saldo). Várias instâncias podem rodar em paralelo; cada '
+        'uma reivindica blocos diferentes da fila.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PAGAMENTOS,
+                            help='Pagamentos efetivados por transação')
+        parser.add_argument('--limite', type=int,
+                            help='Máximo de pagamentos processados por execução')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Continuar verificando a fila até ser interrompido')
+        parser.add_argument('--intervalo', type=float, default=60.0,
+                            help='Segundos de espera entre as verificações no modo contínuo')
+
+    def executar(self, options):
+        inicio = time.perf_counter()
+        totais = processar_pagamentos(tamanho_bloco=options['tamanho_bloco'], limite=options['limite'])
+        if totais.total() or not options['continuo']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{totais["CON"]} pagamento(s) confirmado(s), {totais["REJ"]} rejeitado(s) '
+                f'em {time.perf_counter() - inicio:.1f}s.'
+            ))
+
+    def handle(self, *args, **options):
+        with contexto_auditoria(None, 'comando.run_payments'):
+            if not options['continuo']:
+                self.executar(options)
+                return
+            try:
+                while True:
+                    close_old_connections()
+                    self.executar(options)
+                    time.sleep(options['intervalo'])
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from servicos.saldos import TAMANHO_BLOCO_CONTAS, verificar_saldos_diarios
+
+
+class Command(BaseCommand):
+    help = 'Confere os saldos diários e o saldo atual das contas contra as transações confirmadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conta', type=int, action='append', dest='contas',
+                            help='Verificar apenas esta conta (pode ser repetido)')
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_CONTAS)
+
+    def handle(self, *args, **options):
+        divergencias = verificar_saldos_diarios(options['contas'], options['tamanho_bloco'])
+        for divergencia in divergencias:
+            self.stdout.write(str(divergencia))
+        if divergencias:
+            raise CommandError(f'{len(divergencias)} divergência(s) encontrada(s).')
+        self.stdout.write(self.style.SUCCESS('Saldos diários consistentes com o razão.'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['conta_origem', 'status', 'data_transacao'], name='transacao_orig_status_data'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['conta_destino', 'status', 'data_transacao'], name='transacao_dest_status_data'),
+        ),
+    ]
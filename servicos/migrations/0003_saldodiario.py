@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0002_transacao_indices_extrato'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Saldo')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('conta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to='servicos.contabancaria')),
+            ],
+            options={
+                'verbose_name': 'Saldo Diário',
+                'verbose_name_plural': 'Saldos Diários',
+                'ordering': ['-data'],
+                'constraints': [models.UniqueConstraint(fields=('conta', 'data'), name='saldo_diario_conta_data')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0003_saldodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emprestimo',
+            name='sistema_amortizacao',
+            field=models.CharField(choices=[('PRICE', 'Tabela Price'), ('SAC', 'Sistema de Amortização Constante')], default='PRICE', max_length=5, verbose_name='Sistema de Amortização'),
+        ),
+    ]
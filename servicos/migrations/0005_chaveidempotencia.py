@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:57
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0004_emprestimo_sistema_amortizacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rota', models.CharField(max_length=50, verbose_name='Rota')),
+                ('chave', models.CharField(max_length=255, verbose_name='Chave')),
+                ('hash_requisicao', models.CharField(max_length=64, verbose_name='Hash da Requisição')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status da Resposta')),
+                ('resposta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resposta')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expira_em', models.DateTimeField(db_index=True, verbose_name='Expira em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chaves_idempotencia', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Chave de Idempotência',
+                'verbose_name_plural': 'Chaves de Idempotência',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'rota', 'chave'), name='idempotencia_usuario_rota_chave')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0005_chaveidempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSaldo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conta_id', models.BigIntegerField(db_index=True, verbose_name='Conta')),
+                ('transacao_id', models.UUIDField(blank=True, null=True, verbose_name='Transação')),
+                ('delta', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Delta')),
+                ('saldo_resultante', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Saldo Resultante')),
+                ('ator_id', models.BigIntegerField(blank=True, null=True, verbose_name='Usuário')),
+                ('origem', models.CharField(blank=True, max_length=50, verbose_name='Origem')),
+                ('ocorrido_em', models.DateTimeField(verbose_name='Ocorrido em')),
+            ],
+            options={
+                'verbose_name': 'Evento de Saldo',
+                'verbose_name_plural': 'Eventos de Saldo',
+                'ordering': ['id'],
+            },
+        ),
+    ]
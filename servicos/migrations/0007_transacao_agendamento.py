@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:16
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def agendar_pagamentos_pendentes(apps, schema_editor):
+    # Pagamentos pendentes anteriores ao agendamento vencem na data em que foram criados
+    Transacao = apps.get_model('servicos', 'Transacao')
+    Transacao.objects.filter(tipo='PAG', status='PEN', data_agendada__isnull=True).update(
+        data_agendada=F('data_transacao')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0006_eventosaldo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transacao',
+            name='data_agendada',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Data Agendada'),
+        ),
+        migrations.AddField(
+            model_name='transacao',
+            name='data_fim_recorrencia',
+            field=models.DateField(blank=True, null=True, verbose_name='Fim da Recorrência'),
+        ),
+        migrations.AddField(
+            model_name='transacao',
+            name='recorrencia',
+            field=models.CharField(blank=True, choices=[('', 'Sem recorrência'), ('SEM', 'Semanal'), ('MEN', 'Mensal')], default='', max_length=3, verbose_name='Recorrência'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(condition=models.Q(('status', 'PEN'), ('tipo', 'PAG')), fields=['data_agendada'], name='transacao_pag_pendente'),
+        ),
+        migrations.RunPython(agendar_pagamentos_pendentes, migrations.RunPython.noop),
+    ]
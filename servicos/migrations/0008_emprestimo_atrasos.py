@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0007_transacao_agendamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointVarredura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('data_referencia', models.DateField(verbose_name='Data de Referência')),
+                ('ultimo_vencimento', models.DateField(blank=True, null=True, verbose_name='Último Vencimento')),
+                ('ultimo_id', models.BigIntegerField(default=0, verbose_name='Último ID')),
+                ('processados', models.PositiveIntegerField(default=0, verbose_name='Processados')),
+                ('iniciada_em', models.DateTimeField(verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Varredura',
+                'verbose_name_plural': 'Checkpoints de Varredura',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['status', 'data_vencimento'], name='emprestimo_status_vencimento'),
+        ),
+    ]
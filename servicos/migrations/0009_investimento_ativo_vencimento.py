@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0008_emprestimo_atrasos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investimento',
+            index=models.Index(fields=['ativo', 'data_vencimento'], name='investimento_ativo_vencimento'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0009_investimento_ativo_vencimento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transacao',
+            name='inicio_recorrencia',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Início da Recorrência'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:05
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+
+
+TAMANHO_BLOCO = 1000
+
+
+def registrar_aberturas(apps, schema_editor):
+    """
+    Contas existentes recebem um evento de abertura com o saldo que a trilha
+    não explica (saldo atual - soma dos deltas), para que o log passe a ser
+    reconstruído somando os deltas. Rode com a aplicação parada, depois de os
+    escritores descarregarem suas filas.
+    """
+    ContaBancaria = apps.get_model('servicos', 'ContaBancaria')
+    EventoSaldo = apps.get_model('servicos', 'EventoSaldo')
+    em_arquivo = getattr(settings, 'AUDITORIA_DESTINO', 'banco') == 'arquivo'
+    if em_arquivo:
+        from servicos.auditoria import segmentos_configurados
+        somas = {}
+        for evento in segmentos_configurados().ler():
+            somas[evento.conta_id] = somas.get(evento.conta_id, Decimal('0.00')) + evento.delta
+    else:
+        somas = dict(
+            EventoSaldo.objects.order_by().values('conta_id')
+            .annotate(total=Sum('delta')).values_list('conta_id', 'total')
+        )
+
+    agora = timezone.now()
+    aberturas = [
+        EventoSaldo(
+            conta_id=conta_id, transacao_id=None, delta=saldo - somas.get(conta_id, 0),
+            saldo_resultante=saldo - somas.get(conta_id, 0), origem='abertura', ocorrido_em=agora
+        )
+        for conta_id, saldo in ContaBancaria.objects.order_by('pk').values_list('id', 'saldo').iterator()
+        if saldo != somas.get(conta_id, 0)
+    ]
+    for inicio in range(0, len(aberturas), TAMANHO_BLOCO):
+        lote = aberturas[inicio:inicio + TAMANHO_BLOCO]
+        if em_arquivo:
+            segmentos_configurados().gravar(lote)
+        else:
+            EventoSaldo.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicos', '0010_transacao_inicio_recorrencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(registrar_aberturas, migrations.RunPython.noop),
+    ]
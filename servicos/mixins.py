@@ -0,0 +1,150 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+
+from . import cache_listagens
+from .serializacao import compilar
+
+
+class PlanoConsulta:
+    """select_related/prefetch_related/only necessários para um serializer"""
+
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.only = []
+        # only() só é seguro se todos os campos forem colunas do modelo
+        self.usar_only = True
+
+    def aplicar(self, queryset, usar_only=True):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if usar_only and self.usar_only and self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _percorrer(serializer, model, plano, prefixo='', em_prefetch=False):
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        if campo.source == '*':
+            plano.usar_only = False
+            continue
+
+        partes = campo.source.split('.')
+        modelo_atual, caminho, prefetch = model, prefixo, em_prefetch
+        for indice, parte in enumerate(partes):
+            try:
+                campo_modelo = modelo_atual._meta.get_field(parte)
+            except FieldDoesNotExist:
+                # Propriedade ou método do modelo: não dá para restringir colunas
+                plano.usar_only = False
+                break
+            caminho = f'{caminho}__{parte}' if caminho else parte
+
+            if not campo_modelo.is_relation:
+                if not prefetch:
+                    plano.only.append(caminho)
+                break
+
+            ultima = indice == len(partes) - 1
+            aninhado = ultima and isinstance(campo, serializers.BaseSerializer)
+            if prefetch or campo_modelo.many_to_many or campo_modelo.one_to_many:
+                prefetch = True
+                plano.prefetch_related.append(caminho)
+            elif ultima and not aninhado and campo_modelo.concrete:
+                # Chave estrangeira exibida só como id: basta a coluna
+                plano.only.append(caminho)
+                break
+            else:
+                plano.select_related.append(caminho)
+                if campo_modelo.concrete:
+                    plano.only.append(caminho)
+                else:
+                    plano.usar_only = False
+
+            modelo_atual = campo_modelo.related_model
+            if aninhado:
+                filho = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+                _percorrer(filho, modelo_atual, plano, caminho, prefetch)
+
+
+@lru_cache(maxsize=None)
+def plano_para(serializer_class, model):
+    """Monta (uma vez por serializer) o plano de consulta a partir dos campos aninhados"""
+    plano = PlanoConsulta()
+    _percorrer(serializer_class(), model, plano)
+    # Remover caminhos redundantes preservando a ordem
+    plano.select_related = list(dict.fromkeys(plano.select_related))
+    plano.prefetch_related = list(dict.fromkeys(plano.prefetch_related))
+    plano.only = list(dict.fromkeys(plano.only))
+    return plano
+
+
+class OtimizacaoConsultaMixin:
+    """
+    Mixin para ViewSets que aplica automaticamente select_related,
+    prefetch_related e only() de acordo com a árvore de campos do serializer
+    da ação, evitando consultas N+1 em serializers aninhados.
+
+    O only() é aplicado apenas em requisições de leitura, para que a
+    gravação de instâncias continue vendo todas as colunas.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        plano = plano_para(self.get_serializer_class(), queryset.model)
+        return plano.aplicar(queryset, usar_only=self.request.method in permissions.SAFE_METHODS)
+
+
+class ListagemCompiladaMixin:
+    """
+    Mixin para ViewSets que serve a ação `list` com o serializer compilado,
+    lendo apenas as colunas necessárias com values_list().
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializador = compilar(self.get_serializer_class())
+        queryset = serializador.valores(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializador.serializar(page))
+        return Response(serializador.serializar(queryset))
+
+
+class CacheListagemMixin:
+    """
+    Mixin para ViewSets que guarda em cache a resposta da ação `list` por
+    usuário e URL (ver servicos.cache_listagens). Com If-None-Match igual ao
+    ETag atual responde 304 sem consultar o banco.
+    """
+
+    def list(self, request, *args, **kwargs):
+        identificador = cache_listagens.identificador_da_listagem(request, self.basename)
+        etag = f'"{identificador}"'
+        informados = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in informados or '*' in informados:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            dados = cache_listagens.obter(identificador)
+            if dados is None:
+                response = super().list(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache_listagens.guardar(identificador, response.data)
+            else:
+                response = Response(dados)
+
+        response['ETag'] = etag
+        # Proxies não devem compartilhar a resposta; o cliente revalida sempre
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
@@ -64,6 +65,11 @@ class Transacao(models.Model):
         ('CAN', 'Cancelada'),
         ('REJ', 'Rejeitada'),
     )
+    RECORRENCIA_CHOICES = (
+        ('', 'Sem recorrência'),
+        ('SEM', 'Semanal'),
+        ('MEN', 'Mensal'),
+    )
     
     id_transacao = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     conta_origem = models.ForeignKey(ContaBancaria, on_delete=models.CASCADE, related_name='transacoes_origem')
@@ -73,6 +79,12 @@ class Transacao(models.Model):
     descricao = models.CharField(max_length=200, blank=True, null=True, verbose_name='Descrição')
     status = models.CharField(max_length=3, choices=STATUS_CHOICES, default='PEN', verbose_name='Status')
     data_transacao = models.DateTimeField(default=timezone.now, verbose_name='Data da Transação')
+    # Pagamentos (PAG) agendados: efetivados por `manage.py run_payments`
+    data_agendada = models.DateTimeField(null=True, blank=True, verbose_name='Data Agendada')
+    recorrencia = models.CharField(max_length=3, choices=RECORRENCIA_CHOICES, blank=True, default='', verbose_name='Recorrência')
+    data_fim_recorrencia = models.DateField(null=True, blank=True, verbose_name='Fim da Recorrência')
+    # Data agendada da primeira ocorrência: as seguintes são calculadas a partir dela
+    inicio_recorrencia = models.DateTimeField(null=True, blank=True, verbose_name='Início da Recorrência')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -83,6 +95,35 @@ class Transacao(models.Model):
         verbose_name = 'Transação'
         verbose_name_plural = 'Transações'
         ordering = ['-data_transacao']
+        indexes = [
+            # Extrato: saídas e entradas confirmadas da conta por data
+            models.Index(fields=['conta_origem', 'status', 'data_transacao'], name='transacao_orig_status_data'),
+            models.Index(fields=['conta_destino', 'status', 'data_transacao'], name='transacao_dest_status_data'),
+            # Fila de pagamentos agendados: só os pendentes, por vencimento
+            models.Index(
+                fields=['data_agendada'], name='transacao_pag_pendente',
+                condition=models.Q(tipo='PAG', status='PEN')
+            ),
+        ]
+
+
+class SaldoDiario(models.Model):
+    """Modelo para armazenar o saldo de fechamento de cada conta por dia"""
+    conta = models.ForeignKey(ContaBancaria, on_delete=models.CASCADE, related_name='saldos_diarios')
+    data = models.DateField(verbose_name='Data')
+    saldo = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Saldo')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.conta.numero_conta} - {self.data} - {self.saldo}"
+    
+    class Meta:
+        verbose_name = 'Saldo Diário'
+        verbose_name_plural = 'Saldos Diários'
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(fields=['conta', 'data'], name='saldo_diario_conta_data'),
+        ]
 
 
 class Emprestimo(models.Model):
@@ -94,12 +135,17 @@ class Emprestimo(models.Model):
         ('PAG', 'Pago'),
         ('ATR', 'Atrasado'),
     )
+    SISTEMA_AMORTIZACAO_CHOICES = (
+        ('PRICE', 'Tabela Price'),
+        ('SAC', 'Sistema de Amortização Constante'),
+    )
     
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='emprestimos')
     valor_solicitado = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Valor Solicitado')
     valor_aprovado = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, verbose_name='Valor Aprovado')
     taxa_juros = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Taxa de Juros (% ao mês)')
     prazo_meses = models.PositiveIntegerField(verbose_name='Prazo (meses)')
+    sistema_amortizacao = models.CharField(max_length=5, choices=SISTEMA_AMORTIZACAO_CHOICES, default='PRICE', verbose_name='Sistema de Amortização')
     data_solicitacao = models.DateField(default=timezone.now, verbose_name='Data de Solicitação')
     data_aprovacao = models.DateField(null=True, blank=True, verbose_name='Data de Aprovação')
     data_vencimento = models.DateField(null=True, blank=True, verbose_name='Data de Vencimento')
@@ -114,6 +160,10 @@ class Emprestimo(models.Model):
         verbose_name = 'Empréstimo'
         verbose_name_plural = 'Empréstimos'
         ordering = ['-created_at']
+        indexes = [
+            # Varredura de atrasos: aprovados com vencimento anterior a uma data
+            models.Index(fields=['status', 'data_vencimento'], name='emprestimo_status_vencimento'),
+        ]
 
 
 class Investimento(models.Model):
@@ -143,3 +193,96 @@ class Investimento(models.Model):
         verbose_name = 'Investimento'
         verbose_name_plural = 'Investimentos'
         ordering = ['-created_at']
+        indexes = [
+            # Resgate no vencimento: ativos que vencem até uma data
+            models.Index(fields=['ativo', 'data_vencimento'], name='investimento_ativo_vencimento'),
+        ]
+
+
+class ChaveIdempotencia(models.Model):
+    """
+    Idempotency-Key recebida numa criação (transação ou investimento).
+    Enquanto a requisição original é processada, status_code fica nulo; depois
+    guarda a resposta, devolvida às repetições com a mesma chave.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chaves_idempotencia')
+    rota = models.CharField(max_length=50, verbose_name='Rota')
+    chave = models.CharField(max_length=255, verbose_name='Chave')
+    hash_requisicao = models.CharField(max_length=64, verbose_name='Hash da Requisição')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Status da Resposta')
+    resposta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name='Resposta')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expira_em = models.DateTimeField(db_index=True, verbose_name='Expira em')
+    
+    def __str__(self):
+        return f"{self.rota} - {self.chave}"
+    
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'rota', 'chave'], name='idempotencia_usuario_rota_chave'),
+        ]
+
+
+class EventoSaldoQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError('Eventos de saldo não podem ser alterados.')
+
+    def delete(self):
+        raise TypeError('Eventos de saldo não podem ser removidos.')
+
+
+class EventoSaldo(models.Model):
+    """
+    Registro imutável (somente inserção) de cada movimentação de saldo:
+    conta, delta, saldo resultante, usuário e operação de origem. Gravado
+    em lotes pelo escritor de `servicos.auditoria`.
+    """
+    conta_id = models.BigIntegerField(db_index=True, verbose_name='Conta')
+    transacao_id = models.UUIDField(null=True, blank=True, verbose_name='Transação')
+    delta = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Delta')
+    saldo_resultante = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Saldo Resultante')
+    ator_id = models.BigIntegerField(null=True, blank=True, verbose_name='Usuário')
+    origem = models.CharField(max_length=50, blank=True, verbose_name='Origem')
+    ocorrido_em = models.DateTimeField(verbose_name='Ocorrido em')
+    
+    objects = EventoSaldoQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"Conta {self.conta_id}: {self.delta:+} = {self.saldo_resultante}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('Eventos de saldo não podem ser alterados.')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError('Eventos de saldo não podem ser removidos.')
+    
+    class Meta:
+        verbose_name = 'Evento de Saldo'
+        verbose_name_plural = 'Eventos de Saldo'
+        ordering = ['id']
+
+
+class CheckpointVarredura(models.Model):
+    """
+    Progresso de uma varredura em blocos (por exemplo, a marcação dos
+    empréstimos atrasados). Atualizado na mesma transação de cada bloco, permite
+    retomar uma execução interrompida a partir do último bloco confirmado.
+    """
+    nome = models.CharField(max_length=50, unique=True, verbose_name='Nome')
+    data_referencia = models.DateField(verbose_name='Data de Referência')
+    ultimo_vencimento = models.DateField(null=True, blank=True, verbose_name='Último Vencimento')
+    ultimo_id = models.BigIntegerField(default=0, verbose_name='Último ID')
+    processados = models.PositiveIntegerField(default=0, verbose_name='Processados')
+    iniciada_em = models.DateTimeField(verbose_name='Iniciada em')
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+    
+    def __str__(self):
+        return f"{self.nome} - {self.data_referencia}"
+    
+    class Meta:
+        verbose_name = 'Checkpoint de Varredura'
+        verbose_name_plural = 'Checkpoints de Varredura'
@@ -0,0 +1,150 @@
+"""
+Efetivação dos pagamentos (PAG) agendados.
+
+Os pagamentos pendentes formam uma fila ordenada pela data agendada, servida
+pelo índice parcial `transacao_pag_pendente` (apenas PAG pendentes, então o
+índice encolhe à medida que a fila é processada). Cada worker reivindica um
+bloco de pagamentos vencidos com SELECT ... FOR UPDATE SKIP LOCKED, de modo
+que vários workers em paralelo pegam blocos diferentes sem esperar uns pelos
+outros. No SQLite, que não trava linhas, a própria transação de escrita
+serializa os workers.
+
+Dentro do bloco as contas são travadas numa consulta, cada pagamento é
+aplicado em ordem sobre os saldos em memória (sem saldo ou sem conta, fica
+REJ), as mudanças de status são gravadas com um UPDATE por status, as contas
+recebem o delta líquido e as próximas ocorrências dos pagamentos recorrentes
+são inseridas com bulk_create.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .amortizacao import adicionar_meses
+from .auditoria import registrar_movimentos
+from .lancamentos import (
+    TIPOS_AGENDADOS,
+    ValorInvalido,
+    aplicar_deltas_em_lote,
+    deltas_da_transacao,
+    executar_com_retentativa
+)
+from .models import ContaBancaria, Transacao
+
+
+TAMANHO_BLOCO_PAGAMENTOS = 500
+CAMPOS_FILA = (
+    'id_transacao', 'conta_origem_id', 'conta_destino_id', 'valor', 'descricao',
+    'data_agendada', 'recorrencia', 'data_fim_recorrencia', 'inicio_recorrencia'
+)
+
+
+def proxima_ocorrencia(data_agendada, recorrencia, inicio=None):
+    """
+    Data da próxima ocorrência de um pagamento recorrente, no fuso local.
+
+    As mensais são contadas a partir de `inicio` (a primeira ocorrência;
+    padrão: `data_agendada`), para que o dia original volte depois de um mês
+    mais curto (31/01 -> 29/02 -> 31/03).
+    """
+    atual = timezone.localtime(data_agendada)
+    if recorrencia == 'SEM':
+        # Soma no horário local: a ocorrência mantém a hora mesmo se o fuso mudar
+        return atual + timedelta(weeks=1)
+    inicio = timezone.localtime(inicio or data_agendada)
+    meses = (atual.year - inicio.year) * 12 + atual.month - inicio.month + 1
+    return datetime.combine(adicionar_meses(inicio.date(), meses), inicio.timetz())
+
+
+def _proxima(pagamento, agora):
+    inicio = pagamento['inicio_recorrencia'] or pagamento['data_agendada']
+    proxima = proxima_ocorrencia(pagamento['data_agendada'], pagamento['recorrencia'], inicio)
+    fim = pagamento['data_fim_recorrencia']
+    if fim is not None and timezone.localdate(proxima) > fim:
+        return None
+    return Transacao(
+        conta_origem_id=pagamento['conta_origem_id'],
+        conta_destino_id=pagamento['conta_destino_id'],
+        tipo='PAG',
+        valor=pagamento['valor'],
+        descricao=pagamento['descricao'],
+        status='PEN',
+        data_transacao=agora,
+        data_agendada=proxima,
+        recorrencia=pagamento['recorrencia'],
+        data_fim_recorrencia=fim,
+        inicio_recorrencia=inicio
+    )
+
+
+def _processar_bloco(vencimento, tamanho_bloco):
+    """Efetiva um bloco de pagamentos vencidos; retorna as contagens por status"""
+    pagamentos = list(
+        Transacao.objects.select_for_update(skip_locked=True)
+        .filter(tipo__in=TIPOS_AGENDADOS, status='PEN', data_agendada__lte=vencimento)
+        .order_by('data_agendada')
+        .values(*CAMPOS_FILA)[:tamanho_bloco]
+    )
+    if not pagamentos:
+        return Counter()
+
+    conta_ids = {pagamento['conta_origem_id'] for pagamento in pagamentos}
+    conta_ids |= {pagamento['conta_destino_id'] for pagamento in pagamentos if pagamento['conta_destino_id']}
+    saldos = dict(
+        ContaBancaria.objects.select_for_update()
+        .filter(pk__in=conta_ids)
+        .order_by('pk')
+        .values_list('id', 'saldo')
+    )
+
+    agora = timezone.now()
+    confirmados, rejeitados, proximos, movimentos = [], [], [], []
+    deltas_liquidos = defaultdict(Decimal)
+    for pagamento in pagamentos:
+        origem, destino = pagamento['conta_origem_id'], pagamento['conta_destino_id']
+        try:
+            deltas = deltas_da_transacao('PAG', pagamento['valor'], origem, destino)
+        except ValorInvalido:
+            deltas = None
+        if deltas is None or any(conta_id not in saldos or saldos[conta_id] + delta < 0 for conta_id, delta in deltas.items()):
+            rejeitados.append(pagamento['id_transacao'])
+        else:
+            for conta_id, delta in deltas.items():
+                saldos[conta_id] += delta
+                deltas_liquidos[conta_id] += delta
+                movimentos.append((pagamento['id_transacao'], conta_id, delta, saldos[conta_id]))
+            confirmados.append(pagamento['id_transacao'])
+        # A recorrência continua mesmo após uma ocorrência rejeitada
+        if pagamento['recorrencia']:
+            proximo = _proxima(pagamento, agora)
+            if proximo is not None:
+                proximos.append(proximo)
+
+    if confirmados:
+        Transacao.objects.filter(pk__in=confirmados).update(status='CON', data_transacao=agora, updated_at=agora)
+    if rejeitados:
+        Transacao.objects.filter(pk__in=rejeitados).update(status='REJ', updated_at=agora)
+    Transacao.objects.bulk_create(proximos)
+    aplicar_deltas_em_lote(deltas_liquidos)
+    registrar_movimentos(movimentos)
+    return Counter(CON=len(confirmados), REJ=len(rejeitados))
+
+
+def processar_pagamentos(vencimento=None, tamanho_bloco=TAMANHO_BLOCO_PAGAMENTOS, limite=None):
+    """
+    Efetiva os pagamentos agendados até `vencimento` (padrão: agora), um
+    bloco por transação, até a fila de vencidos esvaziar (ou não restar bloco
+    livre para este worker) ou `limite` pagamentos serem processados.
+
+    Retorna um Counter com os pagamentos confirmados (CON) e rejeitados (REJ).
+    """
+    vencimento = vencimento or timezone.now()
+    totais = Counter(CON=0, REJ=0)
+    while limite is None or totais.total() < limite:
+        tamanho = tamanho_bloco if limite is None else min(tamanho_bloco, limite - totais.total())
+        resultado = executar_com_retentativa(lambda: _processar_bloco(vencimento, tamanho))
+        if not resultado:
+            break
+        totais += resultado
+    return totais
@@ -0,0 +1,165 @@
+import heapq
+import math
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ExtratoCursorPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) do extrato, ordenada por
+    (data_transacao, id_transacao) decrescente.
+
+    Recebe várias consultas disjuntas já filtradas (ex.: transações de saída
+    e de entrada da conta), busca no máximo `page_size + 1` linhas de cada
+    uma a partir do cursor e intercala os resultados. Cada consulta usa seu
+    próprio índice composto, então o custo de uma página não depende da
+    profundidade e não há varredura com OR entre conta_origem e conta_destino.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, data_transacao, id_transacao):
+        cursor = f'{data_transacao.isoformat()}|{id_transacao.hex}'
+        return urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            data_texto, id_texto = urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+            data_transacao = parse_datetime(data_texto)
+            if data_transacao is None:
+                raise ValueError
+            return data_transacao, uuid.UUID(id_texto)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _fontes(self, querysets, tamanho, posicao):
+        """Cada consulta a partir do cursor, limitada a `tamanho + 1` linhas"""
+        fontes = []
+        for queryset in querysets:
+            if posicao is not None:
+                data_transacao, id_transacao = posicao
+                queryset = queryset.filter(
+                    Q(data_transacao__lte=data_transacao),
+                    Q(data_transacao__lt=data_transacao) | Q(id_transacao__lt=id_transacao)
+                )
+            fontes.append(queryset.order_by('-data_transacao', '-id_transacao')[:tamanho + 1])
+        return fontes
+
+    def _intercalar(self, fontes, tamanho, chave):
+        pagina = list(islice(heapq.merge(*fontes, key=chave, reverse=True), tamanho + 1))
+
+        self.has_next = len(pagina) > tamanho
+        pagina = pagina[:tamanho]
+        self.ultimo = chave(pagina[-1]) if pagina else None
+        return pagina
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        tamanho = self.get_page_size(request)
+        fontes = self._fontes(querysets, tamanho, self.decode_cursor(request))
+        chave = lambda transacao: (transacao.data_transacao, transacao.id_transacao)
+        return self._intercalar(fontes, tamanho, chave)
+
+    async def apaginate_queryset(self, querysets, request, chave):
+        """
+        Versão assíncrona, para consultas de values_list(); `chave` extrai
+        (data_transacao, id_transacao) de cada linha.
+        """
+        self.request = request
+        tamanho = self.get_page_size(request)
+        fontes = self._fontes(querysets, tamanho, self.decode_cursor(request))
+        return self._intercalar([[linha async for linha in fonte] for fonte in fontes], tamanho, chave)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        cursor = self.encode_cursor(*self.ultimo)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def dados_paginados(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.dados_paginados(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PaginacaoNumeradaAssincrona(PageNumberPagination):
+    """
+    PageNumberPagination para views assíncronas: conta e fatia a consulta
+    com acount() e iteração assíncrona, com a mesma resposta
+    (count/next/previous/results) da paginação padrão da API.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        tamanho = self.get_page_size(request)
+        self.total = await queryset.acount()
+        self.paginas = max(math.ceil(self.total / tamanho), 1)
+
+        numero = request.query_params.get(self.page_query_param) or 1
+        if numero in self.last_page_strings:
+            numero = self.paginas
+        try:
+            self.numero = int(numero)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if not 1 <= self.numero <= self.paginas:
+            raise NotFound(self.invalid_page_message)
+
+        inicio = (self.numero - 1) * tamanho
+        return [linha async for linha in queryset[inicio:inicio + tamanho]]
+
+    def get_next_link(self):
+        if self.numero >= self.paginas:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.numero + 1)
+
+    def get_previous_link(self):
+        if self.numero <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.numero == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.numero - 1)
+
+    def dados_paginados(self, data):
+        return {
+            'count': self.total,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
@@ -0,0 +1,29 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser para corpos NDJSON (um objeto JSON por linha).
+    Linhas em branco são ignoradas.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        itens = []
+        for numero, linha in enumerate(codecs.getreader(encoding)(stream), start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                itens.append(json.loads(linha))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON inválido na linha {numero} - {exc}')
+        return itens
@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ExportacaoRenderer(BaseRenderer):
+    """
+    Base dos formatos de exportação. Eles só existem para registrar o formato
+    na negociação de conteúdo do DRF (`?format=...`): o conteúdo normal é
+    gerado por streaming na view e este renderer só é usado para respostas de
+    erro, que são emitidas como JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(ExportacaoRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportacaoRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,159 @@
+"""
+Resgate de investimentos.
+
+No vencimento (ou antes, a pedido do cliente) a posição é valorizada na data
+de referência, o valor é creditado na conta ativa mais recente do cliente com
+uma transação DEP e o investimento deixa de estar ativo.
+
+O lote noturno encontra as posições que vencem até a data pelo índice
+(ativo, data_vencimento) e processa um bloco por transação: investimentos e
+contas são travados com uma consulta cada, os valores são calculados numa
+passada com as curvas de `valorizacao`, os depósitos são inseridos com
+bulk_create, cada conta recebe a soma dos seus créditos e os investimentos
+são desativados com um UPDATE. Como a desativação é confirmada junto com o
+crédito, repetir o lote para a mesma data não resgata nada duas vezes.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .auditoria import registrar_movimentos
+from .lancamentos import aplicar_deltas_em_lote, contas_de_credito, executar_com_retentativa
+from .models import ContaBancaria, Investimento, Transacao
+from .valorizacao import valores_na_data
+
+
+RESGATE_TAMANHO_BLOCO = 500
+CAMPOS_RESGATE = (
+    'id', 'cliente_id', 'tipo', 'valor_aplicado', 'rentabilidade', 'data_aplicacao', 'data_vencimento'
+)
+
+
+class ErroResgate(Exception):
+    """Investimento que não pode ser resgatado"""
+
+
+def _resgatar(investimentos, referencia):
+    """
+    Resgata investimentos ativos já travados (dicts com CAMPOS_RESGATE).
+    Retorna {investimento_id: (valor, Transacao) | ErroResgate}.
+    """
+    contas_por_cliente = contas_de_credito({investimento['cliente_id'] for investimento in investimentos})
+    saldos = dict(
+        ContaBancaria.objects.select_for_update()
+        .filter(pk__in=contas_por_cliente.values())
+        .order_by('pk')
+        .values_list('id', 'saldo')
+    )
+    valores = valores_na_data(
+        [
+            (investimento['valor_aplicado'], investimento['rentabilidade'],
+             investimento['data_aplicacao'], investimento['data_vencimento'])
+            for investimento in investimentos
+        ],
+        referencia
+    )
+
+    agora = timezone.now()
+    nomes = dict(Investimento.TIPO_INVESTIMENTO_CHOICES)
+    resultados = {}
+    resgatados = []
+    transacoes = []
+    movimentos = []
+    deltas = defaultdict(Decimal)
+    for investimento, valor in zip(investimentos, valores):
+        conta_id = contas_por_cliente.get(investimento['cliente_id'])
+        if conta_id not in saldos:
+            resultados[investimento['id']] = ErroResgate('O cliente não possui conta ativa para o crédito.')
+            continue
+        transacao = Transacao(
+            conta_origem_id=conta_id,
+            tipo='DEP',
+            valor=valor,
+            descricao=f'Resgate de {nomes.get(investimento["tipo"])} - ID: {investimento["id"]}',
+            status='CON',
+            data_transacao=agora
+        )
+        saldos[conta_id] += valor
+        deltas[conta_id] += valor
+        movimentos.append((transacao.id_transacao, conta_id, valor, saldos[conta_id]))
+        resgatados.append(investimento['id'])
+        transacoes.append(transacao)
+        resultados[investimento['id']] = (valor, transacao)
+
+    if resgatados:
+        Investimento.objects.filter(pk__in=resgatados).update(ativo=False, updated_at=agora)
+    Transacao.objects.bulk_create(transacoes)
+    # Emite saldos_alterados para os clientes creditados, o que também
+    # invalida os caches que incluem os investimentos desativados
+    aplicar_deltas_em_lote(deltas)
+    registrar_movimentos(movimentos)
+    return resultados
+
+
+def resgatar_investimento(investimento_id, referencia=None):
+    """
+    Resgata um investimento ativo pelo valor na data de referência (padrão:
+    hoje), antecipadamente se ainda não venceu. Retorna (valor, Transacao);
+    levanta ErroResgate se não for possível.
+    """
+    referencia = referencia or timezone.localdate()
+
+    def operacao():
+        investimentos = list(
+            Investimento.objects.select_for_update().filter(pk=investimento_id).values('ativo', *CAMPOS_RESGATE)
+        )
+        if not investimentos:
+            raise ErroResgate('Investimento não encontrado.')
+        if not investimentos[0]['ativo']:
+            raise ErroResgate('Este investimento já foi resgatado.')
+        resultado = _resgatar(investimentos, referencia)[investimento_id]
+        if isinstance(resultado, ErroResgate):
+            raise resultado
+        return resultado
+
+    return executar_com_retentativa(operacao)
+
+
+def _resgatar_bloco_vencido(referencia, apos, tamanho_bloco):
+    """Resgata o próximo bloco de vencidos após a posição `apos` (data_vencimento, id)"""
+    vencidos = Investimento.objects.select_for_update(skip_locked=True).filter(
+        ativo=True, data_vencimento__lte=referencia
+    )
+    if apos is not None:
+        vencimento, investimento_id = apos
+        vencidos = vencidos.filter(
+            Q(data_vencimento__gt=vencimento) | Q(data_vencimento=vencimento, id__gt=investimento_id)
+        )
+    investimentos = list(vencidos.order_by('data_vencimento', 'id').values(*CAMPOS_RESGATE)[:tamanho_bloco])
+    if not investimentos:
+        return None, {}
+    ultimo = investimentos[-1]
+    return (ultimo['data_vencimento'], ultimo['id']), _resgatar(investimentos, referencia)
+
+
+def resgatar_vencidos(referencia=None, tamanho_bloco=RESGATE_TAMANHO_BLOCO):
+    """
+    Lote noturno: resgata todos os investimentos ativos que vencem até
+    `referencia` (padrão: hoje), um bloco por transação. Posições sem conta
+    para o crédito continuam ativas e são reportadas como falhas.
+
+    Retorna um Counter com 'resgatados', 'falhas' e 'valor' (total creditado).
+    """
+    referencia = referencia or timezone.localdate()
+    totais = Counter(resgatados=0, falhas=0, valor=Decimal('0.00'))
+    apos = None
+    while True:
+        apos, resultados = executar_com_retentativa(
+            lambda: _resgatar_bloco_vencido(referencia, apos, tamanho_bloco)
+        )
+        if apos is None:
+            return totais
+        for resultado in resultados.values():
+            if isinstance(resultado, ErroResgate):
+                totais['falhas'] += 1
+            else:
+                totais['resgatados'] += 1
+                totais['valor'] += resultado[0]
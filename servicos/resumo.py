@@ -0,0 +1,148 @@
+"""
+Resumo consolidado de um cliente (contas, empréstimos e investimentos).
+
+Cada seção é calculada com uma única consulta de agregação condicional
+(Sum/Count com `filter=`), então o resumo custa sempre três consultas,
+qualquer que seja o número de contas ou contratos. O resultado fica em cache
+por cliente e é invalidado pelos sinais em `servicos.signals`.
+
+A invalidação só alcança os outros workers se o cache `default` for
+compartilhado (CACHE_BACKEND); com o LocMemCache de cada processo, um resumo
+desatualizado dura no máximo CACHE_RESUMO_TTL segundos, curto por padrão.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ContaBancaria, Emprestimo, Investimento
+
+
+# Empréstimos cujo principal ainda está em aberto
+STATUS_EM_ABERTO = ('APR', 'ATR')
+
+
+def validade_do_resumo():
+    return getattr(settings, 'CACHE_RESUMO_TTL', 300)
+
+
+def chave_resumo(cliente_id):
+    return f'resumo-cliente:{cliente_id}'
+
+
+def invalidar_resumos(cliente_ids):
+    """
+    Descarta o resumo em cache dos clientes. A remoção é repetida após o
+    commit para que uma leitura concorrente não guarde um valor anterior à
+    escrita.
+    """
+    chaves = [chave_resumo(cliente_id) for cliente_id in set(cliente_ids)]
+    if not chaves:
+        return
+    cache.delete_many(chaves)
+    transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+def _agregados(campo_grupo, escolhas, campo_valor):
+    """Soma e contagem de `campo_valor` para cada escolha de `campo_grupo`"""
+    agregados = {}
+    for codigo, _ in escolhas:
+        filtro = Q(**{campo_grupo: codigo})
+        agregados[f'{codigo}_quantidade'] = Count('pk', filter=filtro)
+        agregados[f'{codigo}_valor'] = Sum(campo_valor, filter=filtro)
+    return agregados
+
+
+def _grupos(resultado, escolhas):
+    return {
+        codigo: {
+            'descricao': descricao,
+            'quantidade': resultado[f'{codigo}_quantidade'],
+            'valor': resultado[f'{codigo}_valor'] or Decimal('0.00'),
+        }
+        for codigo, descricao in escolhas
+    }
+
+
+def _consultas(cliente_id):
+    """(queryset, campo_grupo, escolhas, campo_valor) de cada seção do resumo"""
+    return [
+        (
+            ContaBancaria.objects.filter(cliente_id=cliente_id),
+            'tipo_conta', ContaBancaria.TIPO_CONTA_CHOICES, 'saldo'
+        ),
+        # Principal: o valor aprovado, ou o solicitado enquanto não há aprovação
+        (
+            Emprestimo.objects.filter(cliente_id=cliente_id),
+            'status', Emprestimo.STATUS_CHOICES, Coalesce('valor_aprovado', 'valor_solicitado')
+        ),
+        (
+            Investimento.objects.filter(cliente_id=cliente_id, ativo=True),
+            'tipo', Investimento.TIPO_INVESTIMENTO_CHOICES, 'valor_aplicado'
+        ),
+    ]
+
+
+def _formatar(grupos):
+    return {
+        codigo: {**grupo, 'valor': f'{grupo["valor"]:.2f}'}
+        for codigo, grupo in grupos.items()
+    }
+
+
+def _montar_resumo(cliente_id, contas, emprestimos, investimentos):
+    return {
+        'cliente': cliente_id,
+        'contas': {
+            'saldo_total': f'{sum(grupo["valor"] for grupo in contas.values()):.2f}',
+            'por_tipo': _formatar(contas),
+        },
+        'emprestimos': {
+            'principal_em_aberto': f'{sum(emprestimos[codigo]["valor"] for codigo in STATUS_EM_ABERTO):.2f}',
+            'por_status': _formatar(emprestimos),
+        },
+        'investimentos': {
+            'valor_aplicado': f'{sum(grupo["valor"] for grupo in investimentos.values()):.2f}',
+            'por_tipo': _formatar(investimentos),
+        },
+    }
+
+
+def calcular_resumo(cliente_id):
+    grupos = [
+        _grupos(queryset.aggregate(**_agregados(campo_grupo, escolhas, campo_valor)), escolhas)
+        for queryset, campo_grupo, escolhas, campo_valor in _consultas(cliente_id)
+    ]
+    return _montar_resumo(cliente_id, *grupos)
+
+
+async def acalcular_resumo(cliente_id):
+    """calcular_resumo com o ORM assíncrono (as mesmas três consultas)"""
+    grupos = [
+        _grupos(await queryset.aaggregate(**_agregados(campo_grupo, escolhas, campo_valor)), escolhas)
+        for queryset, campo_grupo, escolhas, campo_valor in _consultas(cliente_id)
+    ]
+    return _montar_resumo(cliente_id, *grupos)
+
+
+def resumo_do_cliente(cliente_id):
+    """Resumo do cliente, servido do cache quando disponível"""
+    chave = chave_resumo(cliente_id)
+    resumo = cache.get(chave)
+    if resumo is None:
+        resumo = calcular_resumo(cliente_id)
+        cache.set(chave, resumo, validade_do_resumo())
+    return resumo
+
+
+async def aresumo_do_cliente(cliente_id):
+    """Versão assíncrona de resumo_do_cliente, com o mesmo cache"""
+    chave = chave_resumo(cliente_id)
+    resumo = await cache.aget(chave)
+    if resumo is None:
+        resumo = await acalcular_resumo(cliente_id)
+        await cache.aset(chave, resumo, validade_do_resumo())
+    return resumo
@@ -0,0 +1,226 @@
+"""
+Saldos históricos das contas a partir dos snapshots diários (SaldoDiario).
+
+O SaldoDiario guarda o saldo de fechamento de cada dia com movimento. Ele é
+mantido incrementalmente pelo motor de lançamentos e pode ser reconstruído a
+partir do razão (transações confirmadas) com `manage.py backfill_saldos`.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .auditoria import saldos_do_log
+from .lancamentos import TIPOS_CREDITAM_DESTINO, atualizar_saldos_diarios, efeito_na_origem
+from .models import ContaBancaria, SaldoDiario, Transacao
+
+
+TAMANHO_BLOCO_CONTAS = 500
+
+
+@dataclass
+class Divergencia:
+    conta_id: int
+    data: object
+    esperado: Decimal
+    encontrado: Decimal
+
+    def __str__(self):
+        quando = self.data or 'saldo atual'
+        return f'Conta {self.conta_id} ({quando}): esperado {self.esperado}, encontrado {self.encontrado}'
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def soma_do_razao(conta_id, inicio=None, fim=None):
+    """
+    Efeito líquido das transações confirmadas da conta no intervalo
+    [inicio, fim). Usa os índices (conta, status, data_transacao).
+    """
+    origem = Transacao.objects.filter(conta_origem_id=conta_id, status='CON')
+    destino = Transacao.objects.filter(
+        conta_destino_id=conta_id, status='CON', tipo__in=TIPOS_CREDITAM_DESTINO
+    )
+    if inicio is not None:
+        origem = origem.filter(data_transacao__gte=inicio)
+        destino = destino.filter(data_transacao__gte=inicio)
+    if fim is not None:
+        origem = origem.filter(data_transacao__lt=fim)
+        destino = destino.filter(data_transacao__lt=fim)
+    saidas = origem.aggregate(total=Sum(efeito_na_origem()))['total'] or Decimal('0.00')
+    entradas = destino.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    return saidas + entradas
+
+
+def saldo_em(conta_id, data):
+    """
+    Saldo da conta ao final do dia `data`: o último snapshot anterior ao dia
+    mais os movimentos do próprio dia. Sem snapshot anterior, soma o razão
+    desde o início.
+    """
+    inicio = _inicio_do_dia(data)
+    fim = _inicio_do_dia(data + timedelta(days=1))
+    anterior = SaldoDiario.objects.filter(
+        conta_id=conta_id, data__lt=data
+    ).order_by('-data').values_list('saldo', flat=True).first()
+    if anterior is None:
+        return soma_do_razao(conta_id, fim=fim)
+    return anterior + soma_do_razao(conta_id, inicio=inicio, fim=fim)
+
+
+def movimentos_diarios(conta_ids):
+    """Retorna {conta_id: {dia: delta}} com o efeito do razão por dia local"""
+    movimentos = defaultdict(lambda: defaultdict(Decimal))
+    saidas = (
+        Transacao.objects.filter(conta_origem_id__in=conta_ids, status='CON')
+        .annotate(dia=TruncDate('data_transacao'))
+        .values('conta_origem_id', 'dia')
+        .annotate(delta=Sum(efeito_na_origem()))
+        .order_by()
+    )
+    for linha in saidas:
+        movimentos[linha['conta_origem_id']][linha['dia']] += linha['delta']
+    entradas = (
+        Transacao.objects.filter(
+            conta_destino_id__in=conta_ids, status='CON', tipo__in=TIPOS_CREDITAM_DESTINO
+        )
+        .annotate(dia=TruncDate('data_transacao'))
+        .values('conta_destino_id', 'dia')
+        .annotate(delta=Sum('valor'))
+        .order_by()
+    )
+    for linha in entradas:
+        movimentos[linha['conta_destino_id']][linha['dia']] += linha['delta']
+    return movimentos
+
+
+def _saldos_esperados(saldo_atual, movimentos):
+    """
+    Saldos de fechamento por dia reconstruídos do razão. O saldo de abertura
+    é o que sobra do saldo atual depois de descontar todo o razão (zero para
+    contas movimentadas apenas pela API).
+    """
+    abertura = saldo_atual - sum(movimentos.values(), Decimal('0.00'))
+    acumulado = abertura
+    esperados = {}
+    for dia in sorted(movimentos):
+        acumulado += movimentos[dia]
+        esperados[dia] = acumulado
+    return abertura, esperados
+
+
+def _blocos_de_contas(conta_ids, tamanho):
+    contas = ContaBancaria.objects.order_by('pk')
+    if conta_ids is not None:
+        contas = contas.filter(pk__in=conta_ids)
+    ultimo = 0
+    while True:
+        bloco = list(contas.filter(pk__gt=ultimo).values_list('pk', flat=True)[:tamanho])
+        if not bloco:
+            return
+        yield bloco
+        ultimo = bloco[-1]
+
+
+def reconstruir_saldos_diarios(conta_ids=None, tamanho_bloco=TAMANHO_BLOCO_CONTAS):
+    """
+    Recalcula os snapshots a partir do razão, processando as contas em blocos.
+    Cada bloco roda numa transação com as contas travadas, para não competir
+    com lançamentos concorrentes. Retorna (contas, snapshots) gravados.
+    """
+    total_contas = total_snapshots = 0
+    for bloco in _blocos_de_contas(conta_ids, tamanho_bloco):
+        with transaction.atomic():
+            saldos = dict(
+                ContaBancaria.objects.select_for_update()
+                .filter(pk__in=bloco).order_by('pk').values_list('id', 'saldo')
+            )
+            movimentos = movimentos_diarios(bloco)
+            snapshots = []
+            for conta_id, saldo in saldos.items():
+                _, esperados = _saldos_esperados(saldo, movimentos.get(conta_id, {}))
+                snapshots += [
+                    SaldoDiario(conta_id=conta_id, data=dia, saldo=valor)
+                    for dia, valor in esperados.items()
+                ]
+            SaldoDiario.objects.bulk_create(
+                snapshots,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['conta', 'data'],
+                update_fields=['saldo', 'updated_at']
+            )
+        total_contas += len(saldos)
+        total_snapshots += len(snapshots)
+    return total_contas, total_snapshots
+
+
+def verificar_saldos_diarios(conta_ids=None, tamanho_bloco=TAMANHO_BLOCO_CONTAS):
+    """
+    Confere os snapshots e o saldo atual contra o razão.
+
+    Retorna as divergências encontradas: dias com movimento sem snapshot ou
+    com valor diferente do reconstruído, e contas cujo saldo atual não é
+    explicado pelas transações (abertura diferente de zero).
+    """
+    divergencias = []
+    for bloco in _blocos_de_contas(conta_ids, tamanho_bloco):
+        saldos = dict(ContaBancaria.objects.filter(pk__in=bloco).values_list('id', 'saldo'))
+        movimentos = movimentos_diarios(bloco)
+        snapshots = defaultdict(dict)
+        for conta_id, dia, saldo in SaldoDiario.objects.filter(conta_id__in=bloco).values_list('conta_id', 'data', 'saldo'):
+            snapshots[conta_id][dia] = saldo
+        for conta_id, saldo in saldos.items():
+            abertura, esperados = _saldos_esperados(saldo, movimentos.get(conta_id, {}))
+            if abertura:
+                divergencias.append(Divergencia(conta_id, None, saldo - abertura, saldo))
+            for dia, esperado in esperados.items():
+                encontrado = snapshots[conta_id].get(dia)
+                if encontrado != esperado:
+                    divergencias.append(Divergencia(conta_id, dia, esperado, encontrado))
+    return divergencias
+
+
+def reconstruir_saldos_do_log(conta_ids=None, aplicar=False, arquivos=False,
+                              tamanho_bloco=TAMANHO_BLOCO_CONTAS):
+    """
+    Confere o saldo atual das contas contra a soma dos deltas do log de
+    auditoria, evento de abertura incluído (tabela EventoSaldo ou, com
+    `arquivos`, os segmentos locais) e,
+    com `aplicar`, grava nas contas divergentes o saldo do log. Só as contas
+    presentes no log são consideradas. Retorna as divergências.
+    """
+    esperados = saldos_do_log(arquivos)
+    ids = sorted(esperados if conta_ids is None else set(esperados) & set(conta_ids))
+    divergencias = []
+    for inicio in range(0, len(ids), tamanho_bloco):
+        bloco = ids[inicio:inicio + tamanho_bloco]
+        with transaction.atomic():
+            saldos = dict(
+                ContaBancaria.objects.select_for_update()
+                .filter(pk__in=bloco).order_by('pk').values_list('id', 'saldo')
+            )
+            divergentes = [
+                conta_id for conta_id, saldo in saldos.items() if saldo != esperados[conta_id]
+            ]
+            divergencias += [
+                Divergencia(conta_id, None, esperados[conta_id], saldos[conta_id])
+                for conta_id in divergentes
+            ]
+            if aplicar and divergentes:
+                ContaBancaria.objects.filter(pk__in=divergentes).update(
+                    saldo=Case(
+                        *[When(pk=conta_id, then=Value(esperados[conta_id])) for conta_id in divergentes],
+                        output_field=DecimalField(max_digits=12, decimal_places=2)
+                    ),
+                    updated_at=timezone.now()
+                )
+                atualizar_saldos_diarios(divergentes)
+    return divergencias
@@ -0,0 +1,146 @@
+"""
+Serialização rápida para listagens de leitura.
+
+Os serializers do DRF instanciam campos, resolvem atributos e chamam
+`to_representation` campo a campo para cada objeto. Para as listagens mais
+acessadas, `compilar` percorre a árvore de campos do serializer uma única vez
+e gera uma função que converte diretamente as tuplas de
+`QuerySet.values_list()` em dicionários com exatamente o mesmo formato de
+saída do serializer original.
+"""
+import decimal
+from decimal import Decimal
+from functools import lru_cache
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+# Campos cuja representação é o próprio valor vindo do banco
+CAMPOS_IDENTIDADE = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+
+def _fabrica_decimal(campo):
+    """Equivalente a DecimalField.to_representation com o contexto calculado uma vez"""
+    if campo.decimal_places is None or campo.normalize_output or campo.localize or \
+            not getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        return lambda: campo.to_representation
+    expoente = Decimal('.1') ** campo.decimal_places
+
+    def fabrica():
+        contexto = decimal.getcontext().copy()
+        if campo.max_digits is not None:
+            contexto.prec = campo.max_digits
+        quantize = Decimal.quantize
+        rounding = campo.rounding
+        return lambda valor: '{:f}'.format(quantize(valor, expoente, rounding=rounding, context=contexto))
+    return fabrica
+
+
+def _fabrica_datetime(campo):
+    """Equivalente a DateTimeField.to_representation (ISO 8601) no fuso atual"""
+    formato = getattr(campo, 'format', api_settings.DATETIME_FORMAT)
+    if formato is None or formato.lower() != ISO_8601:
+        return lambda: campo.to_representation
+
+    def fabrica():
+        fuso = campo.timezone if hasattr(campo, 'timezone') else campo.default_timezone()
+        if fuso is None:
+            return campo.to_representation
+
+        def converter(valor):
+            if valor.tzinfo is None:
+                return campo.to_representation(valor)
+            texto = valor.astimezone(fuso).isoformat()
+            return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+        return converter
+    return fabrica
+
+
+class SerializadorCompilado:
+    """
+    Converte tuplas de values_list(*campos) no mesmo formato de saída do
+    serializer de origem.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.campos = []
+        self._fabricas = {}
+        expressao = self._compilar(serializer_class())
+        nomes = ', '.join(self._fabricas)
+        codigo = (
+            f'def fabrica({nomes}):\n'
+            f'    def converter(r):\n'
+            f'        return {expressao}\n'
+            f'    return converter\n'
+        )
+        namespace = {}
+        exec(compile(codigo, f'<serializador {serializer_class.__name__}>', 'exec'), namespace)
+        self._fabrica = namespace['fabrica']
+
+    def _coluna(self, caminho):
+        self.campos.append(caminho)
+        return len(self.campos) - 1
+
+    def _fabrica_conversor(self, campo):
+        """
+        Retorna None para campos representados pelo próprio valor ou uma
+        função que cria o conversor (chamada a cada serialização, para
+        respeitar o fuso horário ativo).
+        """
+        if isinstance(campo, CAMPOS_IDENTIDADE):
+            return None
+        if isinstance(campo, serializers.UUIDField) and campo.uuid_format == 'hex_verbose':
+            return lambda: str
+        if isinstance(campo, serializers.DecimalField):
+            return _fabrica_decimal(campo)
+        if isinstance(campo, serializers.DateTimeField):
+            return _fabrica_datetime(campo)
+        # Demais tipos: a própria conversão do DRF
+        return lambda: campo.to_representation
+
+    def _compilar(self, serializer, prefixo=''):
+        itens = []
+        for campo in serializer._readable_fields:
+            if campo.source == '*' or isinstance(campo, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                raise ValueError(
+                    f'O campo {campo.field_name} de {type(serializer).__name__} não pode ser compilado.'
+                )
+            caminho = prefixo + campo.source.replace('.', '__')
+            indice = self._coluna(caminho)
+
+            if isinstance(campo, serializers.BaseSerializer):
+                # Relação aninhada: nula quando a chave estrangeira é nula
+                aninhado = self._compilar(campo, caminho + '__')
+                valor = f'None if r[{indice}] is None else {aninhado}'
+            else:
+                fabrica = self._fabrica_conversor(campo)
+                if fabrica is None:
+                    valor = f'r[{indice}]'
+                else:
+                    nome = f'c{indice}'
+                    self._fabricas[nome] = fabrica
+                    valor = f'None if r[{indice}] is None else {nome}(r[{indice}])'
+            itens.append(f'{campo.field_name!r}: {valor}')
+        return '{' + ', '.join(itens) + '}'
+
+    def valores(self, queryset):
+        """QuerySet de tuplas com as colunas necessárias, na ordem esperada"""
+        return queryset.values_list(*self.campos)
+
+    def serializar(self, linhas):
+        converter = self._fabrica(**{nome: fabrica() for nome, fabrica in self._fabricas.items()})
+        return [converter(linha) for linha in linhas]
+
+
+@lru_cache(maxsize=None)
+def compilar(serializer_class):
+    """Retorna o SerializadorCompilado da classe (compilado uma única vez)"""
+    return SerializadorCompilado(serializer_class)
+
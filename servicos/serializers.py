@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.utils import timezone
 from .models import Cliente, ContaBancaria, Transacao, Emprestimo, Investimento
 
 
@@ -48,7 +51,8 @@ class TransacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transacao
         fields = ('id_transacao', 'conta_origem', 'conta_destino', 'tipo', 'valor', 'descricao', 
-                 'status', 'data_transacao', 'created_at', 'updated_at')
+                 'status', 'data_transacao', 'data_agendada', 'recorrencia', 'data_fim_recorrencia',
+                 'created_at', 'updated_at')
         read_only_fields = ('id_transacao', 'created_at', 'updated_at')
 
 
@@ -56,10 +60,12 @@ class TransacaoCreateSerializer(serializers.ModelSerializer):
     """Serializer para criar uma nova transação"""
     conta_origem_id = serializers.IntegerField()
     conta_destino_id = serializers.IntegerField(required=False)
+    valor = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
     
     class Meta:
         model = Transacao
-        fields = ('conta_origem_id', 'conta_destino_id', 'tipo', 'valor', 'descricao')
+        fields = ('conta_origem_id', 'conta_destino_id', 'tipo', 'valor', 'descricao',
+                  'data_agendada', 'recorrencia', 'data_fim_recorrencia')
 
     def validate(self, attrs):
         # Validações específicas para cada tipo de transação
@@ -69,6 +75,16 @@ class TransacaoCreateSerializer(serializers.ModelSerializer):
         if tipo == 'TRA' and not conta_destino_id:
             raise serializers.ValidationError({"conta_destino_id": "Conta de destino é obrigatória para transferências."})
         
+        if tipo == 'PAG':
+            # Sem data, o pagamento vence imediatamente
+            attrs.setdefault('data_agendada', timezone.now())
+            if attrs.get('data_fim_recorrencia') and not attrs.get('recorrencia'):
+                raise serializers.ValidationError({"data_fim_recorrencia": "Informe também a recorrência."})
+        else:
+            for campo in ('data_agendada', 'recorrencia', 'data_fim_recorrencia'):
+                if attrs.get(campo):
+                    raise serializers.ValidationError({campo: "Disponível apenas para pagamentos (PAG)."})
+        
         return attrs
 
 
@@ -79,7 +95,7 @@ class EmprestimoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Emprestimo
         fields = ('id', 'cliente', 'valor_solicitado', 'valor_aprovado', 'taxa_juros', 'prazo_meses',
-                 'data_solicitacao', 'data_aprovacao', 'data_vencimento', 'status', 'created_at', 'updated_at')
+                 'sistema_amortizacao', 'data_solicitacao', 'data_aprovacao', 'data_vencimento', 'status', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
@@ -89,7 +105,24 @@ class EmprestimoCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Emprestimo
-        fields = ('cliente_id', 'valor_solicitado', 'prazo_meses')
+        fields = ('cliente_id', 'valor_solicitado', 'prazo_meses', 'sistema_amortizacao')
+
+
+class AprovacaoLoteSerializer(serializers.Serializer):
+    """Serializer para um item da aprovação de empréstimos em lote"""
+    emprestimo_id = serializers.IntegerField()
+    valor_aprovado = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'),
+                                              required=False)
+
+
+class ParcelaSerializer(serializers.Serializer):
+    """Serializer para uma parcela do cronograma de amortização"""
+    numero = serializers.IntegerField()
+    data_vencimento = serializers.DateField()
+    prestacao = serializers.DecimalField(max_digits=12, decimal_places=2)
+    juros = serializers.DecimalField(max_digits=12, decimal_places=2)
+    amortizacao = serializers.DecimalField(max_digits=12, decimal_places=2)
+    saldo_devedor = serializers.DecimalField(max_digits=12, decimal_places=2)
 
 
 class InvestimentoSerializer(serializers.ModelSerializer):
@@ -100,12 +133,16 @@ class InvestimentoSerializer(serializers.ModelSerializer):
         model = Investimento
         fields = ('id', 'cliente', 'tipo', 'valor_aplicado', 'rentabilidade', 'data_aplicacao', 
                  'data_vencimento', 'ativo', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        # A posição só muda pela aplicação e pelo resgate: o valor do resgate
+        # sai destes campos, então não podem ser alterados por PUT/PATCH
+        read_only_fields = ('id', 'tipo', 'valor_aplicado', 'rentabilidade', 'data_aplicacao',
+                            'data_vencimento', 'ativo', 'created_at', 'updated_at')
 
 
 class InvestimentoCreateSerializer(serializers.ModelSerializer):
     """Serializer para criar um novo investimento"""
     cliente_id = serializers.IntegerField()
+    valor_aplicado = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
     
     class Meta:
         model = Investimento
@@ -0,0 +1,58 @@
+"""
+Sinais do app. `saldos_alterados` é emitido pelo motor de lançamentos, cujos
+UPDATEs com F() não disparam post_save; `emprestimos_alterados`, pelas
+atualizações de empréstimos em massa (varredura de atrasos). Contas criadas
+com saldo registram o evento de abertura na trilha de auditoria.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .auditoria import ORIGEM_ABERTURA, registrar_movimentos
+from .cache_listagens import invalidar_listagens
+from .models import Cliente, ContaBancaria, Emprestimo, Investimento
+from .resumo import invalidar_resumos
+
+
+# Argumentos: conta_ids, cliente_ids
+saldos_alterados = Signal()
+
+# Argumentos: cliente_ids
+emprestimos_alterados = Signal()
+
+
+@receiver(saldos_alterados)
+@receiver(emprestimos_alterados)
+def invalidar_caches_dos_clientes(sender, cliente_ids, **kwargs):
+    invalidar_resumos(cliente_ids)
+    invalidar_listagens(cliente_ids)
+
+
+@receiver([post_save, post_delete], sender=ContaBancaria)
+@receiver([post_save, post_delete], sender=Emprestimo)
+@receiver([post_save, post_delete], sender=Investimento)
+def invalidar_resumo_do_cliente(sender, instance, **kwargs):
+    invalidar_resumos([instance.cliente_id])
+    invalidar_listagens([instance.cliente_id])
+
+
+@receiver(post_save, sender=ContaBancaria)
+def registrar_saldo_de_abertura(sender, instance, created, raw=False, **kwargs):
+    # Depois da criação o saldo só muda pelo motor de lançamentos, que audita
+    # cada delta; o saldo inicial entra no log como um evento de abertura
+    if created and not raw and instance.saldo:
+        registrar_movimentos([(None, instance.pk, instance.saldo, instance.saldo)], origem=ORIGEM_ABERTURA)
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+def invalidar_listagens_do_cliente(sender, instance, **kwargs):
+    invalidar_listagens([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidar_listagens_do_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # Os dados do usuário aparecem aninhados nos clientes listados; um
+    # usuário recém-criado ainda não tem cliente
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidar_listagens(Cliente.objects.filter(user_id=instance.pk).values_list('id', flat=True))
@@ -1,3 +1,1767 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from autenticacao.tokens import RefreshTokenCliente
+from financeira_api import settings as configuracao
+from financeira_api.roteamento import RoteadorReplica, RoteamentoReplicaMiddleware
+
+from . import lancamentos
+from .amortizacao import PRICE, SAC, adicionar_meses, cronograma, cronogramas_em_lote
+from .atrasos import marcar_emprestimos_atrasados
+from .auditoria import ORIGEM_ABERTURA, escritor, saldos_do_log, segmentos_configurados
+from .checks import verificar_cache_das_listagens, verificar_cache_dos_resumos
+from .dados_sinteticos import GeradorFinanceiro, Parametros
+from .management.commands.bench_endpoints import cenarios, comparar, endpoints_do_router, medir_endpoints
+from .idempotencia import cache_respostas, hash_da_requisicao, podar_chaves_expiradas
+from .lancamentos import ContaNaoEncontrada, SaldoInsuficiente, ValorInvalido, lancar_lote, lancar_transacao
+from .models import (
+    ChaveIdempotencia,
+    Cliente,
+    ContaBancaria,
+    Emprestimo,
+    EventoSaldo,
+    Investimento,
+    SaldoDiario,
+    Transacao
+)
+from .pagamentos import processar_pagamentos, proxima_ocorrencia
+from .resgates import resgatar_vencidos
+from .saldos import reconstruir_saldos_diarios, reconstruir_saldos_do_log, verificar_saldos_diarios
+from .serializacao import compilar
+from .valorizacao import CurvaAcumulacao, curva_de_acumulacao, valorizar
+from .serializers import (
+    ClienteSerializer,
+    ContaBancariaResumoSerializer,
+    ContaBancariaSerializer,
+    TransacaoSerializer
+)
+from .views import ContaBancariaViewSet
+
+
+def criar_cliente(username='cliente', cpf='000.000.000-00', senha=None, **kwargs):
+    user = User.objects.create_user(username=username, password=senha, **kwargs)
+    return Cliente.objects.create(
+        user=user, cpf=cpf, data_nascimento='1990-01-01',
+        telefone='11999999999', endereco='Rua A, 1'
+    )
+
+
+def autenticar(client, user):
+    """Autentica com um access token real, para que as claims de cliente sejam usadas"""
+    client.force_authenticate(user, token=RefreshTokenCliente.for_user(user).access_token)
+
+
+def criar_conta(cliente, numero, saldo='0.00', tipo_conta='CC', **kwargs):
+    return ContaBancaria.objects.create(
+        cliente=cliente, numero_conta=numero, agencia='0001',
+        tipo_conta=tipo_conta, saldo=Decimal(saldo), **kwargs
+    )
+
+
+class LancamentosTests(TestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.origem = criar_conta(self.cliente, '1', '100.00')
+        self.destino = criar_conta(self.cliente, '2', '10.00')
+
+    def test_transferencia_atualiza_as_duas_contas(self):
+        transacao = lancar_transacao('TRA', Decimal('40.00'), self.origem.id, self.destino.id)
+
+        self.origem.refresh_from_db()
+        self.destino.refresh_from_db()
+        self.assertEqual(self.origem.saldo, Decimal('60.00'))
+        self.assertEqual(self.destino.saldo, Decimal('50.00'))
+        self.assertEqual(transacao.status, 'CON')
+
+    def test_saldo_insuficiente_nao_altera_nada(self):
+        with self.assertRaises(SaldoInsuficiente):
+            lancar_transacao('TRA', Decimal('100.01'), self.origem.id, self.destino.id)
+
+        self.origem.refresh_from_db()
+        self.destino.refresh_from_db()
+        self.assertEqual(self.origem.saldo, Decimal('100.00'))
+        self.assertEqual(self.destino.saldo, Decimal('10.00'))
+        self.assertFalse(Transacao.objects.exists())
+
+    def test_conta_inexistente(self):
+        with self.assertRaises(ContaNaoEncontrada):
+            lancar_transacao('DEP', Decimal('1.00'), 999999)
+        with self.assertRaises(ContaNaoEncontrada):
+            lancar_transacao('TRA', Decimal('1.00'), self.origem.id, 999999)
+
+    def test_pagamento_fica_pendente(self):
+        transacao = lancar_transacao('PAG', Decimal('5.00'), self.origem.id)
+
+        self.origem.refresh_from_db()
+        self.assertEqual(transacao.status, 'PEN')
+        self.assertEqual(self.origem.saldo, Decimal('100.00'))
+
+    def test_valor_nao_positivo_e_rejeitado(self):
+        casos = [
+            ('SAQ', Decimal('-50.00'), None),
+            ('TRA', Decimal('-50.00'), self.destino.id),
+            ('DEP', Decimal('0.00'), None),
+            ('PAG', Decimal('-5.00'), None),
+        ]
+        for tipo, valor, destino in casos:
+            with self.subTest(tipo=tipo, valor=valor):
+                with self.assertRaises(ValorInvalido):
+                    lancar_transacao(tipo, valor, self.origem.id, destino)
+
+        self.origem.refresh_from_db()
+        self.destino.refresh_from_db()
+        self.assertEqual(self.origem.saldo, Decimal('100.00'))
+        self.assertEqual(self.destino.saldo, Decimal('10.00'))
+        self.assertFalse(Transacao.objects.exists())
+
+    def test_lote_rejeita_valor_nao_positivo_por_item(self):
+        resultados = lancar_lote([
+            (0, {'tipo': 'SAQ', 'valor': Decimal('-50.00'), 'conta_origem_id': self.origem.id}),
+            (1, {'tipo': 'TRA', 'valor': Decimal('-5.00'), 'conta_origem_id': self.origem.id,
+                 'conta_destino_id': self.destino.id}),
+            (2, {'tipo': 'SAQ', 'valor': Decimal('0.00'), 'conta_origem_id': self.origem.id}),
+            (3, {'tipo': 'DEP', 'valor': Decimal('1.00'), 'conta_origem_id': self.origem.id}),
+        ])
+
+        self.assertIsInstance(resultados[0], ValorInvalido)
+        self.assertIsInstance(resultados[1], ValorInvalido)
+        self.assertIsInstance(resultados[2], ValorInvalido)
+        self.assertIsInstance(resultados[3], Transacao)
+        self.origem.refresh_from_db()
+        self.destino.refresh_from_db()
+        self.assertEqual(self.origem.saldo, Decimal('101.00'))
+        self.assertEqual(self.destino.saldo, Decimal('10.00'))
+
+
+class RetentativaTests(TransactionTestCase):
+    def test_retentativa_em_erro_de_concorrencia(self):
+        chamadas = []
+
+        def operacao():
+            chamadas.append(1)
+            if len(chamadas) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        with mock.patch.object(lancamentos.time, 'sleep'):
+            self.assertEqual(lancamentos.executar_com_retentativa(operacao), 'ok')
+        self.assertEqual(len(chamadas), 3)
+
+    def test_investimento_repetido_inteiro_em_conflito(self):
+        cliente = criar_cliente()
+        conta = criar_conta(cliente, '1', '100.00')
+        client = APIClient()
+        client.force_authenticate(cliente.user)
+        criar = Investimento.objects.create
+        chamadas = []
+
+        def criar_com_conflito(**kwargs):
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                raise OperationalError('database is locked')
+            return criar(**kwargs)
+
+        with mock.patch.object(lancamentos.time, 'sleep'), \
+                mock.patch.object(Investimento.objects, 'create', side_effect=criar_com_conflito):
+            resposta = client.post('/api/v1/investimentos/', {
+                'cliente_id': cliente.id, 'tipo': 'CDB', 'valor_aplicado': '40.00', 'rentabilidade': '10.00'
+            })
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(Investimento.objects.count(), 1)
+        self.assertEqual(Transacao.objects.count(), 1)
+        conta.refresh_from_db()
+        self.assertEqual(conta.saldo, Decimal('60.00'))
+
+    def test_erro_nao_transitorio_nao_e_repetido(self):
+        def operacao():
+            raise OperationalError('no such table: x')
+
+        with mock.patch.object(lancamentos.time, 'sleep'):
+            with self.assertRaises(OperationalError):
+                lancamentos.executar_com_retentativa(operacao)
+
+
+class TransacaoViewSetTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        self.client.force_authenticate(self.cliente.user)
+
+    def test_saque(self):
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '30.00'
+        })
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['conta_origem']['saldo'], '70.00')
+
+    def test_saque_sem_saldo(self):
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '300.00'
+        })
+
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_valor_nao_positivo(self):
+        destino = criar_conta(self.cliente, '2')
+        for tipo, valor in [('SAQ', '-50.00'), ('TRA', '-50.00'), ('DEP', '0.00')]:
+            with self.subTest(tipo=tipo, valor=valor):
+                resposta = self.client.post('/api/v1/transacoes/', {
+                    'conta_origem_id': self.conta.id, 'conta_destino_id': destino.id,
+                    'tipo': tipo, 'valor': valor
+                })
+                self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.client.post('/api/v1/investimentos/', {
+            'cliente_id': self.cliente.id, 'tipo': 'CDB', 'valor_aplicado': '0.00', 'rentabilidade': '10.00'
+        })
+        self.assertEqual(resposta.status_code, 400)
+
+        self.conta.refresh_from_db()
+        destino.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('100.00'))
+        self.assertEqual(destino.saldo, Decimal('0.00'))
+        self.assertFalse(Transacao.objects.exists())
+        self.assertFalse(Investimento.objects.exists())
+
+    def test_conta_de_outro_cliente(self):
+        outra = criar_conta(criar_cliente('outro', '111.111.111-11'), '2', '100.00')
+
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': outra.id, 'tipo': 'SAQ', 'valor': '1.00'
+        })
+
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_lote_reporta_resultado_por_item(self):
+        destino = criar_conta(self.cliente, '2')
+        outra = criar_conta(criar_cliente('outro', '111.111.111-11'), '3', '100.00')
+
+        resposta = self.client.post('/api/v1/transacoes/lote/', [
+            {'conta_origem_id': self.conta.id, 'tipo': 'TRA', 'valor': '60.00', 'conta_destino_id': destino.id},
+            {'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '50.00'},
+            {'conta_origem_id': self.conta.id, 'tipo': 'XXX', 'valor': '1.00'},
+            {'conta_origem_id': outra.id, 'tipo': 'SAQ', 'valor': '1.00'},
+            {'conta_origem_id': self.conta.id, 'tipo': 'DEP', 'valor': '5.00'},
+        ], format='json')
+
+        self.assertEqual(resposta.status_code, 207)
+        self.assertEqual(
+            [resultado['sucesso'] for resultado in resposta.data['resultados']],
+            [True, False, False, False, True]
+        )
+        self.conta.refresh_from_db()
+        destino.refresh_from_db()
+        outra.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('45.00'))
+        self.assertEqual(destino.saldo, Decimal('60.00'))
+        self.assertEqual(outra.saldo, Decimal('100.00'))
+        self.assertEqual(Transacao.objects.count(), 2)
+
+    def test_lote_ndjson(self):
+        corpo = '\n'.join([
+            f'{{"conta_origem_id": {self.conta.id}, "tipo": "DEP", "valor": "1.00"}}',
+            '',
+            f'{{"conta_origem_id": {self.conta.id}, "tipo": "SAQ", "valor": "2.00"}}',
+        ])
+
+        resposta = self.client.post('/api/v1/transacoes/lote/', corpo, content_type='application/x-ndjson')
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['sucesso'], 2)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('99.00'))
+
+
+class PagamentosAgendadosTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        self.destino = criar_conta(criar_cliente('outro', '111.111.111-11'), '2')
+        self.client.force_authenticate(self.cliente.user)
+
+    def agendar(self, valor, data_agendada, **kwargs):
+        return Transacao.objects.create(
+            conta_origem=self.conta, conta_destino=self.destino, tipo='PAG', valor=Decimal(valor),
+            status='PEN', data_transacao=timezone.now(), data_agendada=data_agendada, **kwargs
+        )
+
+    def test_pagamento_agendado_fica_pendente(self):
+        data_agendada = timezone.now() + timedelta(days=3)
+
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'conta_destino_id': self.destino.id, 'tipo': 'PAG',
+            'valor': '30.00', 'data_agendada': data_agendada.isoformat(), 'recorrencia': 'MEN'
+        })
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['status'], 'PEN')
+        self.assertEqual(resposta.data['recorrencia'], 'MEN')
+        self.assertEqual(resposta.data['conta_origem']['saldo'], '100.00')
+
+    def test_agendamento_apenas_para_pagamentos(self):
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '1.00',
+            'data_agendada': timezone.now().isoformat()
+        })
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('data_agendada', resposta.data)
+
+    def test_worker_efetiva_pagamentos_vencidos(self):
+        agora = timezone.now()
+        vencido = self.agendar('60.00', agora - timedelta(hours=1))
+        sem_saldo = self.agendar('60.00', agora - timedelta(minutes=1))
+        futuro = self.agendar('10.00', agora + timedelta(days=1))
+
+        totais = processar_pagamentos(agora, tamanho_bloco=1)
+
+        self.assertEqual(totais, {'CON': 1, 'REJ': 1})
+        self.assertEqual(
+            dict(Transacao.objects.values_list('pk', 'status')),
+            {vencido.pk: 'CON', sem_saldo.pk: 'REJ', futuro.pk: 'PEN'}
+        )
+        self.conta.refresh_from_db()
+        self.destino.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('40.00'))
+        self.assertEqual(self.destino.saldo, Decimal('60.00'))
+
+    def test_recorrencia_agenda_proxima_ocorrencia(self):
+        data_agendada = timezone.make_aware(datetime(2024, 1, 31, 10, 0))
+        self.agendar('10.00', data_agendada, recorrencia='MEN', data_fim_recorrencia=date(2024, 3, 1))
+        semanal = self.agendar('10.00', data_agendada, recorrencia='SEM')
+
+        processar_pagamentos(data_agendada)
+
+        proximos = Transacao.objects.filter(status='PEN').order_by('data_agendada')
+        self.assertEqual(
+            [(proximo.recorrencia, proximo.data_agendada) for proximo in proximos],
+            [('SEM', semanal.data_agendada + timedelta(weeks=1)),
+             ('MEN', data_agendada.replace(month=2, day=29))]
+        )
+        # Em atraso, o worker alcança as ocorrências vencidas; a mensal para
+        # em 29/02, pois a seguinte (31/03) passa do fim da recorrência
+        processar_pagamentos(data_agendada + timedelta(days=60))
+        self.assertEqual(
+            Transacao.objects.filter(recorrencia='MEN').exclude(status='PEN').count(), 2
+        )
+        self.assertFalse(Transacao.objects.filter(recorrencia='MEN', status='PEN').exists())
+
+    def test_recorrencia_mensal_volta_ao_dia_original(self):
+        inicio = timezone.make_aware(datetime(2024, 1, 31, 10, 0))
+        self.agendar('1.00', inicio, recorrencia='MEN')
+
+        for _ in range(3):
+            processar_pagamentos(Transacao.objects.get(status='PEN').data_agendada)
+
+        self.assertEqual(
+            [timezone.localtime(data) for data in
+             Transacao.objects.order_by('data_agendada').values_list('data_agendada', flat=True)],
+            [timezone.make_aware(datetime(2024, mes, dia, 10, 0))
+             for mes, dia in ((1, 31), (2, 29), (3, 31), (4, 30))]
+        )
+
+    def test_recorrencia_usa_a_data_local(self):
+        # 31/01 22:00 em São Paulo já é 01/02 em UTC
+        inicio = timezone.make_aware(datetime(2024, 1, 31, 22, 0))
+
+        self.assertEqual(
+            timezone.localtime(proxima_ocorrencia(inicio, 'MEN')),
+            timezone.make_aware(datetime(2024, 2, 29, 22, 0))
+        )
+        self.assertEqual(
+            timezone.localtime(proxima_ocorrencia(inicio, 'SEM')),
+            timezone.make_aware(datetime(2024, 2, 7, 22, 0))
+        )
+
+    def test_comando_run_payments(self):
+        self.agendar('10.00', timezone.now())
+        saida = io.StringIO()
+
+        call_command('run_payments', stdout=saida)
+
+        self.assertIn('1 pagamento(s) confirmado(s)', saida.getvalue())
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('90.00'))
+
+
+class ExtratoTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1')
+        self.outra = criar_conta(self.cliente, '2')
+        self.client.force_authenticate(self.cliente.user)
+
+        base = timezone.now()
+        self.esperadas = []
+        for i in range(7):
+            saida = i % 2 == 0
+            transacao = Transacao.objects.create(
+                conta_origem=self.conta if saida else self.outra,
+                conta_destino=self.outra if saida else self.conta,
+                tipo='TRA', valor=Decimal('1.00'), status='CON',
+                data_transacao=base - timedelta(minutes=i % 3)
+            )
+            self.esperadas.append(transacao)
+        # Transações que não devem aparecer
+        Transacao.objects.create(conta_origem=self.conta, tipo='PAG', valor=Decimal('1.00'), status='PEN')
+        Transacao.objects.create(conta_origem=self.outra, tipo='DEP', valor=Decimal('1.00'), status='CON')
+        self.esperadas.sort(key=lambda t: (t.data_transacao, t.id_transacao), reverse=True)
+
+    def test_paginacao_por_cursor_inclui_entradas(self):
+        url = f'/api/v1/contas/{self.conta.id}/extrato/?page_size=3'
+        recebidas = []
+        paginas = 0
+        while url:
+            resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertLessEqual(len(resposta.data['results']), 3)
+            recebidas += [item['id_transacao'] for item in resposta.data['results']]
+            url = resposta.data['next']
+            paginas += 1
+
+        self.assertEqual(paginas, 3)
+        self.assertEqual(recebidas, [str(t.id_transacao) for t in self.esperadas])
+
+    def test_cursor_invalido(self):
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/extrato/?cursor=invalido')
+
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_exportacao_csv(self):
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/extrato/?format=csv')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        self.assertTrue(resposta['Content-Type'].startswith('text/csv'))
+        linhas = list(csv.reader(io.StringIO(b''.join(resposta.streaming_content).decode())))
+        self.assertEqual(linhas[0][0], 'id_transacao')
+        self.assertEqual([linha[0] for linha in linhas[1:]], [str(t.id_transacao) for t in self.esperadas])
+
+    def test_exportacao_ndjson(self):
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/extrato/?format=ndjson')
+
+        self.assertEqual(resposta.status_code, 200)
+        linhas = [json.loads(linha) for linha in b''.join(resposta.streaming_content).decode().splitlines()]
+        self.assertEqual([linha['id_transacao'] for linha in linhas], [str(t.id_transacao) for t in self.esperadas])
+        self.assertEqual(linhas[0]['valor'], '1.00')
+        self.assertIn(linhas[0]['conta_origem'], ('1', '2'))
+
+
+class SaldoDiarioTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1')
+        autenticar(self.client, self.cliente.user)
+        self.hoje = timezone.localdate()
+
+    def criar_transacao(self, tipo, valor, dias_atras):
+        return Transacao.objects.create(
+            conta_origem=self.conta, tipo=tipo, valor=Decimal(valor), status='CON',
+            data_transacao=timezone.now() - timedelta(days=dias_atras)
+        )
+
+    def test_lancamento_atualiza_snapshot_do_dia(self):
+        lancar_transacao('DEP', Decimal('10.00'), self.conta.id)
+        lancar_transacao('SAQ', Decimal('3.00'), self.conta.id)
+
+        snapshot = SaldoDiario.objects.get(conta=self.conta, data=self.hoje)
+        self.assertEqual(snapshot.saldo, Decimal('7.00'))
+
+    def test_saldo_em_data_passada(self):
+        self.criar_transacao('DEP', '100.00', 3)
+        self.criar_transacao('SAQ', '30.00', 2)
+        self.criar_transacao('DEP', '5.00', 1)
+        ContaBancaria.objects.filter(pk=self.conta.pk).update(saldo=Decimal('75.00'))
+
+        # Sem snapshots: soma do razão
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/saldo/?data={self.hoje - timedelta(days=2)}')
+        self.assertEqual(resposta.data['saldo'], '70.00')
+
+        # Com snapshots: último snapshot anterior + movimentos do dia
+        self.assertEqual(reconstruir_saldos_diarios(), (1, 3))
+        with self.assertNumQueries(4):
+            resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/saldo/?data={self.hoje - timedelta(days=1)}')
+        self.assertEqual(resposta.data['saldo'], '75.00')
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/saldo/?data={self.hoje - timedelta(days=10)}')
+        self.assertEqual(resposta.data['saldo'], '0.00')
+
+    def test_data_invalida(self):
+        resposta = self.client.get(f'/api/v1/contas/{self.conta.id}/saldo/?data=ontem')
+
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_verificacao_de_consistencia(self):
+        lancar_transacao('DEP', Decimal('10.00'), self.conta.id)
+        self.assertEqual(verificar_saldos_diarios(), [])
+
+        # Transação gravada fora do motor de lançamentos
+        self.criar_transacao('DEP', '1.00', 0)
+        ContaBancaria.objects.filter(pk=self.conta.pk).update(saldo=Decimal('11.00'))
+        divergencias = verificar_saldos_diarios()
+        self.assertEqual(len(divergencias), 1)
+        self.assertEqual(divergencias[0].encontrado, Decimal('10.00'))
+
+        reconstruir_saldos_diarios()
+        self.assertEqual(verificar_saldos_diarios(), [])
+
+
+class ConsultasConstantesMixin:
+    """
+    Assegura que um endpoint de listagem executa sempre o mesmo número de
+    consultas, independente de quantas linhas a página tem.
+    """
+
+    def assertConsultasConstantes(self, url, criar_linha, quantidades=(1, 4, 10)):
+        contagens = []
+        criadas = 0
+        for quantidade in quantidades:
+            while criadas < quantidade:
+                criar_linha(criadas)
+                criadas += 1
+            with CaptureQueriesContext(connection) as consultas:
+                resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200)
+            contagens.append(len(consultas))
+        self.assertEqual(
+            len(set(contagens)), 1,
+            f'Número de consultas de {url} varia com o tamanho da página: {contagens}'
+        )
+
+
+class ConsultasListagemTests(ConsultasConstantesMixin, APITestCase):
+    def setUp(self):
+        self.staff = criar_cliente('staff', is_staff=True)
+        self.conta = criar_conta(self.staff, 'staff')
+        self.client.force_authenticate(self.staff.user)
+
+    def criar_cliente_n(self, n):
+        return criar_cliente(f'cliente-{n}', f'cpf-{n}')
+
+    def test_clientes(self):
+        self.assertConsultasConstantes('/api/v1/clientes/', self.criar_cliente_n)
+
+    def test_contas(self):
+        self.assertConsultasConstantes(
+            '/api/v1/contas/', lambda n: criar_conta(self.criar_cliente_n(n), f'c-{n}')
+        )
+
+    def test_transacoes(self):
+        self.assertConsultasConstantes(
+            '/api/v1/transacoes/',
+            lambda n: Transacao.objects.create(
+                conta_origem=self.conta, conta_destino=criar_conta(self.staff, f'd-{n}'),
+                tipo='TRA', valor=Decimal('1.00'), status='CON'
+            )
+        )
+
+    def test_emprestimos(self):
+        self.assertConsultasConstantes(
+            '/api/v1/emprestimos/',
+            lambda n: Emprestimo.objects.create(
+                cliente=self.criar_cliente_n(n), valor_solicitado=Decimal('100.00'),
+                taxa_juros=Decimal('1.50'), prazo_meses=12
+            )
+        )
+
+    def test_investimentos(self):
+        self.assertConsultasConstantes(
+            '/api/v1/investimentos/',
+            lambda n: Investimento.objects.create(
+                cliente=self.criar_cliente_n(n), tipo='CDB',
+                valor_aplicado=Decimal('100.00'), rentabilidade=Decimal('10.00')
+            )
+        )
+
+
+class SerializacaoCompiladaTests(TestCase):
+    """Saída dos serializers compilados deve ser idêntica à do DRF"""
+
+    def setUp(self):
+        self.cliente = criar_cliente(first_name='Ana', last_name='Silva', email='ana@example.com')
+        self.origem = criar_conta(self.cliente, '1', '1234.50')
+        self.destino = criar_conta(self.cliente, '2')
+        Transacao.objects.create(
+            conta_origem=self.origem, conta_destino=self.destino, tipo='TRA',
+            valor=Decimal('10.00'), descricao='Aluguel ção', status='CON'
+        )
+        Transacao.objects.create(
+            conta_origem=self.origem, tipo='DEP', valor=Decimal('0.05'), descricao=None,
+            status='PEN', data_transacao=timezone.now().replace(microsecond=0)
+        )
+
+    def assertSaidaIdentica(self, serializer_class, queryset):
+        renderer = JSONRenderer()
+        esperado = renderer.render(serializer_class(queryset, many=True).data)
+        serializador = compilar(serializer_class)
+        obtido = renderer.render(serializador.serializar(serializador.valores(queryset)))
+        self.assertEqual(obtido, esperado)
+
+    def test_transacao(self):
+        self.assertSaidaIdentica(TransacaoSerializer, Transacao.objects.all())
+
+    def test_conta_resumo(self):
+        self.assertSaidaIdentica(ContaBancariaResumoSerializer, ContaBancaria.objects.all())
+
+    def test_conta(self):
+        self.assertSaidaIdentica(ContaBancariaSerializer, ContaBancaria.objects.all())
+
+    def test_cliente(self):
+        self.assertSaidaIdentica(ClienteSerializer, Cliente.objects.all())
+
+    def test_fuso_horario_ativo(self):
+        with timezone.override('UTC'):
+            self.assertSaidaIdentica(TransacaoSerializer, Transacao.objects.all())
+
+    def test_listagem_da_api(self):
+        client = APIClient()
+        client.force_authenticate(self.cliente.user)
+
+        resposta = client.get('/api/v1/transacoes/')
+
+        esperado = TransacaoSerializer(Transacao.objects.all(), many=True).data
+        self.assertEqual(resposta.json()['results'], json.loads(JSONRenderer().render(esperado)))
+
+
+class AmortizacaoTests(TestCase):
+    def test_price(self):
+        parcelas = cronograma('1000.00', '1.00', 12, PRICE, date(2024, 1, 31))
+
+        self.assertEqual(parcelas[0].prestacao, Decimal('88.85'))
+        self.assertEqual(parcelas[0].juros, Decimal('10.00'))
+        self.assertEqual(parcelas[-1].prestacao, Decimal('88.84'))
+        self.assertEqual(parcelas[-1].saldo_devedor, Decimal('0.00'))
+        self.assertEqual(sum(p.amortizacao for p in parcelas), Decimal('1000.00'))
+        self.assertEqual(parcelas[0].data_vencimento, date(2024, 2, 29))
+
+    def test_sac(self):
+        parcelas = cronograma('1000.00', '2.00', 3, SAC, date(2024, 1, 15))
+
+        self.assertEqual(
+            [(p.prestacao, p.juros, p.amortizacao) for p in parcelas],
+            [(Decimal('353.33'), Decimal('20.00'), Decimal('333.33')),
+             (Decimal('346.66'), Decimal('13.33'), Decimal('333.33')),
+             (Decimal('340.01'), Decimal('6.67'), Decimal('333.34'))]
+        )
+
+    def test_taxa_zero(self):
+        parcelas = cronograma('100.00', '0.00', 3, PRICE, date(2024, 1, 1))
+
+        self.assertEqual([p.prestacao for p in parcelas], [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+
+    def test_sac_com_amortizacao_arredondada_acima_do_saldo(self):
+        # 0.15 / 10 = 0.015 arredonda para 0.02: sem limite o saldo ficaria negativo
+        parcelas = cronograma('0.15', '0.00', 10, SAC, date(2024, 1, 1))
+
+        self.assertEqual(
+            [p.amortizacao for p in parcelas],
+            [Decimal('0.02')] * 7 + [Decimal('0.01'), Decimal('0.00'), Decimal('0.00')]
+        )
+        self.assertTrue(all(p.saldo_devedor >= 0 for p in parcelas))
+        self.assertEqual(parcelas[-1].saldo_devedor, Decimal('0.00'))
+        self.assertEqual(
+            cronogramas_em_lote([(Decimal('0.15'), Decimal('0.00'), 10, SAC)]).por_emprestimo()[0],
+            [(p.numero, int(p.prestacao * 100), int(p.juros * 100), int(p.amortizacao * 100),
+              int(p.saldo_devedor * 100)) for p in parcelas]
+        )
+
+    def test_adicionar_meses(self):
+        self.assertEqual(adicionar_meses(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(adicionar_meses(date(2024, 11, 30), 3), date(2025, 2, 28))
+        self.assertEqual(adicionar_meses(date(2024, 5, 10), 24), date(2026, 5, 10))
+
+    def test_lote_igual_ao_individual(self):
+        carteira = [
+            (Decimal('1000.00'), Decimal('1.00'), 12, PRICE),
+            (Decimal('54321.99'), Decimal('2.49'), 36, SAC),
+            (Decimal('777.77'), Decimal('0.00'), 5, PRICE),
+            (Decimal('150000.00'), Decimal('0.99'), 360, PRICE),
+        ]
+
+        lote = cronogramas_em_lote(carteira).por_emprestimo()
+
+        for indice, (principal, taxa, prazo, sistema) in enumerate(carteira):
+            esperado = [
+                (p.numero, int(p.prestacao * 100), int(p.juros * 100),
+                 int(p.amortizacao * 100), int(p.saldo_devedor * 100))
+                for p in cronograma(principal, taxa, prazo, sistema)
+            ]
+            self.assertEqual(lote[indice], esperado)
+
+
+class EmprestimoViewSetTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1')
+        self.emprestimo = Emprestimo.objects.create(
+            cliente=self.cliente, valor_solicitado=Decimal('1200.00'),
+            taxa_juros=Decimal('2.00'), prazo_meses=12, sistema_amortizacao='SAC'
+        )
+
+    def test_solicitar_emprestimo(self):
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.post('/api/v1/emprestimos/', {
+            'cliente_id': self.cliente.id, 'valor_solicitado': '5000.00', 'prazo_meses': 12
+        }, format='json')
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['status'], 'SOL')
+        self.assertEqual(resposta.data['data_solicitacao'], timezone.localdate().isoformat())
+
+    def test_parcelas_simuladas(self):
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.get(f'/api/v1/emprestimos/{self.emprestimo.id}/parcelas/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.data['parcelas']), 12)
+        self.assertEqual(resposta.data['parcelas'][0]['prestacao'], '124.00')
+        self.assertEqual(resposta.data['total_juros'], '156.00')
+        self.assertEqual(resposta.data['total_pago'], '1356.00')
+
+    def test_aprovar_usa_meses_de_calendario(self):
+        admin = User.objects.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+
+        with mock.patch('servicos.views.timezone.localdate', return_value=date(2024, 1, 31)):
+            resposta = self.client.post(f'/api/v1/emprestimos/{self.emprestimo.id}/aprovar/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['data_vencimento'], '2025-01-31')
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('1200.00'))
+        resposta = self.client.get(f'/api/v1/emprestimos/{self.emprestimo.id}/parcelas/')
+        self.assertEqual(resposta.data['parcelas'][0]['data_vencimento'], '2024-02-29')
+
+    def criar_emprestimos(self, quantidade, **kwargs):
+        return Emprestimo.objects.bulk_create([
+            Emprestimo(
+                cliente=self.cliente, valor_solicitado=Decimal('100.00'),
+                taxa_juros=Decimal('2.00'), prazo_meses=12, **kwargs
+            )
+            for _ in range(quantidade)
+        ])
+
+    def test_aprovar_sem_conta_ativa_nao_aprova(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        ContaBancaria.objects.update(ativa=False)
+
+        resposta = self.client.post(f'/api/v1/emprestimos/{self.emprestimo.id}/aprovar/')
+
+        self.assertEqual(resposta.status_code, 400)
+        self.emprestimo.refresh_from_db()
+        self.assertEqual(self.emprestimo.status, 'SOL')
+
+    def test_aprovar_rejeita_valor_invalido(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        self.conta.saldo = Decimal('100.00')
+        self.conta.save()
+
+        for valor in ('abc', '0', '-500'):
+            with self.subTest(valor=valor):
+                resposta = self.client.post(
+                    f'/api/v1/emprestimos/{self.emprestimo.id}/aprovar/', {'valor_aprovado': valor}, format='json'
+                )
+
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('valor_aprovado', resposta.data)
+        self.emprestimo.refresh_from_db()
+        self.assertEqual(self.emprestimo.status, 'SOL')
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('100.00'))
+
+    def test_aprovar_com_valor_informado(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+        resposta = self.client.post(
+            f'/api/v1/emprestimos/{self.emprestimo.id}/aprovar/', {'valor_aprovado': '800.00'}, format='json'
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['valor_aprovado'], '800.00')
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('800.00'))
+
+    def test_aprovar_lote_reporta_cada_item(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        aprovado, = self.criar_emprestimos(1, status='APR')
+
+        resposta = self.client.post('/api/v1/emprestimos/aprovar-lote/', [
+            {'emprestimo_id': self.emprestimo.id, 'valor_aprovado': '1000.00'},
+            {'emprestimo_id': aprovado.id},
+            {'emprestimo_id': 999999},
+            {'emprestimo_id': self.emprestimo.id},
+            {'emprestimo_id': self.emprestimo.id, 'valor_aprovado': '-1'},
+        ], format='json')
+
+        self.assertEqual(resposta.status_code, 207)
+        self.assertEqual((resposta.data['sucesso'], resposta.data['falhas']), (1, 4))
+        self.assertEqual(resposta.data['resultados'][0]['valor_aprovado'], '1000.00')
+        self.assertEqual(
+            [resultado['sucesso'] for resultado in resposta.data['resultados']],
+            [True, False, False, False, False]
+        )
+        self.assertIn('repetido', resposta.data['resultados'][3]['erros']['detail'])
+        self.assertIn('valor_aprovado', resposta.data['resultados'][4]['erros'])
+        self.emprestimo.refresh_from_db()
+        self.assertEqual((self.emprestimo.status, self.emprestimo.valor_aprovado), ('APR', Decimal('1000.00')))
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('1000.00'))
+        self.assertEqual(SaldoDiario.objects.get(conta=self.conta).saldo, Decimal('1000.00'))
+
+    def test_aprovar_lote_somente_admin(self):
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.post('/api/v1/emprestimos/aprovar-lote/', [
+            {'emprestimo_id': self.emprestimo.id}
+        ], format='json')
+
+        self.assertEqual(resposta.status_code, 403)
+
+    def test_aprovar_lote_com_consultas_constantes(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+        def consultas(quantidade):
+            itens = [{'emprestimo_id': emprestimo.id} for emprestimo in self.criar_emprestimos(quantidade)]
+            with CaptureQueriesContext(connection) as capturadas:
+                resposta = self.client.post('/api/v1/emprestimos/aprovar-lote/', itens, format='json')
+            self.assertEqual(resposta.data['sucesso'], quantidade)
+            return len(capturadas)
+
+        self.assertEqual(consultas(2), consultas(20))
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('2200.00'))
+        self.assertEqual(Transacao.objects.filter(conta_origem=self.conta, tipo='DEP').count(), 22)
+
+    def test_comando_aprovar_emprestimos(self):
+        outro, = self.criar_emprestimos(1)
+        entrada = io.StringIO(f'emprestimo_id,valor_aprovado\n{self.emprestimo.id},500.00\n{outro.id},\nabc,\n')
+        saida, erros = io.StringIO(), io.StringIO()
+
+        with mock.patch('sys.stdin', entrada):
+            call_command('aprovar_emprestimos', '-', stdout=saida, stderr=erros)
+
+        self.assertIn('2 empréstimo(s) aprovado(s), 1 falha(s)', saida.getvalue())
+        self.assertIn('Linha 4', erros.getvalue())
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('600.00'))
+
+
+class AtrasosTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.referencia = date(2024, 6, 10)
+
+    def criar(self, status, data_vencimento):
+        return Emprestimo.objects.create(
+            cliente=self.cliente, valor_solicitado=Decimal('100.00'), taxa_juros=Decimal('2.00'),
+            prazo_meses=12, status=status, data_vencimento=data_vencimento
+        )
+
+    def test_marca_apenas_aprovados_vencidos(self):
+        vencidos = [self.criar('APR', date(2024, 6, dia)) for dia in (1, 1, 9)]
+        no_dia = self.criar('APR', self.referencia)
+        solicitado = self.criar('SOL', date(2024, 1, 1))
+
+        checkpoint, marcados, retomada = marcar_emprestimos_atrasados(self.referencia, tamanho_bloco=2)
+
+        self.assertEqual(marcados, 3)
+        self.assertFalse(retomada)
+        self.assertIsNotNone(checkpoint.concluida_em)
+        self.assertEqual(
+            dict(Emprestimo.objects.values_list('pk', 'status')),
+            {**{emprestimo.pk: 'ATR' for emprestimo in vencidos}, no_dia.pk: 'APR', solicitado.pk: 'SOL'}
+        )
+
+    def test_retoma_execucao_interrompida(self):
+        for dia in (1, 2, 3):
+            self.criar('APR', date(2024, 6, dia))
+
+        with mock.patch('servicos.atrasos.emprestimos_alterados.send', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                marcar_emprestimos_atrasados(self.referencia, tamanho_bloco=1)
+        # O bloco que falhou foi desfeito junto com o avanço do checkpoint
+        self.assertEqual(Emprestimo.objects.filter(status='ATR').count(), 1)
+
+        checkpoint, marcados, retomada = marcar_emprestimos_atrasados(self.referencia, tamanho_bloco=1)
+
+        self.assertTrue(retomada)
+        self.assertEqual(marcados, 2)
+        self.assertEqual(checkpoint.processados, 3)
+        self.assertEqual(checkpoint.ultimo_vencimento, date(2024, 6, 3))
+
+    def test_invalida_listagens_em_cache(self):
+        self.criar('APR', date(2024, 1, 1))
+        self.client.force_authenticate(self.cliente.user)
+        self.client.get('/api/v1/emprestimos/')
+
+        marcar_emprestimos_atrasados(self.referencia)
+
+        resposta = self.client.get('/api/v1/emprestimos/')
+        self.assertEqual(resposta.data['results'][0]['status'], 'ATR')
+
+    def test_comando_marcar_atrasados(self):
+        self.criar('APR', date(2024, 1, 1))
+        saida = io.StringIO()
+
+        call_command('marcar_atrasados', '--data', '2024-06-10', stdout=saida)
+
+        self.assertIn('1 empréstimo(s) marcado(s)', saida.getvalue())
+
+
+class ValorizacaoTests(TestCase):
+    def test_um_ano_rende_a_taxa_anual(self):
+        curva = curva_de_acumulacao(Decimal('10.00'))
+
+        self.assertEqual(curva.fator(365).quantize(Decimal('0.000001')), Decimal('1.100000'))
+        self.assertEqual(curva.fator(0), 1)
+
+    def test_extensao_nao_altera_lista_ja_devolvida(self):
+        curva = CurvaAcumulacao(Decimal('12.00'))
+        curta = curva.estender(10)
+        copia = list(curta)
+
+        longa = curva.estender(400)
+
+        self.assertEqual(curta, copia)
+        self.assertEqual(len(longa), 401)
+        self.assertEqual(longa[:11], copia)
+
+    def test_extensao_concorrente(self):
+        curva = CurvaAcumulacao(Decimal('12.00'))
+        esperado = CurvaAcumulacao(Decimal('12.00')).estender(2000)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            listas = list(executor.map(curva.estender, range(0, 2001, 50)))
+
+        for dias, fatores in zip(range(0, 2001, 50), listas):
+            self.assertEqual(fatores[:dias + 1], esperado[:dias + 1])
+        self.assertEqual(curva.fatores, esperado)
+
+    def test_valor_limitado_ao_vencimento(self):
+        hoje = date(2025, 1, 1)
+        linhas = [
+            ('CDB', Decimal('1000.00'), Decimal('10.00'), date(2024, 1, 2), None),
+            ('CDB', Decimal('1000.00'), Decimal('10.00'), date(2023, 1, 1), date(2024, 1, 1)),
+            ('LCI', Decimal('500.00'), Decimal('0.00'), date(2024, 6, 1), None),
+        ]
+
+        por_tipo, total = valorizar(linhas, hoje)
+
+        self.assertEqual(por_tipo['CDB'].quantidade, 2)
+        self.assertEqual(por_tipo['CDB'].valor_atual, Decimal('2200.00'))
+        self.assertEqual(por_tipo['LCI'].rendimento, Decimal('0.00'))
+        self.assertEqual(total.valor_aplicado, Decimal('2500.00'))
+        self.assertEqual(total.valor_atual, Decimal('2700.00'))
+
+
+class PosicaoInvestimentosTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        hoje = timezone.localdate()
+        for tipo, valor in (('CDB', '1000.00'), ('CDB', '500.00'), ('LCA', '200.00')):
+            Investimento.objects.create(
+                cliente=self.cliente, tipo=tipo, valor_aplicado=Decimal(valor),
+                rentabilidade=Decimal('12.00'), data_aplicacao=hoje - timedelta(days=365)
+            )
+        Investimento.objects.create(
+            cliente=self.cliente, tipo='ACO', valor_aplicado=Decimal('50.00'),
+            rentabilidade=Decimal('12.00'), data_aplicacao=hoje, ativo=False
+        )
+        outro = criar_cliente('outro', '111.111.111-11')
+        Investimento.objects.create(
+            cliente=outro, tipo='CDB', valor_aplicado=Decimal('999.00'),
+            rentabilidade=Decimal('12.00'), data_aplicacao=hoje
+        )
+
+    def test_posicao_do_cliente(self):
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.get('/api/v1/investimentos/posicao/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['total']['quantidade'], 3)
+        self.assertEqual(resposta.data['total']['valor_aplicado'], '1700.00')
+        self.assertEqual(resposta.data['total']['valor_atual'], '1904.00')
+        self.assertEqual(
+            [(linha['tipo'], linha['quantidade'], linha['valor_atual']) for linha in resposta.data['por_tipo']],
+            [('CDB', 2, '1680.00'), ('LCA', 1, '224.00')]
+        )
+
+    def test_staff_filtra_por_cliente(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+        toda = self.client.get('/api/v1/investimentos/posicao/')
+        do_cliente = self.client.get(f'/api/v1/investimentos/posicao/?cliente={self.cliente.id}')
+
+        self.assertEqual(toda.data['total']['quantidade'], 4)
+        self.assertEqual(do_cliente.data['total']['quantidade'], 3)
+
+    def test_data_invalida(self):
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.get('/api/v1/investimentos/posicao/?data=amanha')
+
+        self.assertEqual(resposta.status_code, 400)
+
+
+class ResgateInvestimentosTests(APITestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1')
+        self.referencia = date(2025, 1, 1)
+
+    def criar(self, valor, data_vencimento, cliente=None):
+        return Investimento.objects.create(
+            cliente=cliente or self.cliente, tipo='CDB', valor_aplicado=Decimal(valor),
+            rentabilidade=Decimal('12.00'), data_aplicacao=date(2024, 1, 1), data_vencimento=data_vencimento
+        )
+
+    def test_resgate_antecipado_pelo_endpoint(self):
+        investimento = self.criar('1000.00', date(2030, 1, 1))
+        self.client.force_authenticate(self.cliente.user)
+
+        with mock.patch('servicos.resgates.timezone.localdate', return_value=date(2024, 12, 31)):
+            resposta = self.client.post(f'/api/v1/investimentos/{investimento.id}/resgatar/')
+        repetida = self.client.post(f'/api/v1/investimentos/{investimento.id}/resgatar/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['valor_resgatado'], '1120.00')
+        self.assertFalse(resposta.data['investimento']['ativo'])
+        self.assertEqual(repetida.status_code, 400)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('1120.00'))
+
+    def test_posicao_nao_alterada_por_patch_antes_do_resgate(self):
+        investimento = self.criar('50.00', date(2030, 1, 1))
+        self.client.force_authenticate(self.cliente.user)
+        url = f'/api/v1/investimentos/{investimento.id}/'
+
+        self.client.patch(url, {
+            'valor_aplicado': '1000000.00', 'rentabilidade': '900.00',
+            'data_aplicacao': '2000-01-01', 'data_vencimento': '2000-01-02', 'tipo': 'LCI'
+        }, format='json')
+        with mock.patch('servicos.resgates.timezone.localdate', return_value=date(2024, 1, 1)):
+            resposta = self.client.post(f'{url}resgatar/')
+        self.client.patch(url, {'ativo': True}, format='json')
+        repetida = self.client.post(f'{url}resgatar/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['valor_resgatado'], '50.00')
+        self.assertEqual(repetida.status_code, 400)
+        investimento.refresh_from_db()
+        self.assertEqual(
+            (investimento.tipo, investimento.valor_aplicado, investimento.rentabilidade, investimento.ativo),
+            ('CDB', Decimal('50.00'), Decimal('12.00'), False)
+        )
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('50.00'))
+
+    def test_resgatar_investimento_de_outro_cliente(self):
+        investimento = self.criar('100.00', None, criar_cliente('outro', '111.111.111-11'))
+        self.client.force_authenticate(self.cliente.user)
+
+        resposta = self.client.post(f'/api/v1/investimentos/{investimento.id}/resgatar/')
+
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_lote_resgata_vencidos_uma_unica_vez(self):
+        outra = criar_conta(self.cliente, '2')
+        vencidos = [self.criar('1000.00', date(2024, 12, 31)) for _ in range(3)]
+        futuro = self.criar('1000.00', date(2025, 1, 2))
+        sem_conta = self.criar('1000.00', date(2024, 6, 1), criar_cliente('outro', '111.111.111-11'))
+
+        totais = resgatar_vencidos(self.referencia, tamanho_bloco=2)
+        repetido = resgatar_vencidos(self.referencia)
+
+        self.assertEqual((totais['resgatados'], totais['falhas'], totais['valor']), (3, 1, Decimal('3360.00')))
+        self.assertEqual((repetido['resgatados'], repetido['falhas']), (0, 1))
+        self.assertEqual(
+            dict(Investimento.objects.values_list('pk', 'ativo')),
+            {**{investimento.pk: False for investimento in vencidos}, futuro.pk: True, sem_conta.pk: True}
+        )
+        # Crédito agregado na conta ativa mais recente
+        outra.refresh_from_db()
+        self.assertEqual(outra.saldo, Decimal('3360.00'))
+        self.assertEqual(Transacao.objects.filter(conta_origem=outra, tipo='DEP').count(), 3)
+
+    def test_comando_resgatar_investimentos(self):
+        self.criar('1000.00', date(2024, 12, 31))
+        saida = io.StringIO()
+
+        call_command('resgatar_investimentos', '--data', '2025-01-01', stdout=saida)
+
+        self.assertIn('1 investimento(s) resgatado(s), R$ 1120.00', saida.getvalue())
+
+
+class ResumoClienteTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.cliente = criar_cliente()
+        self.corrente = criar_conta(self.cliente, '1', '100.00')
+        criar_conta(self.cliente, '2', '50.00', tipo_conta='CP')
+        Emprestimo.objects.create(
+            cliente=self.cliente, valor_solicitado=Decimal('1000.00'), valor_aprovado=Decimal('800.00'),
+            taxa_juros=Decimal('1.50'), prazo_meses=12, status='APR'
+        )
+        Emprestimo.objects.create(
+            cliente=self.cliente, valor_solicitado=Decimal('300.00'),
+            taxa_juros=Decimal('1.50'), prazo_meses=12
+        )
+        Investimento.objects.create(
+            cliente=self.cliente, tipo='CDB', valor_aplicado=Decimal('40.00'), rentabilidade=Decimal('10.00')
+        )
+        self.url = f'/api/v1/clientes/{self.cliente.id}/resumo/'
+        autenticar(self.client, self.cliente.user)
+
+    def test_resumo(self):
+        resposta = self.client.get(self.url)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['contas']['saldo_total'], '150.00')
+        self.assertEqual(resposta.data['contas']['por_tipo']['CP']['valor'], '50.00')
+        self.assertEqual(resposta.data['emprestimos']['principal_em_aberto'], '800.00')
+        self.assertEqual(resposta.data['emprestimos']['por_status']['SOL']['valor'], '300.00')
+        self.assertEqual(resposta.data['investimentos']['por_tipo']['CDB']['quantidade'], 1)
+
+    def test_consultas_constantes_e_cache(self):
+        for numero in range(3, 13):
+            criar_conta(self.cliente, str(numero), '1.00')
+        cache.clear()
+
+        # Cliente e três agregações; do cache, só o cliente
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        with self.assertNumQueries(1):
+            resposta = self.client.get(self.url)
+        self.assertEqual(resposta.data['contas']['saldo_total'], '160.00')
+
+    def test_invalidado_por_lancamento(self):
+        self.client.get(self.url)
+
+        lancar_transacao('DEP', Decimal('10.00'), self.corrente.id)
+
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.data['contas']['saldo_total'], '160.00')
+
+    def test_invalidado_por_novo_investimento(self):
+        self.client.get(self.url)
+
+        Investimento.objects.create(
+            cliente=self.cliente, tipo='LCI', valor_aplicado=Decimal('5.00'), rentabilidade=Decimal('9.00')
+        )
+
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.data['investimentos']['valor_aplicado'], '45.00')
+
+    def test_cliente_de_outro_usuario(self):
+        outro = criar_cliente('outro', '111.111.111-11')
+
+        resposta = self.client.get(f'/api/v1/clientes/{outro.id}/resumo/')
+
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_escrita_em_outro_processo_vale_apos_a_validade(self):
+        self.client.get(self.url)
+        # Escrita sem sinais, como a de outro worker com LocMemCache próprio
+        ContaBancaria.objects.filter(cliente=self.cliente).update(saldo=Decimal('1.00'))
+
+        with self.settings(CACHE_RESUMO_TTL=30):
+            self.assertEqual(self.client.get(self.url).data['contas']['saldo_total'], '150.00')
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 31):
+                resposta = self.client.get(self.url)
+
+        self.assertEqual(resposta.data['contas']['saldo_total'], '2.00')
+
+    def test_check_de_implantacao_exige_cache_compartilhado(self):
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        compartilhado = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+
+        with self.settings(CACHES={'default': local, 'listagens': local}):
+            self.assertEqual([aviso.id for aviso in verificar_cache_dos_resumos(None)], ['servicos.W002'])
+        with self.settings(CACHES={'default': compartilhado, 'listagens': local}):
+            self.assertEqual(verificar_cache_dos_resumos(None), [])
+
+
+class EndpointsAssincronosTests(APITestCase):
+    """Os endpoints em /api/v1/async/ respondem igual aos viewsets síncronos"""
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        self.outra = criar_conta(self.cliente, '2')
+        for numero in range(3, 14):
+            criar_conta(self.cliente, str(numero))
+        base = timezone.now()
+        self.transacoes = [
+            Transacao.objects.create(
+                conta_origem=self.conta if i % 2 else self.outra,
+                conta_destino=self.outra if i % 2 else self.conta,
+                tipo='TRA', valor=Decimal('1.00'), status='CON',
+                data_transacao=base - timedelta(minutes=i % 3)
+            )
+            for i in range(5)
+        ]
+        token = RefreshTokenCliente.for_user(self.cliente.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertMesmaResposta(self, caminho):
+        sincrona = self.client.get(f'/api/v1/{caminho}')
+        assincrona = self.client.get(f'/api/v1/async/{caminho}')
+
+        self.assertEqual(assincrona.status_code, sincrona.status_code)
+        esperado = json.loads(sincrona.content)
+        for link in ('next', 'previous'):
+            if isinstance(esperado, dict) and esperado.get(link):
+                esperado[link] = esperado[link].replace('/api/v1/', '/api/v1/async/')
+        self.assertEqual(json.loads(assincrona.content), esperado)
+        return esperado
+
+    def test_listagem_de_contas(self):
+        primeira = self.assertMesmaResposta('contas/')
+        self.assertEqual(primeira['count'], 13)
+        self.assertMesmaResposta('contas/?page=2')
+        self.assertMesmaResposta('contas/?page=3')
+
+    def test_extrato(self):
+        pagina = self.assertMesmaResposta(f'contas/{self.conta.id}/extrato/?page_size=2')
+        cursor = pagina['next'].split('cursor=')[1]
+        self.assertMesmaResposta(f'contas/{self.conta.id}/extrato/?page_size=2&cursor={cursor}')
+
+    def test_detalhe_de_transacao(self):
+        self.assertMesmaResposta(f'transacoes/{self.transacoes[0].id_transacao}/')
+
+    def test_resumo(self):
+        self.assertMesmaResposta(f'clientes/{self.cliente.id}/resumo/')
+
+    def test_recursos_de_outro_cliente(self):
+        outro = criar_cliente('outro', '111.111.111-11')
+        conta = criar_conta(outro, '99')
+
+        for caminho in (f'contas/{conta.id}/extrato/', f'clientes/{outro.id}/resumo/'):
+            resposta = self.client.get(f'/api/v1/async/{caminho}')
+            self.assertEqual(resposta.status_code, 404)
+
+    def test_sem_token(self):
+        self.client.credentials()
+
+        resposta = self.client.get('/api/v1/async/contas/')
+
+        self.assertEqual(resposta.status_code, 401)
+        self.assertIn('Bearer', resposta['WWW-Authenticate'])
+
+    def test_pagina_invalida(self):
+        self.assertMesmaResposta('contas/?page=9')
+
+
+class IdempotenciaTests(APITestCase):
+    def setUp(self):
+        cache_respostas.limpar()
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        self.client.force_authenticate(self.cliente.user)
+        self.saque = {'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '30.00'}
+
+    def sacar(self, chave, dados=None):
+        return self.client.post(
+            '/api/v1/transacoes/', dados or self.saque, format='json', HTTP_IDEMPOTENCY_KEY=chave
+        )
+
+    def test_repeticao_devolve_a_resposta_original(self):
+        primeira = self.sacar('chave-1')
+        repetida = self.sacar('chave-1')
+
+        self.assertEqual(repetida.status_code, 201)
+        self.assertEqual(repetida.data, primeira.data)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transacao.objects.count(), 1)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('70.00'))
+
+    def test_repeticao_pela_tabela_nao_toca_nas_contas(self):
+        primeira = self.sacar('chave-1')
+        cache_respostas.limpar()
+
+        with CaptureQueriesContext(connection) as consultas:
+            repetida = self.sacar('chave-1')
+
+        self.assertEqual(repetida.data, primeira.data)
+        self.assertFalse(any('servicos_contabancaria' in consulta['sql'] for consulta in consultas))
+
+    def test_chave_reutilizada_com_outro_corpo(self):
+        self.sacar('chave-1')
+
+        resposta = self.sacar('chave-1', {**self.saque, 'valor': '10.00'})
+
+        self.assertEqual(resposta.status_code, 422)
+        self.assertEqual(Transacao.objects.count(), 1)
+
+    def test_requisicao_original_em_processamento(self):
+        ChaveIdempotencia.objects.create(
+            usuario=self.cliente.user, rota='transacoes', chave='chave-1',
+            hash_requisicao=hash_da_requisicao(self.saque),
+            expira_em=timezone.now() + timedelta(hours=1)
+        )
+
+        resposta = self.sacar('chave-1')
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertFalse(Transacao.objects.exists())
+
+    def test_erro_libera_a_chave(self):
+        resposta = self.sacar('chave-1', {**self.saque, 'tipo': 'XXX'})
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.sacar('chave-1')
+
+        self.assertEqual(resposta.status_code, 201)
+
+    def test_chave_expirada_pode_ser_reusada(self):
+        self.sacar('chave-1')
+        ChaveIdempotencia.objects.update(expira_em=timezone.now() - timedelta(seconds=1))
+        cache_respostas.limpar()
+
+        resposta = self.sacar('chave-1')
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(Transacao.objects.count(), 2)
+
+    def test_investimento_debitado_uma_vez(self):
+        dados = {'cliente_id': self.cliente.id, 'tipo': 'CDB', 'valor_aplicado': '40.00', 'rentabilidade': '10.00'}
+        for _ in range(2):
+            resposta = self.client.post(
+                '/api/v1/investimentos/', dados, format='json', HTTP_IDEMPOTENCY_KEY='aplicacao-1'
+            )
+            self.assertEqual(resposta.status_code, 201)
+
+        self.assertEqual(Investimento.objects.count(), 1)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('60.00'))
+
+    def test_poda_em_blocos(self):
+        agora = timezone.now()
+        for i in range(5):
+            ChaveIdempotencia.objects.create(
+                usuario=self.cliente.user, rota='transacoes', chave=f'velha-{i}',
+                hash_requisicao='-', expira_em=agora - timedelta(hours=1)
+            )
+        self.sacar('nova')
+
+        self.assertEqual(podar_chaves_expiradas(tamanho_bloco=2), 5)
+        self.assertEqual(list(ChaveIdempotencia.objects.values_list('chave', flat=True)), ['nova'])
+
+
+class AuditoriaTests(TransactionTestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.cliente.user)
+
+    def test_evento_gravado_apos_o_commit(self):
+        resposta = self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '30.00'
+        })
+        escritor.descarregar()
+
+        evento = EventoSaldo.objects.exclude(origem=ORIGEM_ABERTURA).get()
+        self.assertEqual(str(evento.transacao_id), resposta.data['id_transacao'])
+        self.assertEqual((evento.conta_id, evento.delta, evento.saldo_resultante),
+                         (self.conta.id, Decimal('-30.00'), Decimal('70.00')))
+        self.assertEqual((evento.ator_id, evento.origem), (self.cliente.user.id, 'transacao.create'))
+
+    def test_transacao_rejeitada_nao_gera_evento(self):
+        self.client.post('/api/v1/transacoes/', {
+            'conta_origem_id': self.conta.id, 'tipo': 'SAQ', 'valor': '300.00'
+        })
+        escritor.descarregar()
+
+        self.assertFalse(EventoSaldo.objects.exclude(origem=ORIGEM_ABERTURA).exists())
+
+    def test_eventos_sao_imutaveis(self):
+        lancar_transacao('DEP', Decimal('1.00'), self.conta.id)
+        escritor.descarregar()
+        evento = EventoSaldo.objects.exclude(origem=ORIGEM_ABERTURA).get()
+
+        with self.assertRaises(TypeError):
+            evento.save()
+        with self.assertRaises(TypeError):
+            EventoSaldo.objects.update(delta=0)
+        with self.assertRaises(TypeError):
+            EventoSaldo.objects.all().delete()
+
+    def test_conta_criada_com_saldo_registra_abertura(self):
+        escritor.descarregar()
+
+        evento = EventoSaldo.objects.get(conta_id=self.conta.id)
+        self.assertEqual(
+            (evento.transacao_id, evento.delta, evento.saldo_resultante, evento.origem),
+            (None, Decimal('100.00'), Decimal('100.00'), ORIGEM_ABERTURA)
+        )
+        criar_conta(self.cliente, '2')
+        escritor.descarregar()
+        self.assertEqual(EventoSaldo.objects.count(), 1)
+
+    def test_eventos_gravados_fora_de_ordem(self):
+        # Dois processos descarregam suas filas em ordem inversa à dos commits:
+        # a abertura e o depósito da origem chegam depois da transferência
+        origem, destino = criar_conta(self.cliente, '2'), criar_conta(self.cliente, '3')
+        agora = timezone.now()
+        EventoSaldo.objects.bulk_create([
+            EventoSaldo(conta_id=origem.id, delta=Decimal('-70.00'), saldo_resultante=Decimal('80.00'),
+                        origem='transacao.create', ocorrido_em=agora),
+            EventoSaldo(conta_id=destino.id, delta=Decimal('70.00'), saldo_resultante=Decimal('70.00'),
+                        origem='transacao.create', ocorrido_em=agora),
+            EventoSaldo(conta_id=origem.id, delta=Decimal('50.00'), saldo_resultante=Decimal('150.00'),
+                        origem='transacao.create', ocorrido_em=agora),
+            EventoSaldo(conta_id=origem.id, delta=Decimal('100.00'), saldo_resultante=Decimal('100.00'),
+                        origem=ORIGEM_ABERTURA, ocorrido_em=agora),
+        ])
+        ContaBancaria.objects.filter(pk=origem.id).update(saldo=Decimal('80.00'))
+        ContaBancaria.objects.filter(pk=destino.id).update(saldo=Decimal('70.00'))
+
+        self.assertEqual(reconstruir_saldos_do_log([origem.id, destino.id], aplicar=True), [])
+        self.assertEqual(
+            dict(ContaBancaria.objects.filter(pk__in=[origem.id, destino.id]).values_list('id', 'saldo')),
+            {origem.id: Decimal('80.00'), destino.id: Decimal('70.00')}
+        )
+
+    def test_reconstroi_saldo_a_partir_do_log(self):
+        # A conta abre com 100.00 e o destino com 7.00: o log deve partir deles
+        destino = criar_conta(self.cliente, '2', '7.00')
+        lancar_transacao('DEP', Decimal('50.00'), self.conta.id)
+        lancar_lote([
+            (0, {'conta_origem_id': self.conta.id, 'conta_destino_id': destino.id, 'tipo': 'TRA', 'valor': Decimal('20.00')}),
+            (1, {'conta_origem_id': destino.id, 'tipo': 'SAQ', 'valor': Decimal('5.00')}),
+        ])
+        escritor.descarregar()
+        ContaBancaria.objects.update(saldo=Decimal('999.00'))
+
+        call_command('reprocessar_auditoria', '--aplicar', stdout=io.StringIO())
+
+        self.assertEqual(
+            dict(ContaBancaria.objects.values_list('id', 'saldo')),
+            {self.conta.id: Decimal('130.00'), destino.id: Decimal('22.00')}
+        )
+
+    def test_segmentos_em_arquivo_com_rotacao(self):
+        escritor.descarregar()
+        with tempfile.TemporaryDirectory() as diretorio, self.settings(
+            AUDITORIA_DESTINO='arquivo', AUDITORIA_DIRETORIO=diretorio, AUDITORIA_TAMANHO_SEGMENTO=200
+        ):
+            conta = criar_conta(self.cliente, '2', '100.00')
+            for _ in range(3):
+                lancar_transacao('DEP', Decimal('10.00'), conta.id)
+                # Um lote por evento: a rotação acontece entre lotes
+                escritor.descarregar()
+
+            self.assertFalse(EventoSaldo.objects.filter(conta_id=conta.id).exists())
+            self.assertGreater(len(segmentos_configurados().segmentos()), 1)
+            self.assertEqual(saldos_do_log(arquivos=True), {conta.id: Decimal('130.00')})
+
+
+class RoteamentoReplicaTests(SimpleTestCase):
+    def setUp(self):
+        self.roteador = RoteadorReplica()
+        self.roteador.replica = 'replica'
+        self.view = ContaBancariaViewSet.as_view({'get': 'list', 'post': 'create'})
+
+    def rotear(self, request, view, operacoes):
+        """Executa `operacoes` (leitura/escrita) dentro do middleware e retorna os aliases"""
+        aliases = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            for operacao in operacoes:
+                metodo = self.roteador.db_for_read if operacao == 'leitura' else self.roteador.db_for_write
+                aliases.append(metodo(ContaBancaria))
+
+        middleware = RoteamentoReplicaMiddleware(get_response)
+        middleware(request)
+        return aliases
+
+    def test_leituras_dos_viewsets_vao_para_a_replica(self):
+        request = RequestFactory().get('/api/v1/contas/')
+        self.assertEqual(self.rotear(request, self.view, ['leitura', 'leitura']), ['replica', 'replica'])
+
+    def test_leitura_apos_escrita_fica_no_primario(self):
+        request = RequestFactory().get('/api/v1/contas/')
+        self.assertEqual(
+            self.rotear(request, self.view, ['leitura', 'escrita', 'leitura']),
+            ['replica', 'default', 'default']
+        )
+
+    def test_escritas_e_outras_views_usam_o_primario(self):
+        self.assertEqual(self.rotear(RequestFactory().post('/api/v1/contas/'), self.view, ['leitura']), ['default'])
+        self.assertEqual(self.rotear(RequestFactory().get('/api/auth/'), lambda r: None, ['leitura']), ['default'])
+        # Fora de uma requisição (comandos, threads de fundo)
+        self.assertEqual(self.roteador.db_for_read(ContaBancaria), 'default')
+
+    def test_sem_replica_configurada_tudo_vai_para_o_primario(self):
+        self.roteador.replica = None
+        request = RequestFactory().get('/api/v1/contas/')
+        self.assertEqual(self.rotear(request, self.view, ['leitura']), ['default'])
+
+    def test_middleware_assincrono(self):
+        aliases = []
+
+        async def get_response(request):
+            middleware.process_view(request, self.view, (), {})
+            aliases.append(self.roteador.db_for_read(ContaBancaria))
+
+        middleware = RoteamentoReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(RequestFactory().get('/api/v1/contas/'))
+
+        self.assertEqual(aliases, ['replica'])
+        self.assertEqual(self.roteador.db_for_read(ContaBancaria), 'default')
+
+
+class PerfilSqliteTests(SimpleTestCase):
+    def test_perfil_otimizado_e_opcional(self):
+        with mock.patch.dict('os.environ', {'DB_SQLITE_OTIMIZADO': 'False'}):
+            self.assertNotIn('OPTIONS', configuracao.configuracao_banco('DB'))
+
+    def test_perfil_otimizado_aplicado_a_cada_conexao(self):
+        with mock.patch.dict('os.environ', {'DB_SQLITE_OTIMIZADO': 'True'}):
+            opcoes = configuracao.configuracao_banco('DB')['OPTIONS']
+
+        self.assertEqual(opcoes['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', opcoes['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL', opcoes['init_command'])
+        self.assertGreater(opcoes['timeout'], 5)
+
+    def test_nome_padrao_e_conexoes_persistentes(self):
+        with mock.patch.dict('os.environ', {}, clear=True):
+            banco = configuracao.configuracao_banco('DB')
+            with mock.patch.object(configuracao, 'DB_ENGINE', 'postgresql'):
+                banco_postgres = configuracao.configuracao_banco('DB')
+
+        self.assertEqual(banco['NAME'], configuracao.BASE_DIR / 'db.sqlite3')
+        self.assertEqual(banco['CONN_MAX_AGE'], 0)
+        self.assertEqual(banco_postgres['NAME'], '')
+
+
+class CacheListagensTests(APITestCase):
+    def setUp(self):
+        caches['listagens'].clear()
+        self.cliente = criar_cliente()
+        self.conta = criar_conta(self.cliente, '1', '100.00')
+        autenticar(self.client, self.cliente.user)
+
+    def test_listagem_repetida_nao_consulta_o_banco(self):
+        primeira = self.client.get('/api/v1/contas/')
+
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/api/v1/contas/')
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+        self.assertIn('private', segunda['Cache-Control'])
+
+    def test_if_none_match_atual_responde_304(self):
+        etag = self.client.get('/api/v1/contas/')['ETag']
+
+        with self.assertNumQueries(0):
+            resposta = self.client.get('/api/v1/contas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta['ETag'], etag)
+
+    def test_query_string_tem_entrada_propria(self):
+        etag = self.client.get('/api/v1/contas/')['ETag']
+
+        resposta = self.client.get('/api/v1/contas/?page=1', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_lancamento_invalida_as_listagens_do_cliente(self):
+        etag = self.client.get('/api/v1/contas/')['ETag']
+        lancar_transacao('DEP', Decimal('50.00'), self.conta.id)
+
+        resposta = self.client.get('/api/v1/contas/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['results'][0]['saldo'], '150.00')
+
+    def test_escrita_de_outro_cliente_invalida_apenas_a_versao_global(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client_staff = APIClient()
+        autenticar(client_staff, staff)
+        etag_cliente = self.client.get('/api/v1/investimentos/')['ETag']
+        etag_staff = client_staff.get('/api/v1/investimentos/')['ETag']
+
+        outro = criar_cliente('outro', '111.111.111-11')
+        Investimento.objects.create(
+            cliente=outro, tipo='CDB', valor_aplicado=Decimal('100.00'), rentabilidade=Decimal('10.00'),
+            data_aplicacao=date(2024, 1, 1), data_vencimento=date(2030, 1, 1)
+        )
+
+        self.assertEqual(
+            self.client.get('/api/v1/investimentos/', HTTP_IF_NONE_MATCH=etag_cliente).status_code, 304
+        )
+        resposta = client_staff.get('/api/v1/investimentos/', HTTP_IF_NONE_MATCH=etag_staff)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['count'], 1)
+
+    def test_alteracao_do_usuario_invalida_o_cliente(self):
+        etag = self.client.get('/api/v1/clientes/')['ETag']
+        self.cliente.user.first_name = 'Maria'
+        self.cliente.user.save()
+
+        resposta = self.client.get('/api/v1/clientes/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['results'][0]['user']['first_name'], 'Maria')
+
+    def test_escrita_em_outro_processo_vale_apos_a_validade(self):
+        etag = self.client.get('/api/v1/contas/')['ETag']
+        # Escrita sem sinais, como a de outro worker com LocMemCache próprio
+        ContaBancaria.objects.filter(pk=self.conta.pk).update(saldo=Decimal('5.00'))
+        self.assertEqual(self.client.get('/api/v1/contas/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        validade = caches['listagens'].default_timeout
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + validade + 1):
+            resposta = self.client.get('/api/v1/contas/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['results'][0]['saldo'], '5.00')
+
+    def test_check_de_implantacao_exige_cache_compartilhado(self):
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        compartilhado = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+
+        with self.settings(CACHES={'default': local, 'listagens': local}):
+            self.assertEqual([aviso.id for aviso in verificar_cache_das_listagens(None)], ['servicos.W001'])
+        with self.settings(CACHES={'default': local, 'listagens': compartilhado}):
+            self.assertEqual(verificar_cache_das_listagens(None), [])
+
+
+class DadosSinteticosTests(TestCase):
+    parametros = dict(
+        semente=7, clientes=30, transacoes=400, emprestimos=40, investimentos=40,
+        tamanho_bloco=150, referencia=date(2025, 1, 1)
+    )
+
+    def conteudo_das_transacoes(self):
+        return list(
+            Transacao.objects.order_by('id_transacao').values_list(
+                'id_transacao', 'conta_origem__numero_conta', 'conta_destino__numero_conta',
+                'tipo', 'valor', 'status', 'data_transacao'
+            )
+        )
+
+    def gerar(self, **kwargs):
+        gerador = GeradorFinanceiro(Parametros(**{**self.parametros, **kwargs}))
+        gerador.gerar_clientes()
+        gerador.gerar_transacoes()
+        gerador.gerar_emprestimos()
+        gerador.gerar_investimentos()
+        return gerador
+
+    def test_mesma_semente_gera_os_mesmos_dados(self):
+        self.gerar()
+        primeira = self.conteudo_das_transacoes()
+        saldos = list(ContaBancaria.objects.order_by('numero_conta').values_list('numero_conta', 'saldo'))
+        User.objects.all().delete()
+
+        self.gerar()
+
+        self.assertEqual(self.conteudo_das_transacoes(), primeira)
+        self.assertEqual(
+            list(ContaBancaria.objects.order_by('numero_conta').values_list('numero_conta', 'saldo')), saldos
+        )
+
+    def test_saldos_coerentes_com_as_transacoes(self):
+        gerador = self.gerar()
+
+        esperados = {}
+        for tipo, valor, origem, destino in Transacao.objects.filter(status='CON').values_list(
+            'tipo', 'valor', 'conta_origem_id', 'conta_destino_id'
+        ):
+            for conta_id, delta in lancamentos.deltas_da_transacao(tipo, valor, origem, destino).items():
+                esperados[conta_id] = esperados.get(conta_id, Decimal('0.00')) + delta
+        saldos = dict(ContaBancaria.objects.values_list('id', 'saldo'))
+        self.assertEqual(saldos, esperados)
+        self.assertFalse(ContaBancaria.objects.filter(saldo__lt=0).exists())
+        # Todo o histórico antes da referência, com empréstimos atrasados só se vencidos
+        self.assertFalse(Transacao.objects.filter(data_transacao__gte=gerador.fim_historico).exists())
+        self.assertFalse(
+            Emprestimo.objects.filter(status='ATR', data_vencimento__gte=date(2025, 1, 1)).exists()
+        )
+        self.assertEqual(Transacao.objects.count(), 400 + len(saldos))
+
+    def test_comando_seed_financeira(self):
+        saida = io.StringIO()
+        argumentos = ('seed_financeira', '--clientes', '20', '--transacoes', '300', '--emprestimos', '10',
+                      '--investimentos', '10', '--semente', '3', '--data', '2025-01-01')
+
+        call_command(*argumentos, stdout=saida)
+
+        self.assertEqual(Cliente.objects.filter(user__username__startswith='sint3-').count(), 20)
+        self.assertEqual((Emprestimo.objects.count(), Investimento.objects.count()), (10, 10))
+        self.assertTrue(SaldoDiario.objects.exists())
+        self.assertFalse(verificar_saldos_diarios())
+        self.assertIn('Carteira da semente 3 gerada', saida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command(*argumentos, stdout=io.StringIO())
+
+
+class BenchEndpointsTests(TestCase):
+    def test_todos_os_endpoints_tem_cenario(self):
+        cobertos = {(cenario.rota, cenario.metodo) for cenario in cenarios()}
+
+        self.assertLessEqual(endpoints_do_router(), cobertos)
+        self.assertIn(('emprestimo-aprovar-lote', 'POST'), endpoints_do_router())
+        self.assertLessEqual(
+            {('token_obtain_pair', 'POST'), ('token_refresh', 'POST'), ('registro', 'POST')}, cobertos
+        )
+
+    def test_cenarios_respondem_com_o_status_esperado(self):
+        relatorio = medir_endpoints(repeticoes=2, aquecimento=1, repeticoes_alocacao=1, registros=3)
+
+        self.assertEqual(len(relatorio['endpoints']), len(cenarios()))
+        extrato = relatorio['endpoints']['GET contabancaria-extrato']
+        self.assertLessEqual(extrato['p50_ms'], extrato['p99_ms'])
+        self.assertGreater(extrato['consultas'], 0)
+        self.assertGreater(extrato['alocacao_kb'], 0)
+
+    def test_comparar_com_a_linha_de_base(self):
+        def relatorio(p50, consultas, alocacao_kb):
+            return {'endpoints': {'GET contas': {
+                'p50_ms': p50, 'p95_ms': p50, 'consultas': consultas, 'alocacao_kb': alocacao_kb
+            }}}
+        base = relatorio(10.0, 2, 100.0)
+
+        self.assertEqual(comparar(relatorio(14.0, 2, 110.0), base), [])
+        # Aumentos relativos grandes, mas abaixo das tolerâncias absolutas
+        self.assertEqual(comparar(relatorio(2.4, 2, 10.0), relatorio(0.5, 2, 1.0)), [])
+        self.assertEqual(
+            comparar(relatorio(16.0, 3, 200.0), base),
+            [
+                ('GET contas', 'p50_ms', 10.0, 16.0), ('GET contas', 'p95_ms', 10.0, 16.0),
+                ('GET contas', 'consultas', 2, 3), ('GET contas', 'alocacao_kb', 100.0, 200.0),
+            ]
+        )
+        self.assertEqual(comparar(relatorio(16.0, 3, 200.0), base, limite_latencia=1.0, limite_consultas=1,
+                                  limite_alocacao=1.0), [])
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import views_assincronas
 from .views import (
     ClienteViewSet,
     ContaBancariaViewSet,
@@ -16,7 +17,16 @@ router.register(r'transacoes', TransacaoViewSet)
 router.register(r'emprestimos', EmprestimoViewSet)
 router.register(r'investimentos', InvestimentoViewSet)
 
+# Endpoints de leitura assíncronos (ASGI), com as mesmas respostas do router
+urls_assincronas = [
+    path('contas/', views_assincronas.listar_contas, name='async-conta-list'),
+    path('contas/<int:pk>/extrato/', views_assincronas.extrato, name='async-conta-extrato'),
+    path('transacoes/<uuid:pk>/', views_assincronas.detalhar_transacao, name='async-transacao-detail'),
+    path('clientes/<int:pk>/resumo/', views_assincronas.resumo_cliente, name='async-cliente-resumo'),
+]
+
 # URLs da API
 urlpatterns = [
+    path('async/', include(urls_assincronas)),
     path('', include(router.urls)),
-] 
\ No newline at end of file
+] 
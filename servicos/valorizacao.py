@@ -0,0 +1,177 @@
+"""
+Valorização (marcação na data) da carteira de investimentos.
+
+A rentabilidade é anual e capitalizada diariamente em dias corridos:
+valor_atual = valor_aplicado * (1 + rentabilidade / 100) ** (dias / 365),
+com `dias` contados da aplicação até a data de referência ou o vencimento,
+o que vier primeiro. Como milhares de posições compartilham as mesmas taxas
+e prazos, cada taxa tem uma curva de fatores por dia mantida num cache LRU
+limitado, e a carteira é valorizada numa única passada sobre as tuplas de
+`values_list()`.
+"""
+import threading
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from .models import Investimento
+
+
+CENTAVO = Decimal('0.01')
+DIAS_NO_ANO = 365
+
+# Colunas lidas do banco, na ordem esperada por `valorizar`
+CAMPOS = ('tipo', 'valor_aplicado', 'rentabilidade', 'data_aplicacao', 'data_vencimento')
+
+
+@lru_cache(maxsize=1024)
+def fator_diario(rentabilidade):
+    """Fator de um dia para a rentabilidade anual (em %)"""
+    return (1 + rentabilidade / 100) ** (Decimal(1) / DIAS_NO_ANO)
+
+
+class CurvaAcumulacao:
+    """
+    Fatores acumulados de uma taxa, indexados pelo número de dias corridos
+    (fatores[0] == 1). A curva cresce sob demanda até o maior prazo pedido.
+
+    A curva é compartilhada entre threads pelo cache: uma lista já devolvida
+    nunca é alterada; a extensão é montada numa lista nova, trocada sob a trava.
+    """
+
+    def __init__(self, rentabilidade):
+        self.fator_diario = fator_diario(rentabilidade)
+        self.fatores = [Decimal(1)]
+        self._trava = threading.Lock()
+
+    def estender(self, dias):
+        """Garante fatores até `dias` e retorna a lista"""
+        fatores = self.fatores
+        if len(fatores) > dias:
+            return fatores
+        with self._trava:
+            fatores = self.fatores
+            if len(fatores) <= dias:
+                ultimo, diario = fatores[-1], self.fator_diario
+                extensao = []
+                for _ in range(dias + 1 - len(fatores)):
+                    ultimo *= diario
+                    extensao.append(ultimo)
+                fatores = self.fatores = fatores + extensao
+        return fatores
+
+    def fator(self, dias):
+        return self.estender(max(dias, 0))[max(dias, 0)]
+
+
+@lru_cache(maxsize=1024)
+def curva_de_acumulacao(rentabilidade):
+    """Curva da taxa, compartilhada por todas as posições com a mesma rentabilidade"""
+    return CurvaAcumulacao(rentabilidade)
+
+
+@dataclass
+class Posicao:
+    quantidade: int = 0
+    valor_aplicado: Decimal = field(default_factory=lambda: Decimal('0.00'))
+    valor_atual: Decimal = field(default_factory=lambda: Decimal('0.00'))
+
+    @property
+    def rendimento(self):
+        return self.valor_atual - self.valor_aplicado
+
+    def como_dict(self):
+        return {
+            'quantidade': self.quantidade,
+            'valor_aplicado': f'{self.valor_aplicado:.2f}',
+            'valor_atual': f'{self.valor_atual:.2f}',
+            'rendimento': f'{self.rendimento:.2f}',
+        }
+
+
+def _marcacao(data_referencia):
+    """
+    Função que dá o valor (sem arredondar) de uma posição na data de
+    referência. Guarda as curvas já usadas na passada, para consultar o cache
+    de curvas uma vez por taxa.
+    """
+    referencia = data_referencia.toordinal()
+    # Curvas usadas nesta passada: rentabilidade -> lista de fatores por dia
+    curvas = {}
+
+    def valor_na_data(valor_aplicado, rentabilidade, data_aplicacao, data_vencimento):
+        fim = referencia
+        if data_vencimento is not None and data_vencimento < data_referencia:
+            fim = data_vencimento.toordinal()
+        dias = max(fim - data_aplicacao.toordinal(), 0)
+        fatores = curvas.get(rentabilidade)
+        if fatores is None or dias >= len(fatores):
+            fatores = curvas[rentabilidade] = curva_de_acumulacao(rentabilidade).estender(dias)
+        return valor_aplicado * fatores[dias]
+
+    return valor_na_data
+
+
+def valorizar(linhas, data_referencia):
+    """
+    Valoriza as linhas (tuplas na ordem de CAMPOS) na data de referência.
+    Retorna ({tipo: Posicao}, Posicao total).
+
+    Os valores atuais são somados sem arredondamento intermediário; cada
+    agregado é arredondado ao centavo uma única vez, no final.
+    """
+    aplicado, atual, quantidade = {}, {}, {}
+    valor_na_data = _marcacao(data_referencia)
+    for tipo, valor_aplicado, rentabilidade, data_aplicacao, data_vencimento in linhas:
+        valor_atual = valor_na_data(valor_aplicado, rentabilidade, data_aplicacao, data_vencimento)
+        if tipo in quantidade:
+            quantidade[tipo] += 1
+            aplicado[tipo] += valor_aplicado
+            atual[tipo] += valor_atual
+        else:
+            quantidade[tipo], aplicado[tipo], atual[tipo] = 1, valor_aplicado, valor_atual
+
+    por_tipo = {
+        tipo: Posicao(
+            quantidade[tipo],
+            aplicado[tipo].quantize(CENTAVO, rounding=ROUND_HALF_UP),
+            atual[tipo].quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        )
+        for tipo in quantidade
+    }
+    total = Posicao(
+        sum(quantidade.values()),
+        sum(aplicado.values(), Decimal('0.00')).quantize(CENTAVO, rounding=ROUND_HALF_UP),
+        sum(atual.values(), Decimal('0.00')).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    )
+    return por_tipo, total
+
+
+def valores_na_data(linhas, data_referencia):
+    """
+    Valor de cada linha (valor_aplicado, rentabilidade, data_aplicacao,
+    data_vencimento) na data de referência, arredondado ao centavo, numa única
+    passada com as curvas compartilhadas. Usado nos resgates.
+    """
+    valor_na_data = _marcacao(data_referencia)
+    return [
+        valor_na_data(*linha).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        for linha in linhas
+    ]
+
+
+def posicao_consolidada(queryset, data_referencia):
+    """Posição dos investimentos ativos do queryset, agregada por tipo"""
+    linhas = queryset.filter(
+        ativo=True, data_aplicacao__lte=data_referencia
+    ).order_by().values_list(*CAMPOS).iterator(chunk_size=5000)
+    por_tipo, total = valorizar(linhas, data_referencia)
+    nomes = dict(Investimento.TIPO_INVESTIMENTO_CHOICES)
+    return {
+        'data_referencia': data_referencia,
+        'total': total.como_dict(),
+        'por_tipo': [
+            {'tipo': tipo, 'descricao': nomes.get(tipo, tipo), **por_tipo[tipo].como_dict()}
+            for tipo in sorted(por_tipo)
+        ],
+    }
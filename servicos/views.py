@@ -1,12 +1,41 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from django.db import transaction
+from rest_framework.settings import api_settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from datetime import date
 
+from autenticacao.authentication import cliente_id_da_requisicao
+
+from .amortizacao import cronograma
+from .aprovacoes import APROVACAO_MAX_ITENS, ErroAprovacao, aprovar_emprestimos
+from .exportacao import FORMATOS, exportar_extrato
+from .auditoria import auditado
+from .idempotencia import idempotente
+from .lancamentos import (
+    CAMPOS_AGENDAMENTO,
+    LOTE_MAX_ITENS,
+    ContaNaoEncontrada,
+    ErroLancamento,
+    SaldoInsuficiente,
+    ValorInvalido,
+    executar_com_retentativa,
+    lancar_lote,
+    lancar_transacao
+)
+from .mixins import CacheListagemMixin, ListagemCompiladaMixin, OtimizacaoConsultaMixin
 from .models import Cliente, ContaBancaria, Transacao, Emprestimo, Investimento
+from .paginacao import ExtratoCursorPagination
+from .parsers import NDJSONParser
+from .renderers import CSVRenderer, NDJSONRenderer
+from .resgates import ErroResgate, resgatar_investimento
+from .resumo import resumo_do_cliente
+from .saldos import saldo_em
 from .serializers import (
     ClienteSerializer, 
     ContaBancariaSerializer, 
@@ -15,43 +44,71 @@ from .serializers import (
     EmprestimoSerializer,
     EmprestimoCreateSerializer,
     InvestimentoSerializer,
-    InvestimentoCreateSerializer
+    InvestimentoCreateSerializer,
+    ParcelaSerializer,
+    AprovacaoLoteSerializer
 )
+from .valorizacao import posicao_consolidada
+
+
+def data_do_parametro(request, parametro='data'):
+    """Data informada em `?data=AAAA-MM-DD` (padrão: hoje)"""
+    valor = request.query_params.get(parametro)
+    if not valor:
+        return timezone.localdate()
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({parametro: 'Data inválida. Use o formato AAAA-MM-DD.'})
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(CacheListagemMixin, ListagemCompiladaMixin, OtimizacaoConsultaMixin, viewsets.ModelViewSet):
     """
     ViewSet para visualizar e editar clientes.
     """
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    leitura_em_replica = True
     
     def get_queryset(self):
         # Filtrar para mostrar apenas o próprio cliente para usuários comuns
         if not self.request.user.is_staff:
-            return Cliente.objects.filter(user=self.request.user)
+            return Cliente.objects.filter(pk=cliente_id_da_requisicao(self.request))
         return Cliente.objects.all()
+    
+    @action(detail=True, methods=['get'])
+    def resumo(self, request, pk=None):
+        """
+        Resumo consolidado do cliente: saldo por tipo de conta, principal
+        dos empréstimos por status e valor investido por tipo.
+        """
+        cliente = self.get_object()
+        return Response(resumo_do_cliente(cliente.id))
 
 
-class ContaBancariaViewSet(viewsets.ModelViewSet):
+class ContaBancariaViewSet(CacheListagemMixin, ListagemCompiladaMixin, OtimizacaoConsultaMixin, viewsets.ModelViewSet):
     """
     ViewSet para visualizar e editar contas bancárias.
     """
     queryset = ContaBancaria.objects.all()
     serializer_class = ContaBancariaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    leitura_em_replica = True
     
     def get_queryset(self):
         # Filtrar para mostrar apenas as contas do próprio cliente para usuários comuns
         if not self.request.user.is_staff:
-            return ContaBancaria.objects.filter(cliente__user=self.request.user)
+            return ContaBancaria.objects.filter(cliente_id=cliente_id_da_requisicao(self.request))
         return ContaBancaria.objects.all()
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], pagination_class=ExtratoCursorPagination,
+            renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES + [CSVRenderer, NDJSONRenderer])
     def extrato(self, request, pk=None):
         """
-        Endpoint para obter o extrato da conta (transações)
+        Endpoint para obter o extrato da conta (transações de saída e de
+        entrada), paginado por cursor. Com `?format=csv` ou `?format=ndjson`
+        o extrato completo é exportado por streaming.
         """
         conta = self.get_object()
         
@@ -59,13 +116,11 @@ class ContaBancariaViewSet(viewsets.ModelViewSet):
         data_inicio = request.query_params.get('data_inicio')
         data_fim = request.query_params.get('data_fim')
         
-        # Filtrar transações
+        # Transações confirmadas da conta: uma consulta por direção, cada uma
+        # atendida pelo seu índice (conta, status, data_transacao)
         transacoes = Transacao.objects.filter(
-            status='CON',  # Apenas transações confirmadas
-        ).filter(
-            # Transações da conta (origem ou destino)
-            conta_origem=conta
-        ).order_by('-data_transacao')
+            status='CON'  # Apenas transações confirmadas
+        )
         
         # Aplicar filtros de data se fornecidos
         if data_inicio:
@@ -73,23 +128,56 @@ class ContaBancariaViewSet(viewsets.ModelViewSet):
         if data_fim:
             transacoes = transacoes.filter(data_transacao__lte=data_fim)
         
-        serializer = TransacaoSerializer(transacoes, many=True)
-        return Response(serializer.data)
+        consultas = [
+            transacoes.filter(conta_origem=conta),
+            transacoes.filter(conta_destino=conta).exclude(conta_origem=conta),
+        ]
+        
+        # Exportação completa por streaming
+        if request.accepted_renderer.format in FORMATOS:
+            return exportar_extrato(
+                consultas,
+                request.accepted_renderer.format,
+                f'extrato-{conta.numero_conta}'
+            )
+        
+        pagina = self.paginate_queryset([
+            consulta.select_related('conta_origem', 'conta_destino') for consulta in consultas
+        ])
+        serializer = TransacaoSerializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class TransacaoViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def saldo(self, request, pk=None):
+        """
+        Endpoint para obter o saldo da conta ao final de uma data
+        (`?data=AAAA-MM-DD`, padrão: hoje)
+        """
+        conta = self.get_object()
+        data = data_do_parametro(request)
+        
+        return Response({
+            'conta': conta.id,
+            'data': data,
+            'saldo': f'{saldo_em(conta.id, data):.2f}'
+        })
+
+
+class TransacaoViewSet(ListagemCompiladaMixin, OtimizacaoConsultaMixin, viewsets.ModelViewSet):
     """
     ViewSet para visualizar e criar transações financeiras.
     """
     queryset = Transacao.objects.all()
     serializer_class = TransacaoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    leitura_em_replica = True
     
     def get_queryset(self):
         # Filtrar para mostrar apenas as transações do próprio cliente para usuários comuns
         if not self.request.user.is_staff:
             return Transacao.objects.filter(
-                conta_origem__cliente__user=self.request.user
+                conta_origem__cliente_id=cliente_id_da_requisicao(self.request)
             )
         return Transacao.objects.all()
     
@@ -98,7 +186,8 @@ class TransacaoViewSet(viewsets.ModelViewSet):
             return TransacaoCreateSerializer
         return TransacaoSerializer
     
-    @transaction.atomic
+    @idempotente('transacoes')
+    @auditado
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -109,55 +198,30 @@ class TransacaoViewSet(viewsets.ModelViewSet):
         tipo = serializer.validated_data.get('tipo')
         valor = serializer.validated_data.get('valor')
         descricao = serializer.validated_data.get('descricao', '')
+        agendamento = {
+            campo: serializer.validated_data[campo]
+            for campo in CAMPOS_AGENDAMENTO if campo in serializer.validated_data
+        }
         
         # Verificar se o usuário tem permissão para a conta de origem
         if not request.user.is_staff:
-            conta_origem = get_object_or_404(ContaBancaria, id=conta_origem_id, cliente__user=request.user)
-        else:
-            conta_origem = get_object_or_404(ContaBancaria, id=conta_origem_id)
-        
-        # Para transferências, obter conta de destino
-        conta_destino = None
-        if conta_destino_id:
-            conta_destino = get_object_or_404(ContaBancaria, id=conta_destino_id)
+            get_object_or_404(
+                ContaBancaria.objects.only('id'),
+                id=conta_origem_id, cliente_id=cliente_id_da_requisicao(request)
+            )
         
-        # Verificar saldo suficiente para transações de saída (saque ou transferência)
-        if tipo in ['SAQ', 'TRA'] and conta_origem.saldo < valor:
+        # Lançar a transação (trava as contas e aplica os saldos atomicamente)
+        try:
+            transacao = lancar_transacao(tipo, valor, conta_origem_id, conta_destino_id, descricao, **agendamento)
+        except ContaNaoEncontrada:
+            raise Http404
+        except SaldoInsuficiente:
             return Response(
                 {'detail': 'Saldo insuficiente para realizar a operação.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Criar transação
-        transacao = Transacao(
-            conta_origem=conta_origem,
-            conta_destino=conta_destino,
-            tipo=tipo,
-            valor=valor,
-            descricao=descricao,
-            status='PEN',  # Pendente inicialmente
-            data_transacao=timezone.now()
-        )
-        transacao.save()
-        
-        # Processar transação com base no tipo
-        if tipo == 'DEP':  # Depósito
-            conta_origem.saldo += valor
-            conta_origem.save()
-            transacao.status = 'CON'  # Confirmada
-            transacao.save()
-        elif tipo == 'SAQ':  # Saque
-            conta_origem.saldo -= valor
-            conta_origem.save()
-            transacao.status = 'CON'  # Confirmada
-            transacao.save()
-        elif tipo == 'TRA':  # Transferência
-            conta_origem.saldo -= valor
-            conta_destino.saldo += valor
-            conta_origem.save()
-            conta_destino.save()
-            transacao.status = 'CON'  # Confirmada
-            transacao.save()
+        except ValorInvalido as erro:
+            return Response({'detail': str(erro)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(
             TransacaoSerializer(transacao).data,
@@ -165,18 +229,82 @@ class TransacaoViewSet(viewsets.ModelViewSet):
         )
 
 
-class EmprestimoViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='lote',
+            parser_classes=[JSONParser, NDJSONParser])
+    @auditado
+    def lote(self, request):
+        """
+        Endpoint para lançar várias transações de uma vez.
+        Aceita uma lista JSON ou NDJSON (um objeto por linha) e reporta o
+        resultado de cada item.
+        """
+        itens = request.data
+        if not isinstance(itens, list):
+            return Response(
+                {'detail': 'Envie uma lista de transações.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(itens) > LOTE_MAX_ITENS:
+            return Response(
+                {'detail': f'O lote pode ter no máximo {LOTE_MAX_ITENS} transações.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validar todos os itens com uma única instância do serializer
+        validador = TransacaoCreateSerializer()
+        validos = []
+        resultados = [None] * len(itens)
+        for indice, item in enumerate(itens):
+            try:
+                validos.append((indice, validador.run_validation(item)))
+            except ValidationError as exc:
+                resultados[indice] = {'indice': indice, 'sucesso': False, 'erros': exc.detail}
+        
+        # Usuários comuns só podem debitar das próprias contas
+        contas_permitidas = None
+        if not request.user.is_staff:
+            contas_permitidas = set(ContaBancaria.objects.filter(
+                cliente_id=cliente_id_da_requisicao(request),
+                id__in={dados['conta_origem_id'] for _, dados in validos}
+            ).values_list('id', flat=True))
+        
+        lancados = lancar_lote(validos, contas_permitidas) if validos else {}
+        for indice, resultado in lancados.items():
+            if isinstance(resultado, ErroLancamento):
+                resultados[indice] = {'indice': indice, 'sucesso': False, 'erros': {'detail': str(resultado)}}
+            else:
+                resultados[indice] = {
+                    'indice': indice,
+                    'sucesso': True,
+                    'id_transacao': resultado.id_transacao,
+                    'status': resultado.status
+                }
+        
+        confirmadas = sum(1 for resultado in resultados if resultado['sucesso'])
+        return Response(
+            {
+                'total': len(resultados),
+                'sucesso': confirmadas,
+                'falhas': len(resultados) - confirmadas,
+                'resultados': resultados
+            },
+            status=status.HTTP_201_CREATED if confirmadas == len(resultados) else status.HTTP_207_MULTI_STATUS
+        )
+
+
+class EmprestimoViewSet(CacheListagemMixin, OtimizacaoConsultaMixin, viewsets.ModelViewSet):
     """
     ViewSet para visualizar e solicitar empréstimos.
     """
     queryset = Emprestimo.objects.all()
     serializer_class = EmprestimoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    leitura_em_replica = True
     
     def get_queryset(self):
         # Filtrar para mostrar apenas os empréstimos do próprio cliente para usuários comuns
         if not self.request.user.is_staff:
-            return Emprestimo.objects.filter(cliente__user=self.request.user)
+            return Emprestimo.objects.filter(cliente_id=cliente_id_da_requisicao(self.request))
         return Emprestimo.objects.all()
     
     def get_serializer_class(self):
@@ -192,12 +320,12 @@ class EmprestimoViewSet(viewsets.ModelViewSet):
         cliente_id = serializer.validated_data.get('cliente_id')
         valor_solicitado = serializer.validated_data.get('valor_solicitado')
         prazo_meses = serializer.validated_data.get('prazo_meses')
+        sistema_amortizacao = serializer.validated_data.get('sistema_amortizacao', 'PRICE')
         
         # Verificar se o usuário tem permissão para o cliente
-        if not request.user.is_staff:
-            cliente = get_object_or_404(Cliente, id=cliente_id, user=request.user)
-        else:
-            cliente = get_object_or_404(Cliente, id=cliente_id)
+        if not request.user.is_staff and cliente_id != cliente_id_da_requisicao(request):
+            raise Http404
+        cliente = get_object_or_404(Cliente, id=cliente_id)
         
         # Criar empréstimo solicitado
         emprestimo = Emprestimo(
@@ -205,8 +333,9 @@ class EmprestimoViewSet(viewsets.ModelViewSet):
             valor_solicitado=valor_solicitado,
             taxa_juros=1.5,  # Taxa padrão de 1.5% ao mês
             prazo_meses=prazo_meses,
+            sistema_amortizacao=sistema_amortizacao,
             status='SOL',  # Status Solicitado
-            data_solicitacao=timezone.now()
+            data_solicitacao=timezone.localdate()
         )
         emprestimo.save()
         
@@ -216,6 +345,7 @@ class EmprestimoViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['post'])
+    @auditado
     def aprovar(self, request, pk=None):
         """
         Endpoint para aprovar um empréstimo (somente admin)
@@ -234,59 +364,127 @@ class EmprestimoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Obter valor aprovado do request ou usar o solicitado como padrão
-        valor_aprovado = request.data.get('valor_aprovado', emprestimo.valor_solicitado)
+        # Valor aprovado do request (validado como no lote) ou o solicitado como padrão
+        dados = {'emprestimo_id': emprestimo.id}
+        if 'valor_aprovado' in request.data:
+            dados['valor_aprovado'] = request.data['valor_aprovado']
+        serializer = AprovacaoLoteSerializer(data=dados)
+        serializer.is_valid(raise_exception=True)
         
-        # Atualizar empréstimo
-        emprestimo.valor_aprovado = valor_aprovado
-        emprestimo.status = 'APR'  # Aprovado
-        emprestimo.data_aprovacao = timezone.now()
-        # Calcular data de vencimento
-        emprestimo.data_vencimento = timezone.now() + timezone.timedelta(days=30 * emprestimo.prazo_meses)
-        emprestimo.save()
+        # Aprovar e creditar na mesma transação
+        resultado = aprovar_emprestimos([(0, serializer.validated_data)])[0]
+        if isinstance(resultado, ErroAprovacao):
+            return Response({'detail': str(resultado)}, status=status.HTTP_400_BAD_REQUEST)
+        emprestimo.refresh_from_db()
         
-        # Creditar o valor na conta do cliente
-        try:
-            conta = ContaBancaria.objects.filter(cliente=emprestimo.cliente, ativa=True).first()
-            if conta:
-                conta.saldo += valor_aprovado
-                conta.save()
-                
-                # Registrar transação
-                Transacao.objects.create(
-                    conta_origem=conta,
-                    tipo='DEP',
-                    valor=valor_aprovado,
-                    descricao=f'Empréstimo aprovado - ID: {emprestimo.id}',
-                    status='CON',  # Confirmada
-                    data_transacao=timezone.now()
-                )
-        except Exception as e:
-            # Se houver erro ao creditar, reverter aprovação
-            emprestimo.status = 'SOL'
-            emprestimo.data_aprovacao = None
-            emprestimo.data_vencimento = None
-            emprestimo.save()
+        return Response(EmprestimoSerializer(emprestimo).data)
+    
+    @action(detail=False, methods=['post'], url_path='aprovar-lote',
+            parser_classes=[JSONParser, NDJSONParser])
+    @auditado
+    def aprovar_lote(self, request):
+        """
+        Endpoint para aprovar vários empréstimos de uma vez (somente admin).
+        Aceita uma lista JSON ou NDJSON de {emprestimo_id, valor_aprovado}
+        e reporta o resultado de cada item.
+        """
+        if not request.user.is_staff:
             return Response(
-                {'detail': f'Erro ao creditar valor: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'detail': 'Permissão negada. Somente administradores podem aprovar empréstimos.'},
+                status=status.HTTP_403_FORBIDDEN
             )
         
-        return Response(EmprestimoSerializer(emprestimo).data)
+        itens = request.data
+        if not isinstance(itens, list):
+            return Response(
+                {'detail': 'Envie uma lista de aprovações.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(itens) > APROVACAO_MAX_ITENS:
+            return Response(
+                {'detail': f'O lote pode ter no máximo {APROVACAO_MAX_ITENS} aprovações.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        validador = AprovacaoLoteSerializer()
+        validos = []
+        resultados = [None] * len(itens)
+        for indice, item in enumerate(itens):
+            try:
+                validos.append((indice, validador.run_validation(item)))
+            except ValidationError as exc:
+                resultados[indice] = {'indice': indice, 'sucesso': False, 'erros': exc.detail}
+        
+        for indice, resultado in aprovar_emprestimos(validos).items():
+            if isinstance(resultado, ErroAprovacao):
+                resultados[indice] = {'indice': indice, 'sucesso': False, 'erros': {'detail': str(resultado)}}
+            else:
+                emprestimo, transacao = resultado
+                resultados[indice] = {
+                    'indice': indice,
+                    'sucesso': True,
+                    'emprestimo': emprestimo.id,
+                    'valor_aprovado': f'{emprestimo.valor_aprovado:.2f}',
+                    'data_vencimento': emprestimo.data_vencimento,
+                    'id_transacao': transacao.id_transacao
+                }
+        
+        aprovados = sum(1 for resultado in resultados if resultado['sucesso'])
+        return Response(
+            {
+                'total': len(resultados),
+                'sucesso': aprovados,
+                'falhas': len(resultados) - aprovados,
+                'resultados': resultados
+            },
+            status=status.HTTP_200_OK if aprovados == len(resultados) else status.HTTP_207_MULTI_STATUS
+        )
+    
+    @action(detail=True, methods=['get'])
+    def parcelas(self, request, pk=None):
+        """
+        Cronograma de parcelas do empréstimo. Antes da aprovação é uma
+        simulação sobre o valor solicitado, com início na data de hoje.
+        """
+        emprestimo = self.get_object()
+        
+        if emprestimo.valor_aprovado is not None:
+            principal = emprestimo.valor_aprovado
+        else:
+            principal = emprestimo.valor_solicitado
+        parcelas = cronograma(
+            principal,
+            emprestimo.taxa_juros,
+            emprestimo.prazo_meses,
+            emprestimo.sistema_amortizacao,
+            emprestimo.data_aprovacao or timezone.localdate()
+        )
+        
+        return Response({
+            'emprestimo': emprestimo.id,
+            'sistema_amortizacao': emprestimo.sistema_amortizacao,
+            'valor_financiado': f'{principal:.2f}',
+            'taxa_juros': f'{emprestimo.taxa_juros:.2f}',
+            'prazo_meses': emprestimo.prazo_meses,
+            'total_juros': f'{sum(parcela.juros for parcela in parcelas):.2f}',
+            'total_pago': f'{sum(parcela.prestacao for parcela in parcelas):.2f}',
+            'parcelas': ParcelaSerializer(parcelas, many=True).data
+        })
 
 
-class InvestimentoViewSet(viewsets.ModelViewSet):
+class InvestimentoViewSet(CacheListagemMixin, OtimizacaoConsultaMixin, viewsets.ModelViewSet):
     """
     ViewSet para visualizar e criar investimentos.
     """
     queryset = Investimento.objects.all()
     serializer_class = InvestimentoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    leitura_em_replica = True
     
     def get_queryset(self):
         # Filtrar para mostrar apenas os investimentos do próprio cliente para usuários comuns
         if not self.request.user.is_staff:
-            return Investimento.objects.filter(cliente__user=self.request.user)
+            return Investimento.objects.filter(cliente_id=cliente_id_da_requisicao(self.request))
         return Investimento.objects.all()
     
     def get_serializer_class(self):
@@ -294,7 +492,46 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
             return InvestimentoCreateSerializer
         return InvestimentoSerializer
     
-    @transaction.atomic
+    @action(detail=False, methods=['get'])
+    def posicao(self, request):
+        """
+        Posição consolidada dos investimentos ativos, marcada na data
+        (`?data=AAAA-MM-DD`, padrão: hoje) e agregada por tipo. Administradores
+        veem toda a carteira ou a de um cliente (`?cliente=id`).
+        """
+        data = data_do_parametro(request)
+        queryset = self.get_queryset()
+        cliente_id = request.query_params.get('cliente')
+        if request.user.is_staff and cliente_id:
+            if not cliente_id.isdigit():
+                raise ValidationError({'cliente': 'Informe o id numérico do cliente.'})
+            queryset = queryset.filter(cliente_id=cliente_id)
+        
+        return Response(posicao_consolidada(queryset, data))
+    
+    @action(detail=True, methods=['post'])
+    @auditado
+    def resgatar(self, request, pk=None):
+        """
+        Resgata o investimento pelo valor atualizado na data (antecipadamente,
+        se ainda não venceu) e credita a conta ativa mais recente do cliente.
+        """
+        investimento = self.get_object()
+        
+        try:
+            valor, transacao = resgatar_investimento(investimento.id)
+        except ErroResgate as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        investimento.refresh_from_db()
+        
+        return Response({
+            'investimento': InvestimentoSerializer(investimento).data,
+            'valor_resgatado': f'{valor:.2f}',
+            'id_transacao': transacao.id_transacao,
+        })
+    
+    @idempotente('investimentos')
+    @auditado
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -307,50 +544,48 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
         data_vencimento = serializer.validated_data.get('data_vencimento')
         
         # Verificar se o usuário tem permissão para o cliente
-        if not request.user.is_staff:
-            cliente = get_object_or_404(Cliente, id=cliente_id, user=request.user)
-        else:
-            cliente = get_object_or_404(Cliente, id=cliente_id)
+        if not request.user.is_staff and cliente_id != cliente_id_da_requisicao(request):
+            raise Http404
+        cliente = get_object_or_404(Cliente, id=cliente_id)
         
-        # Verificar saldo na conta
-        conta = ContaBancaria.objects.filter(cliente=cliente, ativa=True).first()
-        if not conta:
+        # Obter conta ativa do cliente
+        conta_id = ContaBancaria.objects.filter(
+            cliente=cliente, ativa=True
+        ).values_list('id', flat=True).first()
+        if not conta_id:
             return Response(
                 {'detail': 'Cliente não possui conta ativa para realizar investimento.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if conta.saldo < valor_aplicado:
+        def aplicar():
+            # Débito, transação e investimento na mesma transação de banco,
+            # repetida inteira pelo motor em caso de conflito de concorrência
+            lancar_transacao(
+                'SAQ',
+                valor_aplicado,
+                conta_id,
+                descricao=f'Aplicação em {dict(Investimento.TIPO_INVESTIMENTO_CHOICES).get(tipo)}'
+            )
+            return Investimento.objects.create(
+                cliente=cliente,
+                tipo=tipo,
+                valor_aplicado=valor_aplicado,
+                rentabilidade=rentabilidade,
+                data_aplicacao=timezone.localdate(),
+                data_vencimento=data_vencimento,
+                ativo=True
+            )
+
+        try:
+            investimento = executar_com_retentativa(aplicar)
+        except SaldoInsuficiente:
             return Response(
                 {'detail': 'Saldo insuficiente para realizar o investimento.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Debitar valor da conta
-        conta.saldo -= valor_aplicado
-        conta.save()
-        
-        # Registrar transação
-        Transacao.objects.create(
-            conta_origem=conta,
-            tipo='SAQ',
-            valor=valor_aplicado,
-            descricao=f'Aplicação em {dict(Investimento.TIPO_INVESTIMENTO_CHOICES).get(tipo)}',
-            status='CON',  # Confirmada
-            data_transacao=timezone.now()
-        )
-        
-        # Criar investimento
-        investimento = Investimento(
-            cliente=cliente,
-            tipo=tipo,
-            valor_aplicado=valor_aplicado,
-            rentabilidade=rentabilidade,
-            data_aplicacao=timezone.now(),
-            data_vencimento=data_vencimento,
-            ativo=True
-        )
-        investimento.save()
+        except ValorInvalido as erro:
+            return Response({'detail': str(erro)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(
             InvestimentoSerializer(investimento).data,
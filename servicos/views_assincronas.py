@@ -0,0 +1,136 @@
+"""
+Endpoints de leitura assíncronos, servidos em /api/v1/async/ ao lado dos
+viewsets síncronos e com as mesmas respostas.
+
+O DRF não tem views assíncronas: estas são views `async def` do Django que
+reaproveitam a autenticação JWT, as paginações e os serializers compilados da
+API e consultam o banco com o ORM assíncrono (aget, acount, aaggregate e
+iteração assíncrona). Sob ASGI a requisição não é despachada inteira para uma
+thread; sob WSGI continuam funcionando, executadas com async_to_sync.
+"""
+from functools import wraps
+from operator import itemgetter
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from autenticacao.authentication import JWTCacheAuthentication, acliente_id_da_requisicao
+
+from .models import Cliente, ContaBancaria, Transacao
+from .paginacao import ExtratoCursorPagination, PaginacaoNumeradaAssincrona
+from .resumo import aresumo_do_cliente
+from .serializacao import compilar
+from .serializers import ContaBancariaSerializer, TransacaoSerializer
+
+
+autenticador = JWTCacheAuthentication()
+
+
+def resposta_json(dados, status=status.HTTP_200_OK, **kwargs):
+    return JsonResponse(dados, status=status, json_dumps_params={'ensure_ascii': False}, **kwargs)
+
+
+def endpoint_assincrono(view):
+    """
+    Aceita apenas GET, exige um token JWT válido, entrega à view um Request
+    do DRF (query_params, user, auth) e converte o dicionário retornado, ou
+    as exceções da API, em respostas JSON.
+    """
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        requisicao = Request(request)
+        try:
+            autenticacao = await autenticador.aauthenticate(requisicao)
+            if autenticacao is None:
+                raise exceptions.NotAuthenticated()
+            requisicao.user, requisicao.auth = autenticacao
+            return resposta_json(await view(requisicao, *args, **kwargs))
+        except Http404:
+            exc = exceptions.NotFound()
+        except exceptions.APIException as erro:
+            exc = erro
+
+        cabecalhos = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            cabecalhos['WWW-Authenticate'] = autenticador.authenticate_header(requisicao)
+        dados = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return resposta_json(dados, status=exc.status_code, headers=cabecalhos)
+    return wrapper
+
+
+async def contas_visiveis(request):
+    if request.user.is_staff:
+        return ContaBancaria.objects.all()
+    return ContaBancaria.objects.filter(cliente_id=await acliente_id_da_requisicao(request))
+
+
+@endpoint_assincrono
+async def listar_contas(request):
+    """Equivalente a GET /api/v1/contas/"""
+    serializador = compilar(ContaBancariaSerializer)
+    paginacao = PaginacaoNumeradaAssincrona()
+    pagina = await paginacao.apaginate_queryset(
+        serializador.valores(await contas_visiveis(request)), request
+    )
+    return paginacao.dados_paginados(serializador.serializar(pagina))
+
+
+@endpoint_assincrono
+async def extrato(request, pk):
+    """Equivalente a GET /api/v1/contas/{id}/extrato/ (apenas JSON)"""
+    contas = await contas_visiveis(request)
+    try:
+        conta_id = await contas.values_list('id', flat=True).aget(pk=pk)
+    except ContaBancaria.DoesNotExist:
+        raise Http404
+
+    transacoes = Transacao.objects.filter(status='CON')
+    data_inicio = request.query_params.get('data_inicio')
+    data_fim = request.query_params.get('data_fim')
+    if data_inicio:
+        transacoes = transacoes.filter(data_transacao__gte=data_inicio)
+    if data_fim:
+        transacoes = transacoes.filter(data_transacao__lte=data_fim)
+
+    serializador = compilar(TransacaoSerializer)
+    consultas = [
+        serializador.valores(transacoes.filter(conta_origem_id=conta_id)),
+        serializador.valores(
+            transacoes.filter(conta_destino_id=conta_id).exclude(conta_origem_id=conta_id)
+        ),
+    ]
+    chave = itemgetter(
+        serializador.campos.index('data_transacao'), serializador.campos.index('id_transacao')
+    )
+    paginacao = ExtratoCursorPagination()
+    pagina = await paginacao.apaginate_queryset(consultas, request, chave)
+    return paginacao.dados_paginados(serializador.serializar(pagina))
+
+
+@endpoint_assincrono
+async def detalhar_transacao(request, pk):
+    """Equivalente a GET /api/v1/transacoes/{id}/"""
+    transacoes = Transacao.objects.all()
+    if not request.user.is_staff:
+        transacoes = transacoes.filter(
+            conta_origem__cliente_id=await acliente_id_da_requisicao(request)
+        )
+    serializador = compilar(TransacaoSerializer)
+    try:
+        linha = await serializador.valores(transacoes).aget(pk=pk)
+    except Transacao.DoesNotExist:
+        raise Http404
+    return serializador.serializar([linha])[0]
+
+
+@endpoint_assincrono
+async def resumo_cliente(request, pk):
+    """Equivalente a GET /api/v1/clientes/{id}/resumo/"""
+    if not request.user.is_staff and pk != await acliente_id_da_requisicao(request):
+        raise Http404
+    if not await Cliente.objects.filter(pk=pk).aexists():
+        raise Http404
+    return await aresumo_do_cliente(pk)